@@ -104,7 +104,8 @@ def run(data, token, env_config):
     import sys
     sys.argv = [sys.argv[0]]
     builtins.data = data
-    builtins.data_df = pd.DataFrame(data)
+    from components import row_stream as _row_stream
+    builtins.data_df = _row_stream.data_frame(data)
     import os
     valid_token_path = os.path.join(os.getcwd(), 'valid_token.txt')
     if os.path.exists(valid_token_path):
@@ -215,8 +215,8 @@ def run(rows, token, env_config):
                 new_row['AuditedArea'] = round(final_area, 4)
                 new_row['Latitude'] = latitude
                 new_row['Longitude'] = longitude
-                new_row['Coordinates'] = json.dumps(coords)
-                new_row['GeoInfo'] = json.dumps(geo_payload)
+                new_row['Coordinates'] = json.dumps(coords, separators=(',', ':'))
+                new_row['GeoInfo'] = json.dumps(geo_payload, separators=(',', ':'))
             else:
                 err_Msg = audit_resp.json().get('message', 'Unknown Error') or audit_resp.text
                 new_row['Status'] = 'Fail'
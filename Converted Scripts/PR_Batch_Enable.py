@@ -112,7 +112,8 @@ def run(data, token, env_config):
     import sys
     sys.argv = [sys.argv[0]]
     builtins.data = data
-    builtins.data_df = pd.DataFrame(data)
+    from components import row_stream as _row_stream
+    builtins.data_df = _row_stream.data_frame(data)
     import os
     valid_token_path = os.path.join(os.getcwd(), 'valid_token.txt')
     if os.path.exists(valid_token_path):
@@ -211,78 +212,61 @@ def run(data, token, env_config):
         url = f'{base_url}{api_path}'
         headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
         batch_size = 25
-        indexed_data = []
-        for i, row in enumerate(data):
+        import components.batch_utils as batch_utils
+
+        def build_payload(row):
             try:
-                ca_id = row['croppableAreaId']
-                f_id = row['farmerId']
-                indexed_data.append({'croppableAreaId': ca_id, 'farmerId': f_id, '_original_row_index': i})
+                return {'croppableAreaId': row['croppableAreaId'], 'farmerId': row['farmerId']}
             except KeyError:
                 row['Status'] = 'Input Error'
                 row['API response'] = 'Missing required input column: croppableAreaId or farmerId.'
-        for i in range(0, len(indexed_data), batch_size):
-            batch = indexed_data[i:i + batch_size]
-            if not batch:
-                continue
-            payload = []
-            ca_id_map = {}
-            for item in batch:
-                ca_id = item['croppableAreaId']
-                f_id = item['farmerId']
-                index = item['_original_row_index']
-                payload.append({'croppableAreaId': ca_id, 'farmerId': f_id})
-                ca_id_map[str(ca_id)] = index
-            try:
-                print(f'[Log] Sending batch of {len(payload)} items...')
-                response = _log_post(url, headers=headers, json=payload)
-                status_code = response.status_code
-                if status_code == 200:
-                    try:
-                        response_json = response.json()
-                        sr_plot_details = response_json.get('srPlotDetails', {})
-                        for ca_id_str, detail in sr_plot_details.items():
-                            original_index = ca_id_map.get(ca_id_str)
-                            if original_index is not None:
-                                row = data[original_index]
-                                item_status = detail.get('status', 'Unknown')
-                                if item_status == 'SF_VALIDATION_FAILED' or item_status == 'Failed':
-                                    row['Status'] = 'Failed'
-                                else:
-                                    row['Status'] = 'Success'
-                                row['Code'] = status_code
-                                message = detail.get('message', detail.get('error', f'No message found in details for CA {ca_id_str}'))
-                                row['API response'] = message
-                                sr_plot_id = detail.get('srPlotId')
-                                if sr_plot_id:
-                                    row['srPlotId'] = sr_plot_id
-                    except json.JSONDecodeError:
-                        error_msg = f'Request successful but failed to decode JSON response. Raw response snippet: {response.text[:200]}'
-                        for original_index in ca_id_map.values():
-                            row = data[original_index]
-                            row['Status'] = 'Failed (JSON Error)'
-                            row['Code'] = status_code
-                            row['API response'] = error_msg
-                else:
-                    try:
-                        response_data = response.json()
-                    except json.JSONDecodeError:
-                        response_data = response.text
-                    error_response_str = json.dumps(response_data) if isinstance(response_data, dict) else str(response_data)
-                    for original_index in ca_id_map.values():
-                        row = data[original_index]
-                        row['Status'] = 'Failed'
-                        row['Code'] = status_code
-                        row['API response'] = f'API Call Failed (Status {status_code}). Response: {error_response_str}'
-            except requests.RequestException as e:
-                error_msg = str(e)
-                for original_index in ca_id_map.values():
-                    row = data[original_index]
-                    row['Status'] = 'Failed'
-                    row['Code'] = 'Exception'
-                    row['API response'] = f'Request Exception: {error_msg}'
-                    row['Status'] = 'Failed'
-                    row['Code'] = 'Exception'
-                    row['API response'] = f'Request Exception: {error_msg}'
+                return None
+
+        def send_batch(payload):
+            print(f'[Log] Sending batch of {len(payload)} items...')
+            response = _log_post(url, headers=headers, json=payload)
+            if response.status_code != 200:
+                try:
+                    response_data = response.json()
+                except json.JSONDecodeError:
+                    response_data = response.text
+                raise batch_utils.BatchRequestError(response.status_code, response_data)
+            response_json = response.json()
+            return {str(k): v for k, v in response_json.get('srPlotDetails', {}).items()}
+
+        def apply_result(row, detail):
+            if detail is None:
+                return
+            item_status = detail.get('status', 'Unknown')
+            if item_status == 'SF_VALIDATION_FAILED' or item_status == 'Failed':
+                row['Status'] = 'Failed'
+            else:
+                row['Status'] = 'Success'
+            row['Code'] = 200
+            message = detail.get('message', detail.get('error', f"No message found in details for CA {row['croppableAreaId']}"))
+            row['API response'] = message
+            sr_plot_id = detail.get('srPlotId')
+            if sr_plot_id:
+                row['srPlotId'] = sr_plot_id
+
+        def apply_error(row, e):
+            if isinstance(e, batch_utils.BatchRequestError):
+                response_data = e.body
+                error_response_str = json.dumps(response_data) if isinstance(response_data, dict) else str(response_data)
+                row['Status'] = 'Failed'
+                row['Code'] = e.status_code
+                row['API response'] = f'API Call Failed (Status {e.status_code}). Response: {error_response_str}'
+            elif isinstance(e, json.JSONDecodeError):
+                row['Status'] = 'Failed (JSON Error)'
+                row['Code'] = 200
+                row['API response'] = f'Request successful but failed to decode JSON response. Error: {e}'
+            else:
+                row['Status'] = 'Failed'
+                row['Code'] = 'Exception'
+                row['API response'] = f'Request Exception: {str(e)}'
+
+        # Several 25-item batches in flight at once; results mapped back by croppableAreaId
+        batch_utils.run_batched(data, build_payload, send_batch, apply_result, key_func=lambda p: p['croppableAreaId'], batch_size=batch_size, max_concurrent=4, apply_error=apply_error)
         import builtins
         if hasattr(builtins, 'data_df'):
             del builtins.data_df
@@ -291,8 +275,10 @@ def run(data, token, env_config):
     try:
         if hasattr(builtins, 'data_df'):
             import pandas as pd
-            if isinstance(builtins.data_df, pd.DataFrame):
-                res = builtins.data_df.where(pd.notnull(builtins.data_df), None).to_dict(orient='records')
+            from components import row_stream as _row_stream
+            _df = _row_stream.loaded_frame(builtins.data_df)
+            if _df is not None:
+                res = _df.where(pd.notnull(_df), None).to_dict(orient='records')
     except Exception as e:
         print(f'[Warn] Failed to sync data_df to result: {e}')
     return res
\ No newline at end of file
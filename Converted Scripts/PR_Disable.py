@@ -109,7 +109,8 @@ def run(data, token, env_config):
     import sys
     sys.argv = [sys.argv[0]]
     builtins.data = data
-    builtins.data_df = pd.DataFrame(data)
+    from components import row_stream as _row_stream
+    builtins.data_df = _row_stream.data_frame(data)
     import os
     valid_token_path = os.path.join(os.getcwd(), 'valid_token.txt')
     if os.path.exists(valid_token_path):
@@ -319,7 +320,8 @@ def run(data, token, env_config):
         import sys
         sys.argv = [sys.argv[0]]
         builtins.data = data
-        builtins.data_df = pd.DataFrame(data)
+        from components import row_stream as _row_stream
+        builtins.data_df = _row_stream.data_frame(data)
         import os
         valid_token_path = os.path.join(os.getcwd(), 'valid_token.txt')
         if os.path.exists(valid_token_path):
@@ -669,8 +671,10 @@ def run(data, token, env_config):
     try:
         if hasattr(builtins, 'data_df'):
             import pandas as pd
-            if isinstance(builtins.data_df, pd.DataFrame):
-                res = builtins.data_df.where(pd.notnull(builtins.data_df), None).to_dict(orient='records')
+            from components import row_stream as _row_stream
+            _df = _row_stream.loaded_frame(builtins.data_df)
+            if _df is not None:
+                res = _df.where(pd.notnull(_df), None).to_dict(orient='records')
     except Exception as e:
         print(f'[Warn] Failed to sync data_df to result: {e}')
     return res
\ No newline at end of file
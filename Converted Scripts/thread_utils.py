@@ -1,75 +1,445 @@
 import concurrent.futures
 import builtins
+import time
+from collections.abc import Mapping, MutableMapping
 
-def run_in_parallel(process_func, items, max_workers=None, token=None, env_config=None):
+def _default_workers(env_config):
+    # Default to 1 (No multi-threading), but respect batchSize from env_config if present
+    max_workers = 1
+    if env_config and 'batchSize' in env_config:
+        try:
+            max_workers = int(env_config['batchSize'])
+        except:
+            pass
+    return max_workers
+
+def _inject_context(token, env_config):
+    # Inject token and env_config into builtins so they're accessible in process_func
+    # This is needed because ThreadPoolExecutor doesn't easily pass extra context
+    if token is not None:
+        builtins.token = token
+    if env_config is not None:
+        builtins.env_config = env_config
+        # DEBUG: Check if token is present in env_config
+        token_status = "PRESENT" if 'token' in env_config else "MISSING"
+        print(f"DEBUG: thread_utils injected env_config. Token: {token_status}", flush=True)
+
+def run_in_parallel(process_func, items, max_workers=None, token=None, env_config=None,
+                    on_result=None, ordered=True, collect=True, window=None, defer_transient=True):
     if max_workers is None:
-        # Default to 1 (No multi-threading), but respect batchSize from env_config if present
-        max_workers = 1
-        if env_config and 'batchSize' in env_config:
-            try:
-                max_workers = int(env_config['batchSize'])
-            except:
-                pass
+        max_workers = _default_workers(env_config)
     """
     Runs process_func on each item in items list in parallel.
     Maintains the order of results corresponding to items.
-    
+
+    Items are fed to the executor through a bounded window (default 2 x max_workers
+    outstanding tasks), so futures/closures held at once depend on concurrency,
+    not on input size. Lists and lazy iterables (e.g. streamed NDJSON rows) are
+    both supported.
+
     Args:
         process_func (callable): Function that takes a single item and returns the result.
-        items (list): List of items to process.
+        items (list or iterable): Items to process.
         max_workers (int): Number of parallel threads.
         token (str, optional): Bearer token to inject into builtins for process_func.
         env_config (dict, optional): Environment configuration to inject into builtins for process_func.
-        
+        on_result (callable, optional): Called as on_result(index, result) as results finish,
+            e.g. to flush them to a file. In input order if ordered=True, else completion order.
+        ordered (bool): Keep input order for the returned list and on_result (default True).
+        collect (bool): Return the list of results. Set False together with on_result to keep
+            memory bounded on very large inputs (returns the number of processed items).
+        window (int, optional): Max outstanding tasks. Defaults to 2 x max_workers.
+        defer_transient (bool): Park rows that hit timeouts/429/5xx and retry them later with
+            backoff instead of blocking the worker (components/retry_queue.py). A row whose
+            POST/PUT calls may already have been applied is never re-run. Set
+            env_config['retryMaxDeferred'] to change the number of retries (0 disables).
+            With env_config['rowTimings'] = True, dict results get '_elapsed_ms' and '_http_calls'
+            fields (components/metrics.py).
+
+    Cancellation (components/cancellation.py): once the run is cancelled or past its deadline,
+    no new rows are started; rows in flight finish and only their results are returned.
+
     Returns:
-        list: List of results in the same order as input items.
+        list: List of results (input order unless ordered=False), or int count if collect=False.
     """
-    # Inject token and env_config into builtins so they're accessible in process_func
-    # This is needed because ThreadPoolExecutor doesn't easily pass extra context
-    if token is not None:
-        builtins.token = token
-    if env_config is not None:
-        builtins.env_config = env_config
-        # DEBUG: Check if token is present in env_config
-        token_status = "PRESENT" if 'token' in env_config else "MISSING"
-        print(f"DEBUG: thread_utils injected env_config. Token: {token_status}", flush=True)
-    
-    results = [None] * len(items)
-    
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Map futures to their original index to preserve order
-        def wrapped_process(index, item):
+    _inject_context(token, env_config)
+
+    # Resumable runs: journal each row as soon as it finishes (components/run_journal.py)
+    try:
+        from components import run_journal
+        journal = run_journal.get_active()
+    except: journal = None
+
+    config = env_config if env_config is not None else getattr(builtins, 'env_config', None) or {}
+    row_timings = bool(config.get('rowTimings'))
+
+    # Per-row HTTP call counts / timings for the run summary
+    try:
+        from components import metrics
+    except: metrics = None
+
+    # Rows in flight may finish after a cancel (the interceptor refuses calls outside rows)
+    try:
+        from components import cancellation
+    except: cancellation = None
+
+    # Deferred retries for transient failures
+    retry_queue = None
+    max_deferred = 0
+    if defer_transient:
+        try:
+            from components import retry_queue
+            max_deferred = int(config.get('retryMaxDeferred', retry_queue.DEFAULTS['max_attempts']))
+        except: retry_queue = None
+        if max_deferred <= 0:
+            retry_queue = None
+
+    def wrapped_process(index, item):
+        started = time.perf_counter()
+        if metrics is not None:
+            metrics.begin_row()
+        if cancellation is not None:
+            cancellation.begin_row()
+        try:
+            # Set thread-local context for attribute injection
+            from components import attribute_utils
+            attribute_utils.set_current_row(item)
+        except: pass
+        reason = None
+        if journal is not None:
+            # Lets a unit retried after a worker crash tell unfinished rows from unstarted ones
             try:
-                # Set thread-local context for attribute injection
-                from components import attribute_utils
-                attribute_utils.set_current_row(item)
-            except: pass
-            return process_func(item)
-
-        future_to_index = {
-            executor.submit(wrapped_process, i, item): i 
-            for i, item in enumerate(items)
-        }
-        
-        for future in concurrent.futures.as_completed(future_to_index):
-            index = future_to_index[future]
+                journal.mark_item_started(item)
+            except Exception as e:
+                print(f"⚠️  [JOURNAL] Failed to mark row started: {e}", flush=True)
+        try:
+            if retry_queue is None:
+                result = process_func(item)
+            else:
+                retry_queue.begin_row()
+                try:
+                    try:
+                        result = process_func(item)
+                    except Exception as e:
+                        # Timeout/connection error escaping the row: retry it later, but only if
+                        # none of its mutating calls may have gone through (it re-runs from the start)
+                        if not retry_queue.is_retryable_exception(e) or retry_queue.row_mutated():
+                            raise
+                        retry_queue.mark_transient(type(e).__name__)
+                        result = _error_result(item, e)
+                    reason = retry_queue.take_transient()
+                finally:
+                    retry_queue.end_row()
+        finally:
+            if cancellation is not None:
+                cancellation.end_row()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            # A deferred attempt is not a finished row: only its HTTP calls count
+            http_calls = metrics.end_row(None if reason else elapsed_ms)[0] if metrics is not None else None
+        if reason:
+            return retry_queue.Deferred(reason, result)
+        if row_timings and isinstance(result, MutableMapping):
+            result['_elapsed_ms'] = round(elapsed_ms, 1)
+            if http_calls is not None:
+                result['_http_calls'] = http_calls
+        if journal is not None:
             try:
-                results[index] = future.result()
+                journal.record_item(item, result)
             except Exception as e:
-                # Fallback error handling if process_func crashes completely
-                # Try to return something meaningful based on input type
-                original = items[index]
-                if isinstance(original, dict):
-                    err_res = original.copy()
+                print(f"⚠️  [JOURNAL] Failed to record row: {e}", flush=True)
+        return result
+
+    if window is None:
+        window = max(1, max_workers) * 2
+
+    return _run_windowed(wrapped_process, items, max_workers, window, on_result, ordered, collect,
+                         retry_queue=retry_queue, max_deferred=max_deferred)
+
+def _run_windowed(wrapped_process, items, max_workers, window, on_result=None, ordered=True, collect=True,
+                  retry_queue=None, max_deferred=0):
+    """
+    Keeps at most `window` rows outstanding (running, or finished but waiting for an earlier
+    row in ordered mode), feeding the next item as others complete.
+    With retry_queue, rows that came back Deferred are parked and re-submitted after a backoff.
+    After a cancel (components/cancellation.py) nothing new is submitted and parked rows fail.
+    """
+    try:
+        from components import metrics
+    except: metrics = None
+    try:
+        from components import cancellation
+    except: cancellation = None
+    results = [] if collect else None
+    count = 0
+    pending = {}
+    ready = {}  # ordered mode: finished results waiting for earlier indices
+    next_emit = 0
+    source = iter(enumerate(items))
+    parked = retry_queue.DelayedQueue() if retry_queue is not None else None
+
+    def emit(index, result):
+        if on_result is not None:
+            on_result(index, result)
+        if collect and not ordered:
+            results.append(result)
+
+    def complete(index, result):
+        nonlocal count, next_emit
+        count += 1
+        if not ordered:
+            emit(index, result)
+            return
+        if collect:
+            results[index] = result
+        if on_result is not None:
+            ready[index] = result
+            while next_emit in ready:
+                on_result(next_emit, ready.pop(next_emit))
+                next_emit += 1
+
+    def cancelled():
+        return cancellation is not None and cancellation.is_cancelled()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit(index, item, attempt, snapshot):
+            # Map futures to their original index to preserve order
+            pending[executor.submit(wrapped_process, index, item)] = (index, item, attempt, snapshot)
+
+        def fill():
+            if cancelled():
+                # Stop dispatching: parked rows keep their failure, unread items are not started
+                if parked is not None:
+                    for index, item, attempt, snapshot in parked.pop_due(float('inf')):
+                        complete(index, _fail_result(item, f"Cancelled before retry: {cancellation.reason()}"))
+                return
+            if parked is not None:
+                for entry in parked.pop_due():
+                    submit(*entry)
+            # Finished results waiting for a slow earlier row count against the window too, so
+            # a stalled head row holds back new submissions instead of growing the buffer
+            while len(pending) + len(ready) < window:
+                try:
+                    index, item = next(source)
+                except StopIteration:
+                    return
+                if collect and ordered:
+                    results.append(None)
+                # Input snapshot so a deferred row is retried from its original values
+                snapshot = dict(item) if parked is not None and isinstance(item, MutableMapping) else None
+                submit(index, item, 0, snapshot)
+
+        fill()
+        while pending or parked:
+            if not pending:
+                # Only parked rows left: wait for the next one to become due
+                if cancellation is not None:
+                    cancellation.wait(parked.seconds_until_next() or 0)
                 else:
-                    err_res = {"input": str(original)}
-                    
-                err_res['Status'] = 'Fail'
-                err_res['API_Response'] = f"Thread Execution Error: {str(e)}"
-                results[index] = err_res
-                
+                    time.sleep(parked.seconds_until_next() or 0)
+                fill()
+                continue
+            timeout = parked.seconds_until_next() if parked else None
+            done, _ = concurrent.futures.wait(pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                index, item, attempt, snapshot = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = _error_result(item, e)
+
+                if parked is not None and isinstance(result, retry_queue.Deferred):
+                    if attempt < max_deferred and not cancelled():
+                        if snapshot is not None:
+                            item.clear()
+                            item.update(snapshot)
+                        parked.park((index, item, attempt + 1, snapshot), attempt + 1)
+                        if metrics is not None:
+                            metrics.count('deferred_rows', result.reason)
+                        print(f"🕒 [RETRY] Row {index + 1} deferred ({result.reason}); "
+                              f"retry {attempt + 1}/{max_deferred} after backoff", flush=True)
+                        continue
+                    if result.result is None:
+                        result = _fail_result(item, f"Transient failure after {attempt} retries: {result.reason}")
+                    else:
+                        result = result.result
+                complete(index, result)
+            fill()
+
+    if parked is not None and parked.parked_total:
+        print(f"🕒 [RETRY] {parked.parked_total} deferred retries for transient failures", flush=True)
+    if cancelled():
+        print(f"🛑 [CANCEL] Stopped after {count} rows ({cancellation.reason()}); returning partial results", flush=True)
+    return results if collect else count
+
+def run_grouped(process_group, items, group_by, max_workers=None, token=None, env_config=None,
+                max_group_size=None):
+    """
+    Runs process_group once per group of rows sharing the same group_by value.
+
+    Rows of one group are handled by a single task (serialised), different groups run
+    in parallel. Largest groups are scheduled first so one big group does not end up
+    running alone at the end. Results are scattered back to the original row order.
+
+    Balancing cannot split a group on its own: its rows are serialised on purpose (shared
+    parent record, one bulk call, ...), so one group holding most of the rows still runs on
+    a single worker and bounds the run time (logged). If the rows of a group are independent,
+    pass max_group_size to cut big groups into chunks of at most that many rows; chunks of
+    the same key then run in parallel and process_group is called once per chunk.
+
+    Each row is journaled (components/run_journal.py) and counted in the row metrics like
+    run_in_parallel rows; a group's time and HTTP calls are shared equally by its rows.
+
+    Args:
+        process_group (callable): process_group(key, rows) -> list with one result per row
+            (same order), or None if the rows were updated in place.
+        items (list or iterable): Rows to process.
+        group_by (str): Column to group on (matched like get_cell_value: case/space/'_' tolerant).
+        max_workers (int): Number of parallel threads (defaults like run_in_parallel).
+        token (str, optional): Bearer token to inject into builtins.
+        env_config (dict, optional): Environment configuration to inject into builtins.
+        max_group_size (int, optional): Split groups larger than this into chunks.
+
+    Returns:
+        list: One result per input row, in input order. Rows without a group_by value
+              get a 'Fail' result instead of being processed. After a cancel, rows of
+              groups that never started are left out.
+    """
+    from components import row_utils
+
+    if max_workers is None:
+        max_workers = _default_workers(env_config)
+    _inject_context(token, env_config)
+    config = env_config if env_config is not None else getattr(builtins, 'env_config', None) or {}
+    row_timings = bool(config.get('rowTimings'))
+
+    try:
+        from components import run_journal
+        journal = run_journal.get_active()
+    except: journal = None
+    try:
+        from components import metrics
+    except: metrics = None
+    try:
+        from components import cancellation
+    except: cancellation = None
+
+    rows = items if isinstance(items, list) else list(items)
+    results = [None] * len(rows)
+    has_result = [False] * len(rows)
+
+    # 1. Partition (dict keeps first-seen order of keys)
+    groups = {}
+    for index, row in enumerate(rows):
+        key = row_utils.get_value(row, group_by, None) if isinstance(row, Mapping) else None
+        if key is None or str(key).strip() == '':
+            results[index] = _fail_result(row, f"Missing value for group column '{group_by}'")
+            has_result[index] = True
+            continue
+        groups.setdefault(str(key).strip(), []).append(index)
+
+    if not groups:
+        return results
+
+    # 2. Optional split, then largest groups first (LPT balancing across workers)
+    units = []
+    for key, indices in groups.items():
+        if max_group_size and len(indices) > max_group_size:
+            units.extend((key, indices[i:i + max_group_size]) for i in range(0, len(indices), max_group_size))
+        else:
+            units.append((key, indices))
+    units.sort(key=lambda unit: len(unit[1]), reverse=True)
+
+    largest_key, largest = units[0]
+    fair_share = -(-len(rows) // max(1, max_workers))
+    if max_workers > 1 and len(largest) > fair_share:
+        print(f"⚠️  [GROUPS] Group '{largest_key}' has {len(largest)} of {len(rows)} rows and runs on one worker; "
+              f"pass max_group_size to split it if its rows are independent", flush=True)
+
+    def run_group(unit_index, unit):
+        key, indices = unit
+        group_rows = [rows[i] for i in indices]
+        started = time.perf_counter()
+        if metrics is not None:
+            metrics.begin_row()
+        if cancellation is not None:
+            cancellation.begin_row()
+        try:
+            # Attribute injection context: first row of the group
+            from components import attribute_utils
+            attribute_utils.set_current_row(group_rows[0])
+        except: pass
+        if journal is not None:
+            try:
+                for row in group_rows:
+                    journal.mark_item_started(row)
+            except Exception as e:
+                print(f"⚠️  [JOURNAL] Failed to mark rows started: {e}", flush=True)
+        try:
+            group_results = process_group(key, group_rows)
+            if group_results is None:
+                group_results = group_rows
+            if len(group_results) != len(group_rows):
+                raise ValueError(f"process_group returned {len(group_results)} results for {len(group_rows)} rows")
+        except Exception as e:
+            group_results = [_error_result(row, e) for row in group_rows]
+        finally:
+            if cancellation is not None:
+                cancellation.end_row()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            http_calls, http_ms = metrics.end_row() if metrics is not None else (None, 0.0)
+
+        # Per-row share of the group's time and calls
+        share = len(group_rows)
+        if metrics is not None:
+            for _ in group_rows:
+                metrics.observe_row(elapsed_ms / share, http_calls / share, http_ms / share)
+        for row, result in zip(group_rows, group_results):
+            if row_timings and isinstance(result, MutableMapping):
+                result['_elapsed_ms'] = round(elapsed_ms / share, 1)
+                if http_calls is not None:
+                    result['_http_calls'] = round(http_calls / share, 2)
+            if journal is not None:
+                try:
+                    journal.record_item(row, result)
+                except Exception as e:
+                    print(f"⚠️  [JOURNAL] Failed to record row: {e}", flush=True)
+        return group_results
+
+    # 3. Scatter back to input order as groups finish
+    def scatter(unit_index, group_results):
+        for row_index, result in zip(units[unit_index][1], group_results):
+            results[row_index] = result
+            has_result[row_index] = True
+
+    # Groups are not deferred: a group may have partly run, so it retries in-thread instead
+    _run_windowed(run_group, units, max_workers, max(1, max_workers) * 2,
+                  on_result=scatter, ordered=False, collect=False)
+    if not all(has_result):
+        # Cancelled run: rows of groups that never started have no result
+        results = [result for result, done in zip(results, has_result) if done]
     return results
 
+def _error_result(original, e):
+    """
+    Fallback error handling if process_func crashes completely.
+    """
+    return _fail_result(original, f"Thread Execution Error: {str(e)}")
+
+def _fail_result(original, message):
+    """
+    Builds a 'Fail' result for an item that could not be processed.
+    Try to return something meaningful based on input type.
+    """
+    if isinstance(original, Mapping):
+        # dict() also detaches columnar Row views (components.row_store)
+        err_res = dict(original)
+    else:
+        err_res = {"input": str(original)}
+
+    err_res['Status'] = 'Fail'
+    err_res['API_Response'] = message
+    return err_res
+
 def create_lock():
     """
     Creates and returns a new threading.Lock object.
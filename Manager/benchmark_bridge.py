@@ -0,0 +1,436 @@
+"""
+Bridge Benchmark
+End-to-end benchmark of the execution pipeline (runner_bridge -> converted script ->
+thread_utils / master_search / interceptor) against Manager/mock_farm_server.py.
+
+For each script and size, a synthetic upload is written as NDJSON and runner_bridge is
+spawned exactly like /api/scripts/execute does (same flags, registry columns/rowStore/
+batchSize). Reported per run:
+    rows_per_sec        rows / wall time (and per processing phase, after startup)
+    row_ms p50/p95/max  per-row latency from '_elapsed_ms' (env_config rowTimings)
+    peak_rss_mb         peak resident memory of the bridge process
+    startup_s           spawn -> "Starting script execution" (imports, data load, setup)
+    bytes_in/out        request/response bytes seen by the mock API; stdout bytes of the bridge
+    status              Pass/Fail counts
+
+Results are written as JSON (default temp_data/benchmarks/bench_<timestamp>.json). Pass
+--baseline with an earlier results file to flag regressions (non-zero exit code).
+
+Usage:
+    python Manager/benchmark_bridge.py                                   # 1k/10k/100k, all scripts
+    python Manager/benchmark_bridge.py --sizes 1000 --scripts PR_Batch_Enable --latency lognormal:40,0.4
+    python Manager/benchmark_bridge.py --sizes 10000 --baseline temp_data/benchmarks/release_1.json
+"""
+
+import argparse
+import base64
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+MANAGER_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(MANAGER_DIR)
+SCRIPTS_DIR = os.path.join(PROJECT_ROOT, 'Converted Scripts')
+BRIDGE_PATH = os.path.join(MANAGER_DIR, 'runner_bridge.py')
+REGISTRY_PATH = os.path.join(PROJECT_ROOT, 'System', 'scripts_registry.json')
+DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'temp_data', 'benchmarks')
+
+sys.path.insert(0, MANAGER_DIR)
+import mock_farm_server  # noqa: E402
+
+# Names the mock seeds (first id of every seeded collection is 100000)
+MOCK_USERS = [f"User {100000 + i}" for i in range(10)]
+MOCK_TAGS = [f"Master {100000 + i}" for i in range(10)]
+
+START_MARKER = "Starting script execution"
+
+# Metrics compared against --baseline: (key, higher_is_better)
+REGRESSION_METRICS = [
+    ('rows_per_sec', True),
+    ('row_ms_p95', False),
+    ('peak_rss_mb', False),
+    ('startup_s', False),
+]
+
+
+# ---------------------------------------------------------------------------
+# Synthetic uploads
+# ---------------------------------------------------------------------------
+
+def _square(rnd, size=0.002):
+    lon, lat = rnd.uniform(73, 80), rnd.uniform(12, 22)
+    return [[[lon, lat], [lon + size, lat], [lon + size, lat + size], [lon, lat + size], [lon, lat]]]
+
+
+def rows_add_farmer(i, rnd):
+    return {
+        'Farmer Name': f"Bench Farmer {i}",
+        'Farmer Code': f"BF{i:07d}",
+        'Phone Number': f"91 9{i:09d}",
+        'AssignedTo': MOCK_USERS[i % len(MOCK_USERS)],
+        'Address': f"Bench Town {i % 500}, Maharashtra",
+        'Address Component (non mandatory)': '',
+    }
+
+
+def rows_area_audit_v2(i, rnd):
+    return {
+        'CAName': f"Bench CA {i}",
+        'CA_ID': 500000 + i,
+        'Coordinates': json.dumps(_square(rnd), separators=(',', ':')),
+    }
+
+
+def rows_add_farmer_tag(i, rnd):
+    return {
+        'Farmer Name': f"Bench Farmer {i}",
+        'Farmer ID': 100000 + (i % 5000),
+        'Tag Name': MOCK_TAGS[i % len(MOCK_TAGS)],
+    }
+
+
+def rows_pr_batch_enable(i, rnd):
+    return {
+        'croppableAreaName': f"Bench CA {i}",
+        'croppableAreaId': 500000 + i,
+        'farmerId': 100000 + (i % 5000),
+    }
+
+
+SCRIPTS = {
+    'Add_Farmer': rows_add_farmer,
+    'Area_Audit_V2': rows_area_audit_v2,
+    'Add_Farmer_Tag': rows_add_farmer_tag,
+    'PR_Batch_Enable': rows_pr_batch_enable,
+}
+
+
+def write_upload(path, script, size, seed=0):
+    """Synthetic rows for `script` as NDJSON (same format api.js writes)."""
+    rnd = random.Random(seed)
+    factory = SCRIPTS[script]
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(size):
+            f.write(json.dumps(factory(i, rnd), separators=(',', ':')))
+            f.write('\n')
+    return os.path.getsize(path)
+
+
+def registry_entry(script):
+    try:
+        with open(REGISTRY_PATH, 'r', encoding='utf-8') as f:
+            registry = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    filename = f"{script}.py"
+    return next((e for e in registry if e.get('filename') == filename or e.get('name') == filename), {})
+
+
+def fake_token(hours=12):
+    """Unsigned JWT with a far expiry (the mock only checks for a Bearer header)."""
+    def b64(obj):
+        return base64.urlsafe_b64encode(json.dumps(obj).encode()).rstrip(b'=').decode()
+    claims = {'preferred_username': 'bench', 'tenant': 'bench', 'exp': int(time.time()) + hours * 3600}
+    return f"{b64({'alg': 'none', 'typ': 'JWT'})}.{b64(claims)}.bench"
+
+
+# ---------------------------------------------------------------------------
+# Running the bridge
+# ---------------------------------------------------------------------------
+
+def _mock_call(base, path, method='GET'):
+    request = urllib.request.Request(base + path, method=method, data=b'' if method == 'POST' else None)
+    with urllib.request.urlopen(request, timeout=10) as resp:
+        return json.loads(resp.read())
+
+
+class _PeakRss:
+    """Peak RSS of a child process (wait4 rusage on POSIX, psutil polling elsewhere)."""
+
+    def __init__(self, proc):
+        self.proc = proc
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+        try:
+            import psutil
+            self._ps = psutil.Process(proc.pid)
+        except Exception:
+            self._ps = None
+        if self._ps is not None and not hasattr(os, 'wait4'):
+            self._thread = threading.Thread(target=self._poll, daemon=True)
+            self._thread.start()
+
+    def _poll(self):
+        while not self._stop.is_set():
+            try:
+                info = self._ps.memory_info()
+                self.peak = max(self.peak, getattr(info, 'peak_wset', 0) or info.rss)
+            except Exception:
+                return
+            self._stop.wait(0.05)
+
+    def wait(self):
+        """Reap the process; returns (returncode, peak_rss_bytes or None)."""
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(self.proc.pid, 0)
+            self.proc.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is KiB on Linux, bytes on macOS
+            scale = 1 if sys.platform == 'darwin' else 1024
+            return self.proc.returncode, usage.ru_maxrss * scale
+        returncode = self.proc.wait()
+        self._stop.set()
+        return returncode, self.peak or None
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return round(ordered[low] + (ordered[high] - ordered[low]) * (k - low), 2)
+
+
+def parse_result(stdout_text):
+    """Bridge result object (text after the last ---JSON_START---)."""
+    parts = stdout_text.split('---JSON_START---')
+    if len(parts) < 2:
+        raise ValueError("No JSON start delimiter found in bridge output")
+    result = json.loads(parts[-1].strip())
+    if result.get('status') == 'error':
+        raise ValueError(result.get('message'))
+    return result
+
+
+def run_once(script, size, base, args, work_dir):
+    entry = registry_entry(script)
+    data_path = os.path.join(work_dir, f"{script}_{size}.ndjson")
+    upload_bytes = write_upload(data_path, script, size, seed=args.seed)
+
+    env_config = {
+        'environment': 'Bench',
+        'tenant': 'bench',
+        'apiBaseUrl': base,
+        'batchSize': args.batch_size or entry.get('batchSize') or 10,
+        'rowTimings': True,
+        'Geocoding_api_key': 'bench',
+        'urlRewrites': {'https://maps.googleapis.com': f"{base}/google"},
+    }
+    env_config.update(args.env_overrides)
+    columns = entry.get('expected_columns') or [c.get('name') or c.get('header') for c in entry.get('columns') or []]
+    row_store = args.row_store or ('columnar' if entry.get('rowStore') == 'columnar' else 'dict')
+
+    cmd = [
+        args.python, '-u', BRIDGE_PATH,
+        '--script', os.path.join(SCRIPTS_DIR, f"{script}.py"),
+        '--data-file', data_path,
+        '--data-format', 'ndjson',
+        '--token', fake_token(),
+        '--env', json.dumps(env_config),
+        '--columns', json.dumps(columns),
+        '--row-store', row_store,
+    ]
+    if args.stream_input or entry.get('streamInput') is True:
+        cmd.append('--stream-input')
+    if args.log_level:
+        cmd += ['--log-level', args.log_level]
+
+    env = dict(os.environ, PYTHONIOENCODING='utf-8')
+    env['PYTHONPATH'] = os.pathsep.join(p for p in (env.get('PYTHONPATH'), PROJECT_ROOT) if p)
+
+    _mock_call(base, '/__reset', 'POST')
+    print(f"▶️  {script} x {size} rows (batchSize={env_config['batchSize']}, rowStore={row_store})", flush=True)
+
+    started = time.perf_counter()
+    startup_s = None
+    stdout_bytes = 0
+    chunks = []
+    proc = subprocess.Popen(cmd, cwd=PROJECT_ROOT, env=env, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT if args.verbose else subprocess.DEVNULL)
+    rss = _PeakRss(proc)
+    for line in proc.stdout:
+        stdout_bytes += len(line)
+        text = line.decode('utf-8', errors='replace')
+        if startup_s is None and START_MARKER in text:
+            startup_s = time.perf_counter() - started
+        if args.verbose:
+            sys.stdout.write(text)
+        chunks.append(text)
+    returncode, peak_rss = rss.wait()
+    wall_s = time.perf_counter() - started
+    mock_stats = _mock_call(base, '/__stats')
+    os.remove(data_path)
+
+    record = {
+        'script': script,
+        'rows': size,
+        'batch_size': env_config['batchSize'],
+        'row_store': row_store,
+        'returncode': returncode,
+        'wall_s': round(wall_s, 3),
+        'startup_s': round(startup_s, 3) if startup_s is not None else None,
+        'peak_rss_mb': round(peak_rss / 1048576, 1) if peak_rss else None,
+        'upload_bytes': upload_bytes,
+        'stdout_bytes': stdout_bytes,
+        'http_requests': mock_stats['requests'],
+        'bytes_in': mock_stats['bytes_in'],
+        'bytes_out': mock_stats['bytes_out'],
+        'http_routes': {name: r['requests'] for name, r in mock_stats['routes'].items()},
+    }
+    try:
+        result = parse_result(''.join(chunks))
+    except ValueError as e:
+        record['error'] = str(e)
+        print(f"❌ {script} x {size}: {e}", flush=True)
+        return record
+    rows = result.get('data') or []
+    if result.get('metrics'):
+        # Bridge-side view (components/metrics.py): endpoint histograms, cache hit rates, retries
+        record['bridge_metrics'] = result['metrics']
+
+    elapsed = [r['_elapsed_ms'] for r in rows if isinstance(r, dict) and isinstance(r.get('_elapsed_ms'), (int, float))]
+    statuses = {}
+    for r in rows:
+        status = str(r.get('Status', 'Unknown')) if isinstance(r, dict) else 'Unknown'
+        statuses[status] = statuses.get(status, 0) + 1
+    processing_s = wall_s - (startup_s or 0)
+    record.update({
+        'result_rows': len(rows),
+        'status': statuses,
+        'rows_per_sec': round(size / wall_s, 2) if wall_s else None,
+        'rows_per_sec_processing': round(size / processing_s, 2) if processing_s > 0 else None,
+        'row_ms_p50': _percentile(elapsed, 50),
+        'row_ms_p95': _percentile(elapsed, 95),
+        'row_ms_max': round(max(elapsed), 2) if elapsed else None,
+        'row_ms_mean': round(statistics.fmean(elapsed), 2) if elapsed else None,
+    })
+    print(f"   {record['rows_per_sec']} rows/s | p50 {record['row_ms_p50']} ms | p95 {record['row_ms_p95']} ms | "
+          f"RSS {record['peak_rss_mb']} MB | startup {record['startup_s']} s | "
+          f"{record['http_requests']} requests, {record['bytes_in'] + record['bytes_out']} bytes | {statuses}", flush=True)
+    return record
+
+
+# ---------------------------------------------------------------------------
+# Baseline comparison
+# ---------------------------------------------------------------------------
+
+def compare(results, baseline, tolerance):
+    """Regressions vs an earlier results file: list of human-readable findings."""
+    previous = {(r['script'], r['rows']): r for r in baseline.get('results', [])}
+    findings = []
+    for record in results:
+        before = previous.get((record['script'], record['rows']))
+        if not before:
+            continue
+        for key, higher_is_better in REGRESSION_METRICS:
+            old, new = before.get(key), record.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            if worse > tolerance:
+                findings.append(f"{record['script']} x {record['rows']}: {key} {old} -> {new} ({change:+.0%})")
+    return findings
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="End-to-end runner_bridge benchmark against the local mock API")
+    parser.add_argument("--scripts", default=','.join(SCRIPTS), help=f"Comma-separated subset of: {', '.join(SCRIPTS)}")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated row counts")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per script/size")
+    parser.add_argument("--batch-size", type=int, help="Override the registry batchSize (worker threads)")
+    parser.add_argument("--row-store", choices=["dict", "columnar"], help="Override the registry rowStore")
+    parser.add_argument("--stream-input", action="store_true", help="Pass --stream-input to the bridge")
+    parser.add_argument("--env", dest="env_overrides", type=json.loads, default={}, help="Extra env_config JSON")
+    parser.add_argument("--log-level", choices=["error", "info", "debug"], default="error")
+    parser.add_argument("--latency", default="lognormal:40,0.4", help="Mock latency spec (see mock_farm_server.py)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--mock-url", help="Use an already running mock instead of starting one")
+    parser.add_argument("--python", default=sys.executable, help="Interpreter for runner_bridge")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Results file (default temp_data/benchmarks/bench_<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression (default 15%%)")
+    parser.add_argument("--verbose", action="store_true", help="Echo bridge output")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    scripts = [s.strip() for s in args.scripts.split(',') if s.strip()]
+    unknown = [s for s in scripts if s not in SCRIPTS]
+    if unknown:
+        sys.exit(f"Unknown script(s): {', '.join(unknown)}")
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+
+    server = None
+    if args.mock_url:
+        base = args.mock_url.rstrip('/')
+    else:
+        mock_args = ['--latency', args.latency, '--error-rate', str(args.error_rate),
+                     '--rate-limit-rate', str(args.rate_limit_rate), '--seed-farmers', '0',
+                     '--random-seed', str(args.seed)]
+        server = mock_farm_server.start_server(mock_args, port=0)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        print(f"🧪 Mock farm platform on {base} (latency {args.latency})", flush=True)
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix='bench_') as work_dir:
+            for script in scripts:
+                for size in sizes:
+                    for _ in range(max(1, args.repeat)):
+                        results.append(run_once(script, size, base, args, work_dir))
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'git_commit': _git_commit(),
+        'mock': {'latency': args.latency, 'error_rate': args.error_rate, 'rate_limit_rate': args.rate_limit_rate},
+        'results': results,
+    }
+
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"bench_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {output}", flush=True)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            findings = compare(results, json.load(f), args.tolerance)
+        if findings:
+            print(f"⚠️  {len(findings)} regression(s) vs {args.baseline}:")
+            for finding in findings:
+                print(f"   - {finding}")
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.tolerance:.0%} vs {args.baseline}")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Results Export
+Writes a job's results (NDJSON, one row per line) to Parquet in fixed-size row groups.
+
+Used by GET /api/jobs/:id/download?format=parquet (backend/api.js). The backend works
+out the column order (outputConfig.uiMapping first, see backend/export.js) and passes it
+in; rows are read line by line and written batch by batch, so memory is bounded by the
+batch size rather than the job size. No pandas involved.
+
+All columns are written as nullable strings: result rows mix numbers, text and nested
+objects per column, and one fixed schema keeps every row group compatible. Objects are
+stored as JSON text.
+
+Requires pyarrow (optional; the backend answers 501 when it is missing, exit code 3).
+
+Usage:
+    python Manager/export_results.py --input temp_data/jobs/<id>/results.ndjson \
+        --output out.parquet --columns '["Name", "Status"]'
+"""
+
+import argparse
+import json
+import sys
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXIT_MISSING_DEPENDENCY = 3
+
+
+def _cell(value):
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def export_parquet(input_path, output_path, columns, batch_rows=10000):
+    schema = pa.schema([(name, pa.string()) for name in columns])
+    writer = pq.ParquetWriter(output_path, schema, compression="snappy")
+    total = 0
+    try:
+        batch = {name: [] for name in columns}
+        pending = 0
+        with open(input_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    continue
+                for name in columns:
+                    batch[name].append(_cell(row.get(name)))
+                pending += 1
+                if pending >= batch_rows:
+                    writer.write_table(pa.table(batch, schema=schema))
+                    total += pending
+                    batch = {name: [] for name in columns}
+                    pending = 0
+        if pending or total == 0:
+            writer.write_table(pa.table(batch, schema=schema))
+            total += pending
+    finally:
+        writer.close()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export job results (NDJSON) to Parquet")
+    parser.add_argument("--input", required=True, help="results.ndjson of the job")
+    parser.add_argument("--output", required=True, help="Parquet file to write")
+    parser.add_argument("--columns", required=True, help="JSON list of column names, in order")
+    parser.add_argument("--batch-rows", type=int, default=10000, help="Rows per row group")
+    args = parser.parse_args()
+
+    if pa is None:
+        print("❌ [EXPORT] pyarrow is not installed (pip install pyarrow)", file=sys.stderr)
+        sys.exit(EXIT_MISSING_DEPENDENCY)
+
+    columns = json.loads(args.columns)
+    total = export_parquet(args.input, args.output, columns, max(1, args.batch_rows))
+    print(f"✅ [EXPORT] {total} rows -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,630 @@
+"""
+Mock Farm Platform Server
+Local stand-in for the farm API gateway (and Google geocoding) for offline load tests.
+
+Covers the endpoints the converted scripts and master_search use: farmers, assets,
+croppable-areas (+ area-audit, plot-risk batch), utilservice geojson/area, varieties,
+crop-stages, crops, master lists/filters, users, companies, places and the Google
+geocode API. Unknown ids are synthesised on GET (use --strict for 404s), so synthetic
+uploads work without seeding.
+
+Fault injection and realism:
+    --latency SPEC            default latency, e.g. fixed:40 | uniform:20-80 | normal:60,15 | lognormal:60,0.5
+    --route-latency NAME=SPEC per-route override (repeatable), e.g. geojson_area=lognormal:250,0.6
+    --error-rate 0.01         share of requests answered with 500/502/503
+    --rate-limit-rate 0.02    share of requests answered with 429 (+ Retry-After)
+    --max-inflight 50         429 when more requests than this are in flight (gateway limit)
+    --gzip                    gzip responses >= 1 KB when the client accepts it
+Paginated lists honour page/size and return X-Total-Count like the real gateway.
+
+Control endpoints:
+    GET  /__stats   request counts, bytes in/out, injected faults per route
+    POST /__reset   clear stats
+    POST /__config  JSON body with any of: latency, error_rate, rate_limit_rate, max_inflight
+
+Point a run at it with env_config:
+    {"apiBaseUrl": "http://127.0.0.1:8899",
+     "urlRewrites": {"https://maps.googleapis.com": "http://127.0.0.1:8899/google"}}
+
+Usage:
+    python Manager/mock_farm_server.py --port 8899 --latency lognormal:60,0.5 --error-rate 0.01
+"""
+
+import argparse
+import gzip
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ---------------------------------------------------------------------------
+# Latency / fault configuration
+# ---------------------------------------------------------------------------
+
+def parse_latency(spec):
+    """'kind:params' -> callable returning seconds."""
+    spec = (spec or 'fixed:0').strip()
+    kind, _, params = spec.partition(':')
+    kind = kind.lower()
+    if kind == 'fixed':
+        ms = float(params or 0)
+        return lambda: ms / 1000.0
+    if kind == 'uniform':
+        low, _, high = params.partition('-')
+        low, high = float(low), float(high or low)
+        return lambda: random.uniform(low, high) / 1000.0
+    if kind == 'normal':
+        mean, _, sd = params.partition(',')
+        mean, sd = float(mean), float(sd or 0)
+        return lambda: max(0.0, random.gauss(mean, sd)) / 1000.0
+    if kind == 'lognormal':
+        median, _, sigma = params.partition(',')
+        mu, sigma = math.log(max(float(median), 0.001)), float(sigma or 0.5)
+        return lambda: random.lognormvariate(mu, sigma) / 1000.0
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+class MockConfig:
+    def __init__(self, args):
+        self.lock = threading.Lock()
+        self.latency_spec = args.latency
+        self.latency = parse_latency(args.latency)
+        self.route_latency = {}
+        for item in args.route_latency or []:
+            name, _, spec = item.partition('=')
+            self.route_latency[name.strip()] = parse_latency(spec)
+        self.error_rate = args.error_rate
+        self.rate_limit_rate = args.rate_limit_rate
+        self.max_inflight = args.max_inflight
+        self.gzip = args.gzip
+        self.strict = args.strict
+        self.inflight = 0
+
+    def update(self, body):
+        with self.lock:
+            if 'latency' in body:
+                self.latency_spec = body['latency']
+                self.latency = parse_latency(body['latency'])
+            for name in ('error_rate', 'rate_limit_rate', 'max_inflight'):
+                if name in body:
+                    setattr(self, name, body[name])
+
+    def describe(self):
+        return {
+            'latency': self.latency_spec,
+            'route_latency': sorted(self.route_latency),
+            'error_rate': self.error_rate,
+            'rate_limit_rate': self.rate_limit_rate,
+            'max_inflight': self.max_inflight,
+            'gzip': self.gzip,
+            'strict': self.strict,
+        }
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.routes = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def record(self, route, status, bytes_in, bytes_out, fault=None):
+        with self.lock:
+            entry = self.routes.setdefault(route, {'requests': 0, 'status': {}, 'faults': {}})
+            entry['requests'] += 1
+            entry['status'][str(status)] = entry['status'].get(str(status), 0) + 1
+            if fault:
+                entry['faults'][fault] = entry['faults'].get(fault, 0) + 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'uptime_s': round(time.time() - self.started, 3),
+                'requests': sum(r['requests'] for r in self.routes.values()),
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'routes': json.loads(json.dumps(self.routes)),
+            }
+
+
+# ---------------------------------------------------------------------------
+# In-memory data
+# ---------------------------------------------------------------------------
+
+class Collection:
+    """Thread-safe id -> record store with synthesised records for unknown ids."""
+
+    def __init__(self, name, factory, strict=False, seed=0):
+        self.name = name
+        self.factory = factory
+        self.strict = strict
+        self.records = {}
+        self.ids = itertools.count(100000)
+        self.lock = threading.Lock()
+        for _ in range(seed):
+            self.create({})
+
+    def create(self, body):
+        with self.lock:
+            record_id = next(self.ids)
+            record = self.factory(record_id)
+            record.update({k: v for k, v in (body or {}).items() if v is not None})
+            record['id'] = record_id
+            self.records[record_id] = record
+            return record
+
+    def get(self, record_id):
+        try:
+            record_id = int(record_id)
+        except (TypeError, ValueError):
+            return None
+        with self.lock:
+            record = self.records.get(record_id)
+            if record is None and not self.strict:
+                record = self.factory(record_id)
+                record['id'] = record_id
+                self.records[record_id] = record
+            return record
+
+    def update(self, body):
+        record = self.get((body or {}).get('id'))
+        if record is None:
+            return None
+        with self.lock:
+            record.update(body)
+        return record
+
+    def search(self, query=None):
+        with self.lock:
+            records = list(self.records.values())
+        if query:
+            q = query.lower()
+            records = [r for r in records if q in str(r.get('name') or r.get('firstName') or '').lower()]
+        return records
+
+
+def _name(prefix, record_id):
+    return f"{prefix} {record_id}"
+
+
+def build_store(args):
+    strict = args.strict
+    return {
+        'farmers': Collection('farmers', lambda i: {'firstName': _name('Farmer', i), 'farmerCode': f"F{i}",
+                                                    'data': {'tags': []}, 'address': {}}, strict, args.seed_farmers),
+        'assets': Collection('assets', lambda i: {'name': _name('Asset', i), 'data': {'tags': []}}, strict, args.seed_assets),
+        'croppable_areas': Collection('croppable_areas', lambda i: {'name': _name('CA', i), 'cropAudited': False,
+                                                                    'auditedArea': {'count': 0}}, strict, 0),
+        'varieties': Collection('varieties', lambda i: {'name': _name('Variety', i), 'cropId': 1, 'cropStages': []},
+                                strict, args.seed_master),
+        'crop_stages': Collection('crop_stages', lambda i: {'name': _name('Stage', i), 'daysAfterSowing': i % 120},
+                                  strict, args.seed_master),
+        'crops': Collection('crops', lambda i: {'name': _name('Crop', i)}, strict, args.seed_master),
+        'places': Collection('places', lambda i: {'name': _name('Place', i)}, strict, 0),
+        'users': Collection('users', lambda i: {'name': _name('User', i), 'firstName': _name('User', i)},
+                            strict, args.seed_master),
+        'projects': Collection('projects', lambda i: {'name': _name('Project', i)}, strict, args.seed_master),
+        'master': Collection('master', lambda i: {'name': _name('Master', i)}, strict, args.seed_master),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Request helpers
+# ---------------------------------------------------------------------------
+
+def parse_multipart(body, content_type):
+    """Minimal multipart/form-data parser -> {field: text}."""
+    match = re.search(r'boundary="?([^";]+)"?', content_type or '')
+    if not match:
+        return {}
+    boundary = ('--' + match.group(1)).encode()
+    fields = {}
+    for part in body.split(boundary):
+        part = part.strip(b'\r\n')
+        if not part or part == b'--':
+            continue
+        head, _, content = part.partition(b'\r\n\r\n')
+        name = re.search(rb'name="([^"]+)"', head)
+        if name:
+            fields[name.group(1).decode()] = content.decode('utf-8', errors='replace')
+    return fields
+
+
+def request_json(handler, body):
+    content_type = handler.headers.get('Content-Type', '')
+    if 'multipart/form-data' in content_type:
+        fields = parse_multipart(body, content_type)
+        raw = fields.get('dto') or next(iter(fields.values()), '')
+    else:
+        raw = body.decode('utf-8', errors='replace') if body else ''
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def paginate(records, query):
+    try:
+        page = int(query.get('page', ['0'])[0])
+        size = int(query.get('size', ['20'])[0])
+    except ValueError:
+        page, size = 0, 20
+    start = page * size
+    return records[start:start + size], len(records)
+
+
+def polygon_area_acres(geo):
+    """Approximate area of every polygon ring in a FeatureCollection (equirectangular projection)."""
+    total_m2 = 0.0
+    lat_sum = lon_sum = points = 0
+
+    def rings(coords, depth):
+        if depth == 0:
+            yield coords
+        else:
+            for c in coords:
+                yield from rings(c, depth - 1)
+
+    for feature in (geo or {}).get('features', []):
+        geometry = feature.get('geometry') or {}
+        depth = {'Polygon': 1, 'MultiPolygon': 2}.get(geometry.get('type'), 1)
+        for ring in rings(geometry.get('coordinates') or [], depth):
+            if len(ring) < 3:
+                continue
+            lat0 = math.radians(sum(p[1] for p in ring) / len(ring))
+            xy = [(math.radians(p[0]) * 6371000 * math.cos(lat0), math.radians(p[1]) * 6371000) for p in ring]
+            total_m2 += abs(sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(xy, xy[1:] + xy[:1]))) / 2
+            for p in ring:
+                lon_sum += p[0]
+                lat_sum += p[1]
+                points += 1
+    return total_m2 / 4046.8564224, (lat_sum / points if points else None), (lon_sum / points if points else None)
+
+
+# ---------------------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------------------
+
+FARM = r'/services/farm/api'
+ROUTES = []
+
+
+def route(method, pattern, name):
+    def register(func):
+        ROUTES.append((method, re.compile(pattern + r'/?$'), name, func))
+        return func
+    return register
+
+
+def _list(collection):
+    def handler(ctx, match):
+        records, total = paginate(ctx.store[collection].search(ctx.query.get('query', [None])[0]), ctx.query)
+        return 200, records, {'X-Total-Count': str(total)}
+    return handler
+
+
+def _get(collection):
+    def handler(ctx, match):
+        record = ctx.store[collection].get(match.group('id'))
+        return (200, record) if record else (404, {'message': f"{collection} not found"})
+    return handler
+
+
+def _create(collection):
+    def handler(ctx, match):
+        body = ctx.json or {}
+        return 201, ctx.store[collection].create(body if isinstance(body, dict) else {})
+    return handler
+
+
+def _update(collection):
+    def handler(ctx, match):
+        body = ctx.json if isinstance(ctx.json, dict) else {}
+        if 'id' not in body and match.groupdict().get('id'):
+            body['id'] = match.group('id')
+        record = ctx.store[collection].update(body)
+        return (200, record) if record else (404, {'message': f"{collection} not found"})
+    return handler
+
+
+for _path, _coll in (('farmers', 'farmers'), ('assets', 'assets'), ('varieties', 'varieties'),
+                     ('crop-stages', 'crop_stages'), ('crops', 'crops'), ('place', 'places')):
+    _route = _coll
+    route('GET', rf'{FARM}/{_path}', f'{_route}_list')(_list(_coll))
+    route('POST', rf'{FARM}/{_path}', f'{_route}_create')(_create(_coll))
+    route('PUT', rf'{FARM}/{_path}', f'{_route}_update')(_update(_coll))
+    route('GET', rf'{FARM}/{_path}/(?P<id>\d+)', f'{_route}_get')(_get(_coll))
+    route('PUT', rf'{FARM}/{_path}/(?P<id>\d+)', f'{_route}_update')(_update(_coll))
+
+route('GET', rf'{FARM}/farmers/dropdownList', 'farmers_dropdown')(_list('farmers'))
+route('GET', rf'{FARM}/croppable-areas/(?P<id>\d+)', 'croppable_areas_get')(_get('croppable_areas'))
+route('PUT', rf'{FARM}/croppable-areas', 'croppable_areas_update')(_update('croppable_areas'))
+route('GET', rf'{FARM}/soil-types', 'soil_types')(_list('master'))
+route('GET', r'/services/master/api/irrigation-types', 'irrigation_types')(_list('master'))
+route('GET', r'/services/master/api/filter', 'master_filter')(_list('master'))
+route('GET', rf'{FARM}/projects/search', 'projects_search')(_list('projects'))
+route('GET', rf'{FARM}/plan-types', 'plan_types')(_list('master'))
+route('GET', rf'{FARM}/croppablearea/tasks', 'ca_tasks')(_list('master'))
+route('GET', r'/services/user/api/users/search/companies/(?P<company>\d+)', 'users_search')(_list('users'))
+
+
+@route('GET', r'/services/user/api/users/user-info', 'user_info')
+def user_info(ctx, match):
+    return 200, {'id': 1, 'login': 'mock.user', 'companyId': 1251, 'firstName': 'Mock'}
+
+
+@route('GET', rf'{FARM}/companies/(?P<id>\d+)', 'company_get')
+def company_get(ctx, match):
+    return 200, {'id': int(match.group('id')), 'name': 'Mock Company', 'data': {}, 'preferences': {}}
+
+
+@route('PUT', rf'{FARM}/croppable-areas/area-audit', 'area_audit')
+def area_audit(ctx, match):
+    body = ctx.json if isinstance(ctx.json, dict) else {}
+    record = ctx.store['croppable_areas'].update(body) if body.get('id') is not None else None
+    if record is None:
+        return 404, {'message': 'Croppable area not found'}
+    return 200, {'id': record['id'], 'message': 'Area audit updated'}
+
+
+@route('POST', rf'{FARM}/croppable-areas/(?P<id>\d+)/area-audit', 'area_audit_by_id')
+def area_audit_by_id(ctx, match):
+    return 200, {'id': int(match.group('id')), 'message': 'Area audit updated'}
+
+
+@route('POST', rf'{FARM}/croppable-areas/plot-risk/batch', 'plot_risk_batch')
+def plot_risk_batch(ctx, match):
+    items = ctx.json if isinstance(ctx.json, list) else []
+    details = {}
+    for item in items:
+        ca_id = str(item.get('croppableAreaId'))
+        if random.random() < 0.02:
+            details[ca_id] = {'status': 'SF_VALIDATION_FAILED', 'message': 'Mock validation failure'}
+        else:
+            details[ca_id] = {'status': 'SUCCESS', 'srPlotId': str(uuid.uuid4()), 'message': 'Plot risk enabled'}
+    return 200, {'srPlotDetails': details}
+
+
+@route('POST', rf'{FARM}/intelligence/croppable-areas/request', 'intelligence_request')
+def intelligence_request(ctx, match):
+    return 200, {'requestId': str(uuid.uuid4()), 'status': 'SUBMITTED'}
+
+
+@route('GET', rf'{FARM}/intelligence/croppable-areas/request/status', 'intelligence_status')
+def intelligence_status(ctx, match):
+    return 200, {'requestId': ctx.query.get('requestId', [''])[0], 'status': 'COMPLETED'}
+
+
+@route('GET', rf'{FARM}/plans/non-pops/ca', 'plans_non_pops')
+def plans_non_pops(ctx, match):
+    return 200, []
+
+
+@route('POST', rf'{FARM}/plans/non-pops/ca', 'plans_non_pops_create')
+def plans_non_pops_create(ctx, match):
+    return 201, {'id': random.randint(1, 10 ** 6), 'message': 'Plan created'}
+
+
+@route('POST', r'/services/utilservice/api/geojson/area', 'geojson_area')
+def geojson_area(ctx, match):
+    area, lat, lon = polygon_area_acres(ctx.json if isinstance(ctx.json, dict) else {})
+    return 200, {'auditedArea': round(area, 6), 'latitude': lat, 'longitude': lon}
+
+
+@route('POST', r'/services/utilservice/api/geojson', 'geojson')
+def geojson(ctx, match):
+    area, lat, lon = polygon_area_acres(ctx.json if isinstance(ctx.json, dict) else {})
+    return 200, {'area': round(area, 6), 'latitude': lat, 'longitude': lon}
+
+
+@route('GET', r'/google/maps/api/geocode/json', 'google_geocode')
+def google_geocode(ctx, match):
+    address = ctx.query.get('address', [''])[0]
+    rnd = random.Random(address)
+    lat, lng = rnd.uniform(-40, 50), rnd.uniform(-120, 140)
+    box = {'northeast': {'lat': lat + 0.05, 'lng': lng + 0.05}, 'southwest': {'lat': lat - 0.05, 'lng': lng - 0.05}}
+    return 200, {
+        'status': 'OK',
+        'results': [{
+            'formatted_address': address or 'Mock Place',
+            'place_id': f"mock-{abs(hash(address)) % 10 ** 8}",
+            'address_components': [
+                {'long_name': address or 'Mock', 'short_name': address or 'Mock', 'types': ['locality', 'political']},
+                {'long_name': 'Mockland', 'short_name': 'ML', 'types': ['country', 'political']},
+            ],
+            'geometry': {'location': {'lat': lat, 'lng': lng}, 'bounds': box, 'viewport': box},
+        }],
+    }
+
+
+# ---------------------------------------------------------------------------
+# HTTP handler
+# ---------------------------------------------------------------------------
+
+class _Context:
+    __slots__ = ('store', 'query', 'json')
+
+    def __init__(self, store, query, body):
+        self.store = store
+        self.query = query
+        self.json = body
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockFarm/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if body and self.headers.get('Content-Encoding', '').lower() == 'gzip':
+            body = gzip.decompress(body)
+        return body, length
+
+    def _send(self, status, payload, headers=None):
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if self.server.config.gzip and len(raw) >= 1024 and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            raw = gzip.compress(raw, compresslevel=5)
+            self.send_header('Content-Encoding', 'gzip')
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+        return len(raw)
+
+    def _handle(self, method):
+        parts = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(parts.query)
+        body, bytes_in = self._read_body()
+        server = self.server
+        config = server.config
+
+        # Control endpoints
+        if parts.path == '/__stats':
+            self._send(200, dict(server.stats.snapshot(), config=config.describe()))
+            return
+        if parts.path == '/__reset':
+            server.stats.reset()
+            self._send(200, {'ok': True})
+            return
+        if parts.path == '/__config':
+            config.update(json.loads(body or b'{}'))
+            self._send(200, config.describe())
+            return
+
+        for route_method, pattern, name, func in ROUTES:
+            if route_method != method:
+                continue
+            match = pattern.match(parts.path)
+            if match:
+                break
+        else:
+            name = 'unknown'
+            func = None
+
+        with config.lock:
+            config.inflight += 1
+            inflight = config.inflight
+        try:
+            delay = config.route_latency.get(name, config.latency)()
+            if config.max_inflight and inflight > config.max_inflight:
+                fault, status, payload, headers = '429_inflight', 429, {'message': 'Too Many Requests'}, {'Retry-After': '1'}
+            elif config.rate_limit_rate and random.random() < config.rate_limit_rate:
+                fault, status, payload, headers = '429', 429, {'message': 'Too Many Requests'}, {'Retry-After': '1'}
+            elif config.error_rate and random.random() < config.error_rate:
+                status = random.choice((500, 502, 503))
+                fault, payload, headers = str(status), {'message': 'Injected server error'}, {}
+            elif func is None:
+                fault, status, payload, headers = None, 404, {'message': f'No mock route for {method} {parts.path}'}, {}
+            else:
+                fault = None
+                auth = self.headers.get('Authorization', '')
+                if not auth.startswith('Bearer ') and not parts.path.startswith('/google/'):
+                    status, payload, headers = 401, {'message': 'Unauthorized'}, {}
+                else:
+                    result = func(_Context(server.store, query, request_json(self, body)), match)
+                    status, payload = result[0], result[1]
+                    headers = result[2] if len(result) > 2 else {}
+            if delay:
+                time.sleep(delay)
+            bytes_out = self._send(status, payload, headers)
+        finally:
+            with config.lock:
+                config.inflight -= 1
+        server.stats.record(name, status, bytes_in, bytes_out, fault)
+
+
+class MockFarmServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, args):
+        super().__init__(address, MockHandler)
+        self.config = MockConfig(args)
+        self.stats = Stats()
+        self.store = build_store(args)
+        self.verbose = args.verbose
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Local mock of the farm platform APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:MS | uniform:LO-HI | normal:MEAN,SD | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--route-latency", action="append", help="ROUTE=SPEC override, e.g. geojson_area=lognormal:250,0.6")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500/502/503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--max-inflight", type=int, default=0, help="429 above this many concurrent requests (0 = unlimited)")
+    parser.add_argument("--gzip", action="store_true", help="gzip responses >= 1 KB when accepted")
+    parser.add_argument("--strict", action="store_true", help="404 for unknown ids instead of synthesising records")
+    parser.add_argument("--seed-farmers", type=int, default=200)
+    parser.add_argument("--seed-assets", type=int, default=200)
+    parser.add_argument("--seed-master", type=int, default=50, help="Records per master list (crops, varieties, users...)")
+    parser.add_argument("--random-seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    return parser
+
+
+def start_server(argv=None, port=None):
+    """Start in a background thread (used by the benchmark harness). Returns the server."""
+    args = build_parser().parse_args(argv or [])
+    if port is not None:
+        args.port = port
+    if args.random_seed is not None:
+        random.seed(args.random_seed)
+    server = MockFarmServer((args.host, args.port), args)
+    threading.Thread(target=server.serve_forever, name="mock-farm-server", daemon=True).start()
+    return server
+
+
+def main():
+    args = build_parser().parse_args()
+    if args.random_seed is not None:
+        random.seed(args.random_seed)
+    server = MockFarmServer((args.host, args.port), args)
+    base = f"http://{args.host}:{server.server_address[1]}"
+    print(f"🧪 Mock farm platform listening on {base}")
+    print(f"   Latency: {args.latency} | Errors: {args.error_rate:.1%} | 429s: {args.rate_limit_rate:.1%} | Max in-flight: {args.max_inflight or '∞'}")
+    print(f"   env_config: {{\"apiBaseUrl\": \"{base}\", \"urlRewrites\": {{\"https://maps.googleapis.com\": \"{base}/google\"}}}}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Mock server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,7 @@ def load_config_and_secrets(env_config):
     """
     geocoding_key = None
     gemini_key = None
+    http_transport_map = None
     
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     
@@ -39,6 +40,10 @@ def load_config_and_secrets(env_config):
                     # ALWAYS load master_data_config if missing
                     if "master_data_config" in data_json and "master_data_config" not in env_config:
                         env_config["master_data_config"] = data_json["master_data_config"]
+
+                    # Per-environment HTTP transport (components/transport.py)
+                    if http_transport_map is None and "environment_http_transport" in data_json:
+                        http_transport_map = data_json["environment_http_transport"]
     except Exception as e:
         print(f"Warning: Failed to load secrets: {e}")
         
@@ -49,6 +54,10 @@ def load_config_and_secrets(env_config):
     if gemini_key and 'google_api_key' not in env_config:
         env_config['google_api_key'] = gemini_key
 
+    if http_transport_map and 'httpTransport' not in env_config:
+        from components import transport
+        env_config['httpTransport'] = transport.resolve_name(env_config, {"environment_http_transport": http_transport_map})
+
     # Parity Sync: Ensure base_url/apiurl/apiBaseUrl are synchronized if one is present
     url = env_config.get('apiBaseUrl') or env_config.get('apiurl') or env_config.get('base_url')
     if url:
@@ -58,7 +67,242 @@ def load_config_and_secrets(env_config):
     
     return env_config
 
-def run_script(target_script, data, token, env_config):
+def _flush_request_log():
+    """Drains the buffered request logger (components.request_log) if a script used it."""
+    request_log = sys.modules.get('components.request_log')
+    if request_log is not None:
+        try:
+            request_log.flush()
+        except Exception:
+            pass
+
+def _metrics_summary():
+    """Run metrics (components.metrics) for the JSON output, with a one-line log."""
+    try:
+        from components import metrics
+        summary = metrics.summary()
+    except Exception as e:
+        print(f"⚠️  [METRICS] Failed to build summary: {e}", flush=True)
+        return None
+    rows = summary['rows']
+    slowest = next(iter(summary['endpoints'].items()), None)
+    print(f"📊 [METRICS] {summary['http_requests']} requests | "
+          f"{summary['bytes_sent'] // 1024} KB sent, {summary['bytes_received'] // 1024} KB received | "
+          f"peak in-flight {summary['concurrency']['peak_inflight']}"
+          + (f" | rows p50 {rows['p50_ms']} ms, p95 {rows['p95_ms']} ms" if rows.get('count') else "")
+          + (f" | most time: {slowest[0]} (p95 {slowest[1]['p95_ms']} ms)" if slowest else ""), flush=True)
+    return summary
+
+
+def _write_profile(sampler, target_script):
+    """Stop the sampler and write collapsed stacks + top-N summary (components.profiler)."""
+    try:
+        from components import profiler
+        sampler.stop()
+        script_name = os.path.splitext(os.path.basename(target_script))[0]
+        name = f"{script_name}_{datetime.datetime.now():%Y%m%d_%H%M%S}"
+        paths = sampler.write(profiler.profile_dir(), name)
+        top = sampler.top(10)
+        print(f"🔬 [PROFILE] {sampler.samples} samples -> {paths['collapsed']}", flush=True)
+        for entry in top['self'][:5]:
+            print(f"   {entry['share'] * 100:5.1f}%  {entry['function']}", flush=True)
+        return dict(paths, samples=sampler.samples, top=top)
+    except Exception as e:
+        print(f"⚠️  [PROFILE] Failed to write profile: {e}", flush=True)
+        return None
+
+
+def _reorder_records(records, desired_order):
+    """
+    Same column order as DataFrame.reindex(desired_order + extras): desired columns first
+    (None when missing), then any other keys in first-seen order.
+    """
+    desired = set(desired_order)
+    extras = {}
+    for record in records:
+        for key in record:
+            if key not in desired and key not in extras:
+                extras[key] = None
+    final_order = list(desired_order) + list(extras)
+    return [{key: record.get(key) for key in final_order} for record in records]
+
+
+def _dump_excel_output(path):
+    """
+    Print a script-written workbook as an [OUTPUT_DATA_DUMP] block, row by row.
+    Same records as pd.read_excel(...).to_dict(orient='records') (first row = headers,
+    empty cells -> None) without loading the sheet into a DataFrame.
+    """
+    import openpyxl
+    from components import codec
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = next(rows, None) or ()
+        headers = [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(headers)]
+        print("\n[OUTPUT_DATA_DUMP]")
+        sys.stdout.write("[")
+        first = True
+        for values in rows:
+            if values is None or all(v is None for v in values):
+                continue
+            record = {header: (values[i] if i < len(values) else None) for i, header in enumerate(headers)}
+            sys.stdout.write(("" if first else ",") + codec.dumps(record))
+            first = False
+        sys.stdout.write("]\n")
+        print("[/OUTPUT_DATA_DUMP]")
+    finally:
+        workbook.close()
+
+
+_MODULES = {}
+
+
+def _load_user_module(target_script):
+    """Import the user script once per process (warm --serve workers reuse it for every unit)."""
+    module = _MODULES.get(target_script)
+    if module is not None:
+        return module
+    spec = importlib.util.spec_from_file_location("user_module", target_script)
+    if not spec or not spec.loader:
+        raise FileNotFoundError(f"Could not load script: {target_script}")
+        
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _MODULES[target_script] = module
+    return module
+
+
+def _load_rows(data_file, data_format="json", stream_input=False, row_store="dict"):
+    """Rows from --data-file (or a --serve unit's file)."""
+    if data_format == "ndjson":
+        # Line-by-line parsing: no full-file string in memory
+        from components import row_stream
+        if stream_input:
+            return row_stream.NDJSONRows(data_file)
+        if row_store == "columnar":
+            # Straight into the columns: only one line's dict exists at a time
+            from components import row_store as row_store_module
+            return row_store_module.RowStore.from_records(row_stream.iter_ndjson(data_file))
+        return row_stream.load_ndjson(data_file)
+    with open(data_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _prepare_rows(data, job_id=None, resume=False, row_store="dict", stream_input=False, row_indexes=None,
+                  skip_recorded=False):
+    """
+    Journal planning (--job-id/--resume) and the optional columnar container.
+    row_indexes: upload index of every row (journal keys), or an int offset of the first row.
+    skip_recorded: retried work unit; skip every row the journal has seen (run_journal.plan).
+    """
+    columnar = row_store == "columnar" and not stream_input
+    journal = None
+    # Checkpointing: journal rows per job id; on resume only process the remainder and failures
+    # (Streamed input is not journaled: planning needs every row's key up front)
+    if job_id and not stream_input:
+        try:
+            from components import run_journal
+            if isinstance(row_indexes, int):
+                row_indexes = range(row_indexes, row_indexes + len(data))
+            journal = run_journal.start(job_id, data, resume=resume, indexes=row_indexes,
+                                        skip_recorded=skip_recorded)
+            if not (columnar and journal.skipped_count == 0):
+                data = journal.remaining
+            if skip_recorded:
+                print(f"📒 [JOURNAL] Retrying unit: {journal.skipped_count} rows already ran, {len(data)} to process", flush=True)
+            elif resume:
+                print(f"📒 [JOURNAL] Resuming job {job_id}: {journal.skipped_count} rows already done, {len(data)} to process", flush=True)
+        except Exception as e:
+            journal = None
+            print(f"Warning: Failed to open run journal: {e}")
+
+    # Opt-in compact container: one list per column instead of one dict per row
+    # (Streamed input stays lazy; the store would pull every row into memory).
+    # NDJSON input already arrives as a store (_load_rows); it is only rebuilt when the
+    # journal dropped rows, so row i of the store is always remaining row i.
+    if columnar:
+        from components import row_store as row_store_module
+        if not isinstance(data, row_store_module.RowStore):
+            data = row_store_module.RowStore.from_records(data)
+        if journal is not None:
+            journal.use_store(data)
+    return data
+
+
+def serve_units(args, env_config):
+    """
+    Warm worker loop (--serve): the interpreter, imports, interceptor and token stay up
+    while the backend scheduler (backend/scheduler.js) feeds work units over stdin, one
+    JSON line each: {"unit": <id>, "dataFile": "<ndjson path>", "rowIndexes": [...], "retry": false}
+    (rowIndexes: upload index of every row, for the run journal; retry: the unit's previous
+    worker died, so rows the journal has seen are not run again). Every unit answers with
+    the usual ---JSON_START--- block. EOF (or an empty line) ends the worker. Cancel
+    messages on the same channel apply to the unit in flight (components/cancellation.py).
+    """
+    import queue
+    from components import metrics
+    from components import cancellation
+    # stdin is read on a thread so a cancel can arrive while a unit is running
+    lines = queue.Queue()
+
+    def on_line(line):
+        # A new unit starts uncancelled (the deadline stays). Reset here, on the reader thread,
+        # so a cancel sent after this unit's request still lands after the reset.
+        if line and line.strip():
+            cancellation.reset(keep_deadline=True)
+        lines.put(line)
+
+    cancellation.watch_stdin(on_line=on_line)
+    print(f"🔥 [WORKER] Ready for work units ({os.path.basename(args.script)})", flush=True)
+    while True:
+        line = lines.get()
+        if not line or not line.strip():
+            break
+        try:
+            request = json.loads(line)
+            unit_id = request.get("unit")
+            row_indexes = request.get("rowIndexes")
+            retry = request.get("retry") is True
+            data = _load_rows(request["dataFile"], "ndjson", args.stream_input, args.row_store)
+        except Exception as e:
+            print("\n---JSON_START---")
+            print(json.dumps({"status": "error", "message": f"Failed to read work unit: {str(e)}"}))
+            sys.stdout.flush()
+            continue
+
+        print(f"\n🔥 [WORKER] Unit {unit_id}: {len(data) if hasattr(data, '__len__') else '?'} rows", flush=True)
+        data = _prepare_rows(data, args.job_id, args.resume, args.row_store, args.stream_input,
+                             row_indexes=row_indexes, skip_recorded=retry)
+        builtins.data = data
+        metrics.reset()  # per-unit summary in the output block
+        run_script(args.script, data, args.token, env_config,
+                   profile_interval=args.profile_interval if args.profile else None,
+                   exit_on_error=False, result_frames=args.result_frames)
+        from components import run_journal
+        journal = run_journal.get_active()
+        if journal is not None:
+            journal.close()
+        sys.stdout.flush()
+
+
+def _write_result_frames(records):
+    """One result row per line after ---RESULTS_START--- (--result-frames), written in batches."""
+    from components import codec
+    sys.stdout.write("\n---RESULTS_START---\n")
+    batch = []
+    for record in records:
+        batch.append(codec.dumps(record))
+        if len(batch) >= 1000:
+            sys.stdout.write("\n".join(batch) + "\n")
+            batch = []
+    if batch:
+        sys.stdout.write("\n".join(batch) + "\n")
+
+
+def run_script(target_script, data, token, env_config, profile_interval=None, exit_on_error=True,
+               result_frames=False):
     # FILE LOGGING FOR DEBUGGING
     try:
         debug_path = os.path.join(os.path.dirname(target_script), 'runner_debug.txt')
@@ -91,12 +335,10 @@ def run_script(target_script, data, token, env_config):
     if converted_scripts_dir not in sys.path:
         sys.path.append(converted_scripts_dir)
 
-    spec = importlib.util.spec_from_file_location("user_module", target_script)
-    if not spec or not spec.loader:
-        raise FileNotFoundError(f"Could not load script: {target_script}")
-        
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
+    # Output encoding (orjson/msgspec when installed, stdlib otherwise)
+    from components import codec
+
+    module = _load_user_module(target_script)
     
     # 3. Check for run function
     if not hasattr(module, "run"):
@@ -113,55 +355,81 @@ def run_script(target_script, data, token, env_config):
             except Exception as e:
                 print(f"DEBUG: Failed to remove stale Excel: {e}")
 
-        # Run the script
-        results = module.run(data, token, env_config)
+        # Run the script (a resumed job may have nothing left to do)
+        profile_info = None
+        from components import run_journal
+        journal = run_journal.get_active()
+        if journal is not None and journal.keys and not journal.remaining:
+            print("📒 [JOURNAL] All rows already completed; returning journaled results.", flush=True)
+            results = []
+        else:
+            # Optional sampling profiler across all worker threads (--profile)
+            sampler = None
+            if profile_interval:
+                from components import profiler
+                sampler = profiler.StackSampler(interval=profile_interval / 1000.0).start()
+                print(f"🔬 [PROFILE] Sampling all threads every {profile_interval:g} ms", flush=True)
+            try:
+                results = module.run(data, token, env_config)
+            finally:
+                if sampler is not None:
+                    profile_info = _write_profile(sampler, target_script)
+
+        # Buffered request logs must land before any output block
+        _flush_request_log()
+
+        # (Before to_plain: the journal matches RowStore views to their rows)
+        if journal is not None:
+            results = journal.finish(results)
+            print(f"📒 [JOURNAL] Job {journal.job_id}: {journal.recorded} row results recorded", flush=True)
+
+        # Columnar rows -> plain dicts for pandas/json below
+        if getattr(builtins, 'ROW_STORE', 'dict') == 'columnar':
+            from components import row_store
+            results = row_store.to_plain(results)
 
         # 4b. CHECK FOR EXCEL OUTPUT AND DUMP
         # 4b. CHECK FOR EXCEL OUTPUT AND DUMP
-        if os.path.exists(excel_out_path):
+        # (Framed output skips the dump: the backend reads rows from the frames, not the log)
+        dump_output = not result_frames
+        if dump_output and os.path.exists(excel_out_path):
             try:
-                import pandas as pd
-                # Read it back to dump as JSON for frontend download
-                df_out = pd.read_excel(excel_out_path, engine='openpyxl')
-                print("\n[OUTPUT_DATA_DUMP]")
-                print(df_out.to_json(orient='records', date_format='iso'))
-                print("[/OUTPUT_DATA_DUMP]")
+                # Stream the sheet back as JSON (openpyxl read-only, no DataFrame copy)
+                _dump_excel_output(excel_out_path)
             except Exception as e:
                 print(f"DEBUG: Failed to dump excel output: {e}")
-        elif isinstance(results, list) and len(results) > 0:
+        elif dump_output and isinstance(results, list) and len(results) > 0:
             # NEW: Support for in-memory results (Unified Script Flow)
             # If script returns list but no file, dump the list directly.
             try:
-                import pandas as pd
-                df_out = pd.DataFrame(results)
-                
                 # REORDERING LOGIC RESTORED
+                desired_order = []
                 if hasattr(builtins, 'output_columns') and builtins.output_columns:
-                    desired_order = []
                     for c in builtins.output_columns:
                         if isinstance(c, dict) and 'colName' in c:
                             desired_order.append(c['colName'])
                         else:
                             desired_order.append(str(c))
-                    
-                    # 1. Identify columns that are in the dataframe but NOT in the desired order (extra columns)
-                    existing_cols = df_out.columns.tolist()
-                    extra_cols = [c for c in existing_cols if c not in desired_order]
-                    
-                    # 2. Identify columns that are in the desired order but MISSING from dataframe
-                    # (Optional: we could add them as empty, but pandas reindex handles this with NaN)
-                    
-                    # 3. Construct final order: Desired Columns + Extra Columns
-                    # Filter desired_order to only include those that actually exist (or let reindex add NaNs)
-                    # We usually want to force the desired structure, so we keep all desired_order.
-                    final_order = desired_order + extra_cols
-                    
-                    # 4. Reindex the dataframe
-                    # Using reindex will add NaNs for missing desired columns, which is good behavior
-                    df_out = df_out.reindex(columns=final_order)
+
+                if all(isinstance(r, dict) for r in results):
+                    # Plain rows: reorder keys directly and encode, no DataFrame round trip
+                    records = _reorder_records(results, desired_order) if desired_order else results
+                else:
+                    import pandas as pd
+                    df_out = pd.DataFrame(results)
+
+                    if desired_order:
+                        # 1. Identify columns that are in the dataframe but NOT in the desired order (extra columns)
+                        existing_cols = df_out.columns.tolist()
+                        extra_cols = [c for c in existing_cols if c not in desired_order]
+
+                        # 2. Construct final order: Desired Columns + Extra Columns
+                        # Using reindex will add NaNs for missing desired columns, which is good behavior
+                        df_out = df_out.reindex(columns=desired_order + extra_cols)
+                    records = df_out.to_dict(orient='records')
 
                 print("\n[OUTPUT_DATA_DUMP]")
-                print(df_out.to_json(orient='records', date_format='iso'))
+                print(codec.dumps(records))
                 print("[/OUTPUT_DATA_DUMP]")
             except Exception as e:
                 print(f"DEBUG: Failed to dump in-memory results: {e}")
@@ -184,10 +452,22 @@ def run_script(target_script, data, token, env_config):
         # Output strictly structured JSON with delimiter
         output = {
             "status": "success",
-            "data": results
+            "data": results,
+            "metrics": _metrics_summary()
         }
+        if profile_info:
+            output["profile"] = profile_info
+        # Cancelled/overdue run (components/cancellation.py): data holds the rows that finished
+        from components import cancellation
+        if cancellation.reason():
+            output["cancelled"] = cancellation.reason()
+        if result_frames and isinstance(results, list):
+            # Rows as separate lines so the backend parses them one at a time
+            _write_result_frames(results)
+            output["data"] = None
+            output["rows"] = len(results)
         print("\n---JSON_START---")
-        print(json.dumps(output, default=str)) # No indent for compactness
+        print(codec.dumps(output)) # No indent for compactness
 
     except BaseException as e:
         err_output = {
@@ -202,9 +482,11 @@ def run_script(target_script, data, token, env_config):
                 f.write(f"\n[{datetime.datetime.now()}] ERROR: {str(e)}\n{traceback.format_exc()}\n")
         except: pass
 
+        _flush_request_log()
         print("\n---JSON_START---")
-        print(json.dumps(err_output, default=str))
-        sys.exit(1) # Exit with error code
+        print(codec.dumps(err_output))
+        if exit_on_error:
+            sys.exit(1) # Exit with error code
     
     except BaseException as e:
         # Capture full traceback for initial setup errors (parsing, loading, etc.)
@@ -222,7 +504,7 @@ def run_script(target_script, data, token, env_config):
         except: pass
 
         print("\n---JSON_START---")
-        print(json.dumps(err_output, default=str))
+        print(codec.dumps(err_output))
         sys.exit(1) # Exit with error code
 
 if __name__ == "__main__":
@@ -230,10 +512,23 @@ if __name__ == "__main__":
     parser.add_argument("--script", required=True, help="Path to user .py script")
     parser.add_argument("--data", help="JSON string of rows") # Made optional
     parser.add_argument("--data-file", help="Path to JSON file containing rows") # New argument
+    parser.add_argument("--data-format", choices=["json", "ndjson"], default="json", help="Format of --data-file (ndjson = one row per line)")
+    parser.add_argument("--stream-input", action="store_true", help="Pass NDJSON rows to the script lazily instead of as a list")
     parser.add_argument("--token", help="Bearer Token")
     parser.add_argument("--env", help="Env Config JSON")
     parser.add_argument("--columns", help="Output Columns List JSON")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+    parser.add_argument("--log-level", choices=["error", "info", "debug"], default="info", help="Request log level for _log_req (--debug implies debug)")
+    parser.add_argument("--row-store", choices=["dict", "columnar"], default="dict", help="Input row container (columnar = components.row_store)")
+    parser.add_argument("--job-id", help="Journal completed rows under this job id (components.run_journal)")
+    parser.add_argument("--resume", action="store_true", help="Skip rows already journaled as successful for --job-id")
+    parser.add_argument("--row-offset", type=int, help="Upload index of the first row (run journal keys)")
+    parser.add_argument("--profile", action="store_true", help="Sample all threads while the script runs (components.profiler)")
+    parser.add_argument("--profile-interval", type=float, default=5.0, help="Sampling interval in ms for --profile")
+    parser.add_argument("--serve", action="store_true", help="Warm worker: run work units read from stdin until EOF (backend/scheduler.js)")
+    parser.add_argument("--control-stdin", action="store_true", help="Read cancel messages from stdin (components/cancellation.py)")
+    parser.add_argument("--deadline", type=float, help="Stop starting new rows after this time (epoch seconds)")
+    parser.add_argument("--result-frames", action="store_true", help="Print result rows one per line after ---RESULTS_START--- (backend/bridge_output.js)")
 
     args = parser.parse_args()
 
@@ -241,18 +536,27 @@ if __name__ == "__main__":
         if not s: return s
         return (s[:max_len] + '...') if len(s) > max_len else s
 
+    # Project root on sys.path so `components` is importable during data loading
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
     # 1. Load Initial Data
     data = []
     if args.data_file and os.path.exists(args.data_file):
         try:
-            with open(args.data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = _load_rows(args.data_file, args.data_format, args.stream_input, args.row_store)
         except Exception as e:
             print(json.dumps({"status": "error", "message": f"Failed to read data file: {str(e)}"}))
             sys.exit(1)
     elif args.data:
         data = json.loads(args.data)
 
+    # --serve workers journal per unit (serve_units)
+    if not args.serve:
+        data = _prepare_rows(data, args.job_id, args.resume, args.row_store, args.stream_input,
+                             row_indexes=args.row_offset)
+
     # 2. Load Env Config & Secrets IMMEDIATELY
     env_config = json.loads(args.env) if args.env else {}
     if args.token and 'token' not in env_config:
@@ -269,6 +573,47 @@ if __name__ == "__main__":
     builtins.env_config = env_config
     builtins.output_columns = output_columns
     builtins.DEBUG_MODE = args.debug # Set global debug flag
+    builtins.ROW_STORE = args.row_store
+
+    # Auth context: parse the token once per run (claims, expiry, pre-built headers)
+    auth = None
+    try:
+        from components import auth_context
+        auth = auth_context.init(args.token or env_config.get('token', ''))
+    except Exception as e:
+        print(f"Warning: Failed to initialise auth context: {e}")
+
+    # Token refresh: renew ahead of 'exp' and retry once on 401 (needs a refresh hook)
+    refresher = None
+    if auth is not None:
+        try:
+            from components import token_refresh
+            hook = token_refresh.resolve_hook(env_config)
+            if hook is not None:
+                refresher = token_refresh.TokenRefresher(
+                    auth, hook,
+                    margin=int(env_config.get('tokenRefreshMargin', 120)),
+                    env_config=env_config
+                ).start()
+        except Exception as e:
+            print(f"Warning: Failed to set up token refresh: {e}")
+
+    # Cooperative cancellation: backend cancel messages on stdin and/or a run deadline
+    from components import cancellation
+    if args.deadline:
+        cancellation.set_deadline(args.deadline)
+    if args.control_stdin and not args.serve:
+        cancellation.watch_stdin()
+
+    # Request logging: compact one-line-per-request by default, verbose only for debug runs
+    try:
+        from components import request_log
+        request_log.configure(
+            level="debug" if args.debug else env_config.get('logLevel', args.log_level),
+            body_sample_rate=env_config.get('logBodySampleRate', 0.0)
+        )
+    except Exception as e:
+        print(f"Warning: Failed to configure request logging: {e}")
     
     # Pretty-print ARGS for display (Smart Masking)
     display_args = []
@@ -316,6 +661,8 @@ if __name__ == "__main__":
     print(f"🚀 RUNNER STARTING: {os.path.basename(args.script)}")
     print(f"📅 Time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"📝 Args: {' '.join(display_args)}")
+    if auth is not None:
+        print(f"🔑 Token: {auth.summary} | {auth.describe_expiry()} | Auto-refresh: {'ON' if refresher else 'OFF'}")
     print("="*60 + "\n")
     
     
@@ -332,6 +679,13 @@ if __name__ == "__main__":
 
         print("⚙️  Importing requests module...", flush=True)
         import requests
+
+        # Optional HTTP/2 transport for the gateway host (keeps Session.request semantics)
+        try:
+            from components import transport
+            transport.install(transport.resolve_name(env_config), transport.hosts_from_env(env_config))
+        except Exception as e:
+            print(f"⚠️  Warning: Failed to set up HTTP transport: {e}", flush=True)
         
         print("⚙️  Importing attribute_utils...", flush=True)
         try:
@@ -348,17 +702,45 @@ if __name__ == "__main__":
         print(f"⚙️  API Interceptor Setup. Auto-Inject: {auto_inject}", flush=True)
         
         if attribute_utils is not None:
+            from components import retry_queue
+            from components import circuit_breaker
+            # Per-endpoint breakers + default timeouts (requests has none by default)
+            timeout_cfg = env_config.get('requestTimeout')
+            circuit_breaker.configure(
+                timeout=tuple(timeout_cfg) if isinstance(timeout_cfg, list) else timeout_cfg,
+                failure_threshold=env_config.get('circuitFailureThreshold'),
+                cooldown=env_config.get('circuitCooldown')
+            )
+            from components import transport
+            from components import codec
+            from components import metrics
+            from components import cancellation
+            gzip_paths = env_config.get('gzipRequestPaths')
+            url_rewrites = env_config.get('urlRewrites') or {}
             original_request = requests.Session.request
             
             def intercepted_request(self, method, url, *args, **kwargs):
                 import time
                 max_retries = 3
                 retry_count = 0
+                url = transport.rewrite_url(url, url_rewrites)
+
+                # 0. Cancelled/overdue run: rows already dispatched may finish, nothing else starts calls
+                if not cancellation.in_row():
+                    cancellation.check()
                 
                 # 1. Debug logging if enabled
                 if getattr(builtins, 'DEBUG_MODE', False) or auto_inject: # Force logs if injection active
                      print(f"\n📡 [INTERCEPTOR] {method.upper()} {url}", flush=True)
 
+                # 1b. Token refresh / expiry warning (claims parsed once in the auth context)
+                if refresher is not None:
+                    refresher.ensure_fresh()
+                    refresher.fix_headers(kwargs, session=self)
+                elif auth is not None and not auth.expiry_warned and auth.is_expiring(margin=0):
+                    auth.expiry_warned = True
+                    print(f"⚠️  [AUTH] Token for {auth.user} has expired; requests will likely fail with 401.", flush=True)
+
                 # 2. GLOBAL ATTRIBUTE INJECTION
                 if auto_inject:
                     row = attribute_utils.get_current_row()
@@ -375,12 +757,12 @@ if __name__ == "__main__":
                             dto_entry = kwargs['files']['dto']
                             if isinstance(dto_entry, tuple) and len(dto_entry) >= 2:
                                 try:
-                                    dto_json = json.loads(dto_entry[1])
+                                    dto_json = codec.loads(dto_entry[1])
                                     target_key = 'data'
                                     attribute_utils.add_attributes_to_payload(row, dto_json, env_config, target_key=target_key)
                                     
                                     # Re-package the DTO
-                                    new_dto_content = json.dumps(dto_json)
+                                    new_dto_content = codec.dumps(dto_json)
                                     new_list = list(dto_entry)
                                     new_list[1] = new_dto_content
                                     kwargs['files']['dto'] = tuple(new_list)
@@ -391,32 +773,96 @@ if __name__ == "__main__":
                 # 3. Log FINAL Payload (Post-Injection) to verify changes
                 if getattr(builtins, 'DEBUG_MODE', False) or auto_inject:
                     if kwargs.get('json'):
-                         print(f"   📦 Final Payload: {json.dumps(kwargs['json'])}", flush=True)
+                         print(f"   📦 Final Payload: {codec.dumps(kwargs['json'])}", flush=True)
                     elif 'files' in kwargs and 'dto' in kwargs['files']:
                          print(f"   📦 Final DTO: {kwargs['files']['dto'][1]}", flush=True)
 
+                # 3b. Wire encoding: compact JSON, Accept-Encoding, optional gzip request bodies
+                try:
+                    transport.encode_body(url, kwargs, gzip_paths=gzip_paths,
+                                          gzip_min_bytes=int(env_config.get('gzipRequestMinBytes', transport.GZIP_MIN_BYTES)))
+                except (TypeError, ValueError):
+                    pass  # not JSON-serialisable here: let requests raise its usual error
+
                 # 4. Execute original with RETRY LOOP for Overload
+                breaker = circuit_breaker.get_breaker(url)
+                if not args:
+                    circuit_breaker.apply_default_timeout(kwargs)
+                auth_retried = False
+                # POST/PUT/PATCH/DELETE may have been applied even when the answer is an error
+                safe_method = retry_queue.is_safe_method(method)
                 while retry_count <= max_retries:
-                    response = original_request(self, method, url, *args, **kwargs)
-                    
-                    # Detect Overload (Status 429/503 OR specific GCP error text)
-                    is_overloaded = False
-                    if response.status_code in [429, 503]:
-                        is_overloaded = True
-                    else:
-                        try:
-                            # Search for 'overload' or 'drop overload' in text
-                            if response.text and "unconditional drop overload" in response.text.lower():
-                                is_overloaded = True
-                        except: pass
-                        
-                    if is_overloaded and retry_count < max_retries:
+                    seen_version = auth.version if auth is not None else 0
+                    # Deferrable row (thread_utils): only one quick in-thread retry, then park the row
+                    deferrable = retry_queue.in_row()
+                    try:
+                        # Fast-fail (milliseconds) while the endpoint's circuit is open
+                        breaker.before_request()
+                    except circuit_breaker.CircuitOpenError:
+                        metrics.count('circuit_fast_fail', breaker.key)
+                        retry_queue.mark_transient("Circuit open")
+                        raise
+                    call_started = metrics.request_started()
+                    try:
+                        response = original_request(self, method, url, *args, **kwargs)
+                    except Exception as e:
+                        metrics.request_finished(method, url, call_started, error=type(e).__name__,
+                                                 bytes_sent=metrics.body_size(kwargs))
+                        if not retry_queue.is_retryable_exception(e):
+                            breaker.release_probe()
+                            raise
+                        breaker.record_failure(type(e).__name__)
+                        if not safe_method and not retry_queue.never_sent(e):
+                            # May have reached the server: no resend, and the row must not be re-run
+                            retry_queue.record_mutation()
+                            raise
+                        if deferrable:
+                            retry_queue.mark_transient(type(e).__name__)
+                            raise
+                        if retry_count >= max_retries or cancellation.is_cancelled():
+                            raise
                         retry_count += 1
-                        print(f"⚠️  [OVERLOAD] Server reported overload at {url}.", flush=True)
-                        print(f"   🕒 Pausing for 30s before retry... (Attempt {retry_count}/{max_retries})", flush=True)
-                        time.sleep(30)
-                        continue # RETRY
-                        
+                        metrics.count('retries', type(e).__name__)
+                        delay = retry_queue.blocking_delay(retry_count)
+                        print(f"⚠️  [RETRY] {type(e).__name__} at {url}. Retrying in {delay:.0f}s (Attempt {retry_count}/{max_retries})", flush=True)
+                        cancellation.wait(delay)
+                        continue
+                    metrics.request_finished(method, url, call_started, status=response.status_code,
+                                             bytes_sent=metrics.body_size(kwargs),
+                                             bytes_received=metrics.response_size(response, kwargs.get('stream')))
+
+                    # 401 with a refreshable token: refresh once (shared across threads) and retry
+                    if response.status_code == 401 and refresher is not None and not auth_retried:
+                        auth_retried = True
+                        breaker.record_success()
+                        if refresher.refresh(seen_version):
+                            metrics.count('retries', 'token_refresh')
+                            print(f"🔁 [AUTH] Retrying {method.upper()} {url} with refreshed token", flush=True)
+                            refresher.fix_headers(kwargs, session=self)
+                            continue
+
+                    if not safe_method and retry_queue.may_have_applied(response.status_code):
+                        retry_queue.record_mutation()
+
+                    # Detect transient failures (429/502/503/504 OR specific GCP overload text)
+                    transient = retry_queue.transient_reason(response)
+                    # A mutating request is only resent when the server says it was not processed
+                    resendable = safe_method or response.status_code in retry_queue.NOT_APPLIED_STATUS
+                    if transient:
+                        breaker.record_failure(transient)
+                        limit = (1 if deferrable else max_retries) if resendable else 0
+                        if retry_count < limit and not cancellation.is_cancelled():
+                            retry_count += 1
+                            metrics.count('retries', transient)
+                            delay = retry_queue.blocking_delay(retry_count, response)
+                            print(f"⚠️  [OVERLOAD] {transient} at {url}. Retrying in {delay:.0f}s (Attempt {retry_count}/{limit})", flush=True)
+                            cancellation.wait(delay)
+                            continue # RETRY
+                        # Still failing: let thread_utils park the row and retry it later
+                        retry_queue.mark_transient(transient)
+                    else:
+                        breaker.record_success()
+
                     # 5. Debug response logging (Only for final result)
                     if getattr(builtins, 'DEBUG_MODE', False):
                         print(f"📥 [INTERCEPTOR] Response: {response.status_code}", flush=True)
@@ -440,5 +886,10 @@ if __name__ == "__main__":
         print(f"⚠️  Continuing without API interceptor...", flush=True)
 
     print("🚀 Starting script execution...", flush=True)
-    run_script(args.script, data, args.token, env_config)
+    if args.serve:
+        serve_units(args, env_config)
+        sys.exit(0)
+    run_script(args.script, data, args.token, env_config,
+               profile_interval=args.profile_interval if args.profile else None,
+               result_frames=args.result_frames)
 
@@ -34,35 +34,27 @@ class ScriptCleaner(ast.NodeTransformer):
             # We construct AST for this logic with TRACE LOGGING
             new_body_source = """
 import builtins
-import json
+from collections.abc import MutableMapping, Sequence
 # Handle Integer Index (Excel Row Number)
 if isinstance(row, int):
     idx = row - 2
-    if hasattr(builtins, 'data') and isinstance(builtins.data, list) and 0 <= idx < len(builtins.data):
+    if hasattr(builtins, 'data') and isinstance(builtins.data, Sequence) and 0 <= idx < len(builtins.data):
         row = builtins.data[idx]
     else:
         return ""
 
-if not isinstance(row, dict): return ""
-target = str(header).strip().lower()
-found_val = ""
-found_key = ""
+# dict or columnar Row view (components.row_store)
+if not isinstance(row, MutableMapping): return ""
+# O(1) lookup: header index is built once per row schema and shared by all rows
+found_key = row_utils.find_key(row, header)
+found_val = row[found_key] if found_key is not None else ""
 
-for k, v in row.items():
-    if str(k).strip().lower() == target: 
-        found_val = v
-        found_key = k
-        break
-    if str(k).strip().replace('_', ' ').lower() == target.replace('_', ' '): 
-        found_val = v
-        found_key = k
-        break
-
-# TRACE LOG
-try:
-    _trace_idx = row.get('_row_index', -1)
-    print(f"[TRACE_DATA_READ] [Row {_trace_idx}] Key: {header} | Found: {found_key} | Value: {found_val}")
-except: pass
+# TRACE LOG (Debug runs only)
+if getattr(builtins, 'DEBUG_MODE', False):
+    try:
+        _trace_idx = row.get('_row_index', -1)
+        print(f"[TRACE_DATA_READ] [Row {_trace_idx}] Key: {header} | Found: {found_key} | Value: {found_val}")
+    except: pass
 
 return found_val
 """
@@ -83,23 +75,17 @@ return found_val
         # REPLACEMENT: set_cell_value
         if node.name == 'set_cell_value':
             new_body_source = """
-if not isinstance(row, dict): return False
-target = str(header).strip().lower()
-match = None
-for k in row.keys():
-    if str(k).strip().lower() == target:
-        match = k
-        break
-if match:
-    row[match] = value
-else:
-    row[header] = value
+import builtins
+from collections.abc import MutableMapping
+if not isinstance(row, MutableMapping): return False
+row_utils.set_value(row, header, value)
 
-# TRACE LOG
-try:
-    _trace_idx = row.get('_row_index', -1)
-    print(f"[TRACE_DATA_WRITE] [Row {_trace_idx}] Key: {header} | Value: {value}")
-except: pass
+# TRACE LOG (Debug runs only)
+if getattr(builtins, 'DEBUG_MODE', False):
+    try:
+        _trace_idx = row.get('_row_index', -1)
+        print(f"[TRACE_DATA_WRITE] [Row {_trace_idx}] Key: {header} | Value: {value}")
+    except: pass
 
 return True
 """
@@ -425,6 +411,8 @@ def convert_code(code, no_threading=False):
         ast.Import(names=[ast.alias(name='concurrent.futures', asname=None)]),
         ast.Import(names=[ast.alias(name='requests', asname=None)]),
         ast.Import(names=[ast.alias(name='json', asname=None)]),
+        ast.ImportFrom(module='components', names=[ast.alias(name='row_utils', asname=None)], level=0),
+        ast.ImportFrom(module='components', names=[ast.alias(name='request_log', asname=None)], level=0),
     ]
     
     has_pd = any(isinstance(n, ast.Import) and any(alias.name == 'pandas' for alias in n.names) for n in cleaned_tree.body)
@@ -436,103 +424,9 @@ def convert_code(code, no_threading=False):
     # ---------------------------------------------------------
     wrapper_source = """
 def _log_req(method, url, **kwargs):
-    # import requests (Global)
-    # import json (Global)
-    
-    
-    def _debug_jwt(token_str):
-        try:
-            if not token_str or len(token_str) < 10: return "Invalid/Empty Token"
-            if token_str.startswith("Bearer "): token_str = token_str.replace("Bearer ", "")
-            parts = token_str.split('.')
-            if len(parts) < 2: return "Not a JWT"
-            payload = parts[1]
-            pad = len(payload) % 4
-            if pad: payload += '=' * (4 - pad)
-            import base64
-            decoded = base64.urlsafe_b64decode(payload).decode('utf-8')
-            claims = json.loads(decoded)
-            user = claims.get('preferred_username') or claims.get('sub')
-            iss = claims.get('iss', '')
-            tenant = iss.split('/')[-1] if '/' in iss else 'Unknown'
-            return f"User: {user} | Tenant: {tenant}"
-        except Exception as e:
-            return f"Decode Error: {e}"
-
-    headers = kwargs.get('headers', {})
-    auth_header = headers.get('Authorization', 'None')
-    token_meta = _debug_jwt(auth_header)
-    
-    print(f"[API_DEBUG] ----------------------------------------------------------------")
-    print(f"[API_DEBUG] 🚀 REQUEST: {method} {url}")
-    print(f"[API_DEBUG] 🔑 TOKEN META: {token_meta}")
-    
-    payload = kwargs.get('json') or kwargs.get('data')
-    
-    # Multipart Support (DTO)
-    if not payload:
-        files = kwargs.get('files')
-        if files and isinstance(files, dict):
-             # Try to find 'dto' or 'body'
-             if 'dto' in files:
-                 # files['dto'] is usually (filename, content, content_type)
-                 val = files['dto']
-                 if isinstance(val, (list, tuple)) and len(val) > 1:
-                     payload = f"[Multipart DTO] {val[1]}" 
-                 else:
-                     payload = f"[Multipart DTO] {val}"
-             else:
-                 # Just list keys
-                 payload = f"[Multipart Files] Keys: {list(files.keys())}"
-    
-    if not payload: payload = "No Payload"
-    
-    payload_type = "JSON" if kwargs.get('json') else "Data"
-    
-    # Check if 'Data' is actually a JSON string
-    if payload_type == "Data" and isinstance(payload, str):
-        try:
-            json.loads(payload)
-            payload_type = "Data (JSON)"
-        except: pass
-
-    if not kwargs.get('json') and not kwargs.get('data') and not payload_type == "Data (JSON)": payload_type = "Unknown/Multipart"
-
-    # print(f"[API_DEBUG] 📦 PAYLOAD ({payload_type}): {payload}")
-    # print(f"[API_DEBUG] ----------------------------------------------------------------")
-
-    try:
-        if method == 'GET': resp = requests.get(url, **kwargs)
-        elif method == 'POST': resp = requests.post(url, **kwargs)
-        elif method == 'PUT': resp = requests.put(url, **kwargs)
-        elif method == 'DELETE': resp = requests.delete(url, **kwargs)
-        else: resp = requests.request(method, url, **kwargs)
-        
-        body_preview = "Binary/No Content"
-        try:
-             # Try to parse and pretty print JSON
-             if not resp.text or not resp.text.strip():
-                 body_preview = "[Empty Response]"
-             else:
-                 try:
-                     json_obj = resp.json()
-                     body_preview = json.dumps(json_obj, indent=2)
-                 except:
-                     # Fallback to text
-                     body_preview = resp.text[:4000] # Increased limit
-        except: 
-             pass
-        
-        status_icon = "✅" if 200 <= resp.status_code < 300 else "❌"
-        print(f"[API_DEBUG] {status_icon} RESPONSE [{resp.status_code}]")
-        print(f"[API_DEBUG] 📄 BODY:\\n{body_preview}")
-        print(f"[API_DEBUG] ----------------------------------------------------------------\\n")
-        
-        return resp
-    except Exception as e:
-        print(f"[API_DEBUG] ❌ EXCEPTION: {e}")
-        print(f"[API_DEBUG] ----------------------------------------------------------------\\n")
-        raise e
+    # Level-aware structured logging with a buffered writer (components/request_log.py).
+    # Default level: one compact line per request; bodies only for errors.
+    return request_log.logged_request(method, url, **kwargs)
 
 def _log_get(url, **kwargs): return _log_req('GET', url, **kwargs)
 def _log_post(url, **kwargs): return _log_req('POST', url, **kwargs)
@@ -540,8 +434,9 @@ def _log_put(url, **kwargs): return _log_req('PUT', url, **kwargs)
 def _log_delete(url, **kwargs): return _log_req('DELETE', url, **kwargs)
 
 def _safe_iloc(row, idx):
+    from collections.abc import Mapping
     try:
-        if isinstance(row, dict):
+        if isinstance(row, Mapping):
              # Dict access by index (ordered keys in Python 3.7+)
              keys = list(row.keys())
              if 0 <= idx < len(keys):
@@ -567,7 +462,9 @@ import sys
 sys.argv = [sys.argv[0]]
 
 builtins.data = data
-builtins.data_df = pd.DataFrame(data)
+# Columnar input builds the frame from its columns; streamed input only if data_df is used
+from components import row_stream as _row_stream
+builtins.data_df = _row_stream.data_frame(data)
 
 import os
 valid_token_path = os.path.join(os.getcwd(), 'valid_token.txt')
@@ -739,29 +636,66 @@ wb = wk
         definition_nodes.append(process_func)
 
         # B. Create Executor Block (Threading vs Sequential)
+        # Cancellation (components/cancellation.py): rows not started yet are skipped and left
+        # out of the result; rows already running finish (begin_row lets their calls through)
+        cancel_source = """
+try:
+    from components import cancellation as _cancellation
+except ImportError:
+    _cancellation = None
+_done_rows = set()
+
+def _run_row(idx, row):
+    if _cancellation is not None:
+        if _cancellation.is_cancelled():
+            return None
+        _cancellation.begin_row()
+    try:
+        return process_row(idx, row)
+    finally:
+        _done_rows.add(idx)
+        if _cancellation is not None:
+            _cancellation.end_row()
+"""
         if not no_threading:
-            executor_source = f"""
+            executor_source = cancel_source + f"""
+import thread_utils as _thread_utils
 print(f"[Threaded] Starting execution with 5 workers...")
-with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-    # Iterate over builtins.data (List of Dicts)
-    futures = {{executor.submit(process_row, idx, row): idx for idx, row in enumerate(builtins.data)}}
-    for future in concurrent.futures.as_completed(futures):
-        try:
-            res = future.result()
-            # Result is (idx, row) - data is modifed in-place since row is a dict ref from builtins.data
-        except Exception as e:
-            print(f"[Threaded] Row failed: {{e}}")
+
+def _threaded_row(idx, row):
+    # Data is modified in place (row is a dict ref from builtins.data); the return value is unused
+    try:
+        return _run_row(idx, row)
+    except Exception as e:
+        print(f"[Threaded] Row failed: {{e}}")
+
+# Sliding window (thread_utils): at most 10 rows queued at once, none submitted after a cancel
+_thread_utils._run_windowed(_threaded_row, builtins.data, 5, 10, collect=False)
 """
         else:
             # SEQUENTIAL SOURCE
-            executor_source = f"""
+            executor_source = cancel_source + f"""
 print(f"[Sequential] Starting execution (Single Thread)...")
 for idx, row in enumerate(builtins.data):
+    if _cancellation is not None and _cancellation.is_cancelled():
+        break
     try:
-        process_row(idx, row)
+        _run_row(idx, row)
     except Exception as e:
          print(f"[Sequential] Row {{idx}} failed: {{e}}")
 """
+        executor_source += """
+if _cancellation is not None and _cancellation.is_cancelled():
+    # Partial result: only rows that ran
+    print(f"🛑 [CANCEL] Returning the {len(_done_rows)} rows that ran ({_cancellation.reason()})")
+    data = [row for idx, row in enumerate(builtins.data) if idx in _done_rows]
+    builtins.data = data
+    if hasattr(builtins, 'data_df'):
+        from components import row_stream as _row_stream
+        _df = _row_stream.loaded_frame(builtins.data_df)
+        if _df is not None:
+            builtins.data_df = _df.iloc[sorted(_done_rows)]
+"""
 
         executor_nodes = ast.parse(executor_source).body
         execution_nodes.extend(executor_nodes)
@@ -828,9 +762,11 @@ try:
     # Only sync if res is None (User didn't return anything explicit)
     if res is None and hasattr(builtins, 'data_df'):
         import pandas as pd
-        if isinstance(builtins.data_df, pd.DataFrame):
+        from components import row_stream as _row_stream
+        _df = _row_stream.loaded_frame(builtins.data_df)
+        if _df is not None:
             # Prioritize the DataFrame content as the source of truth
-            res = builtins.data_df.where(pd.notnull(builtins.data_df), None).to_dict(orient='records')
+            res = _df.where(pd.notnull(_df), None).to_dict(orient='records')
 except Exception as e:
     print(f"[Warn] Failed to sync data_df to result: {e}")
 """
@@ -842,9 +778,11 @@ except Exception as e:
 try:
     if hasattr(builtins, 'data_df'):
         import pandas as pd
-        if isinstance(builtins.data_df, pd.DataFrame):
+        from components import row_stream as _row_stream
+        _df = _row_stream.loaded_frame(builtins.data_df)
+        if _df is not None:
             # Convert NaN to None (null in JSON) for cleaner output
-            data = builtins.data_df.where(pd.notnull(builtins.data_df), None).to_dict(orient='records')
+            data = _df.where(pd.notnull(_df), None).to_dict(orient='records')
 except Exception as e:
     print(f"[Warn] Failed to sync data_df to data: {e}")
 """
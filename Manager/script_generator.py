@@ -335,7 +335,12 @@ CRITICAL URL HANDLING: When constructing API URLs using env_config apiBaseUrl, d
 3. RUN FUNCTION: In run(data, token, env_config), call:
    return thread_utils.run_in_parallel(process_func=process_row, items=data, token=token, env_config=env_config)
 4. DO NOT pass token/env_config as parameters to process_row - they are injected via builtins.
-5. IMPORT: Add 'import builtins' at the top of the script to access builtins.token and builtins.env_config."""
+5. IMPORT: Add 'import builtins' at the top of the script to access builtins.token and builtins.env_config.
+6. GROUPED ROWS: If several rows must be handled together per key (e.g. all rows with the same varietyID update ONE record),
+   DO NOT hand-build grouped_data dicts. Use:
+   return thread_utils.run_grouped(process_group=process_group, items=data, group_by='varietyID', token=token, env_config=env_config)
+   with signature 'def process_group(key, rows)' that updates each row in place (or returns one result per row).
+   Also add '# CONFIG: groupByColumn="varietyID"' at the top of the script."""
     
     # ALWAYS add Master Search instructions - these are CRITICAL for any data lookup
     prompt += """\n\nCRITICAL MASTER SEARCH REQUIREMENTS:
@@ -686,7 +691,8 @@ def update_script_with_ai(existing_code, description, is_multithreaded=True, inp
 3. RUN FUNCTION: return thread_utils.run_in_parallel(process_func=process_row, items=data, token=token, env_config=env_config)
 4. IMPORT: Ensure 'import builtins' is at the top.
 5. REMOVE any (row, token, env_config) signatures - use (row) only.
-6. THREAD SAFETY: Use '_lock = thread_utils.create_lock()' for shared caches."""
+6. THREAD SAFETY: Use '_lock = thread_utils.create_lock()' for shared caches.
+7. GROUPED ROWS: For per-key batches use thread_utils.run_grouped(process_group=process_group, items=data, group_by='<column>', token=token, env_config=env_config) with 'def process_group(key, rows)' instead of hand-built grouped_data. Add max_group_size=<n> only if rows of one key are independent (big groups are then split across workers)."""
     
     # ALWAYS add Master Search instructions - CRITICAL for any data lookup
     prompt += """\n\nCRITICAL MASTER SEARCH UPDATE:
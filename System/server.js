@@ -7,7 +7,8 @@ const app = express();
 const PORT = 3001; // Running on a separate port
 
 app.use(cors());
-app.use(bodyParser.json({ limit: '50mb' }));
+// Whole uploads arrive in one request now (POST /api/jobs), not browser-sized batches
+app.use(bodyParser.json({ limit: '200mb' }));
 app.use(bodyParser.urlencoded({ limit: '50mb', extended: true }));
 
 // Serve static files from current directory
@@ -3,6 +3,11 @@ const fs = require('fs');
 const path = require('path');
 const multer = require('multer');
 const { spawn } = require('child_process');
+const metrics = require('./metrics');
+const readline = require('readline');
+const { JobManager, loadLimits, FINAL_STATES } = require('./jobs');
+const { BridgeOutputParser, LogRing } = require('./bridge_output');
+const exporter = require('./export');
 
 const QA_TOKEN_BASE = "https://v2sso-gcp.cropin.co.in/auth/realms/";
 const PROD_TOKEN_BASE = "https://sso.sg.cropin.in/auth/realms/";
@@ -102,6 +107,424 @@ function getEnvUrls(environment) {
     return { apiBaseUrl, frontendUrl, ssoPrefix, ssoSuffix };
 }
 
+// Helper to write rows as NDJSON in bounded chunks (avoids one JSON.stringify of the whole upload)
+function writeNdjsonSync(filePath, rows, chunkRows = 1000) {
+    const fd = fs.openSync(filePath, 'w');
+    try {
+        for (let i = 0; i < rows.length; i += chunkRows) {
+            let chunk = '';
+            const end = Math.min(i + chunkRows, rows.length);
+            for (let j = i; j < end; j++) {
+                chunk += JSON.stringify(rows[j]) + '\n';
+            }
+            fs.writeSync(fd, chunk);
+        }
+    } finally {
+        fs.closeSync(fd);
+    }
+}
+
+// Inject apiBaseUrl (and legacy aliases) for the selected environment into a run's envConfig
+function applyEnvUrls(envConfig) {
+    if (envConfig && envConfig.environment) {
+        console.log(`[Execute] Resolving URL for env: ${envConfig.environment}`);
+        const { apiBaseUrl } = getEnvUrls(envConfig.environment);
+        if (apiBaseUrl) {
+            envConfig.apiBaseUrl = apiBaseUrl;
+            // Also ensure 'apiurl' and 'base_url' are set for parity with legacy/hallucinated scripts
+            if (!envConfig.apiurl) envConfig.apiurl = apiBaseUrl;
+            if (!envConfig.base_url) envConfig.base_url = apiBaseUrl;
+        }
+    }
+    return envConfig;
+}
+
+// Locate a runnable script and its run settings (registry entry, falling back to the code header)
+function resolveScriptRun(scriptName) {
+    // UPDATED: Runnable scripts are now in 'Converted Scripts' sibling folder
+    const scriptPath = path.join(__dirname, '..', 'Converted Scripts', scriptName);
+    console.log(`[Execute] Looking for script at: ${scriptPath}`);
+    if (!fs.existsSync(scriptPath)) {
+        console.error(`[Execute] Script NOT FOUND at: ${scriptPath}`);
+        return null;
+    }
+
+    // LOAD COLUMNS FROM REGISTRY (Fallback to Code Header)
+    let columns = [];
+    let rowStore = 'dict';
+    let streamInput = false;
+    let entry = null;
+    try {
+        const registryPath = path.join(__dirname, '..', 'System', 'scripts_registry.json');
+        if (fs.existsSync(registryPath)) {
+            const registry = JSON.parse(fs.readFileSync(registryPath, 'utf8'));
+            entry = registry.find(r => r.filename === scriptName || r.name === scriptName) || null;
+            if (entry) {
+                columns = entry.expected_columns || (entry.columns ? entry.columns.map(c => c.name || c.header) : []);
+                // Opt-in compact input container for large uploads (components/row_store.py)
+                if (entry.rowStore === 'columnar') rowStore = 'columnar';
+                // Opt-in lazy row iteration (components/row_stream.py)
+                if (entry.streamInput === true) streamInput = true;
+            }
+        }
+
+        // FALLBACK 0: Read from Code Header (Truth Source)
+        if (columns.length === 0) {
+            try {
+                const content = fs.readFileSync(scriptPath, 'utf8');
+                const headerMatch = content.match(/#\s*EXPECTED_INPUT_COLUMNS:\s*([^\n]+)/);
+                if (headerMatch && headerMatch[1]) {
+                    columns = headerMatch[1].split(',').map(c => c.trim()).filter(c => c);
+                }
+            } catch (e) {
+                console.error("[Execute] Failed to parse columns from code header:", e);
+            }
+        }
+    } catch (e) {
+        console.warn(`[Execute] Failed to load columns for script: ${e.message}`);
+    }
+    return { scriptPath, columns, rowStore, streamInput, entry };
+}
+
+// runner_bridge arguments shared by one-shot runs and warm workers (data file/--serve added by the caller)
+function bridgeArgs(scriptRun, { token, envConfig, debug, profile, deadline }) {
+    const bridgePath = path.join(__dirname, '..', 'Manager', 'runner_bridge.py');
+    const { scriptPath, columns, rowStore, streamInput } = scriptRun;
+    const args = [
+        bridgePath,
+        "--script", scriptPath,
+        "--token", token || "",
+        "--env", JSON.stringify(envConfig || {}),
+        "--columns", JSON.stringify(columns),
+        "--row-store", rowStore,
+        // Result rows one per line, parsed as they arrive (backend/bridge_output.js)
+        "--result-frames"
+    ];
+    if (streamInput) args.push("--stream-input");
+
+    // Checkpointed runs: every chunk of one upload journals into the same job (components/run_journal.py)
+    if (envConfig && envConfig.jobId) {
+        args.push("--job-id", String(envConfig.jobId));
+        if (envConfig.resume === true) args.push("--resume");
+        // Upload index of the first row ("Start from Row" - 1): journal keys are per upload position
+        if (Number.isInteger(envConfig.rowOffset) && envConfig.rowOffset >= 0) {
+            args.push("--row-offset", String(envConfig.rowOffset));
+        }
+    }
+
+    // Only add debug flag if explicitly requested (e.g. from Test Run or strict debug mode)
+    // We do NOT want this on by default for Production runs just because attributes are allowed.
+    if (debug === true) {
+        args.push("--debug");
+    }
+
+    // On-demand sampling profiler (components/profiler.py): collapsed stacks + top-N in temp_data/profiles
+    if (profile === true) {
+        args.push("--profile");
+    }
+
+    // Run deadline (epoch ms): the bridge stops starting rows after it (components/cancellation.py)
+    if (deadline) {
+        args.push("--deadline", String(deadline / 1000));
+    }
+    return args;
+}
+
+// Ask a running bridge to wind down: no new rows, rows in flight finish (components/cancellation.py)
+function sendBridgeCancel(child, reason) {
+    if (!child || child.exitCode !== null || !child.stdin || child.stdin.destroyed) return;
+    child.stdin.write(JSON.stringify({ control: 'cancel', reason: reason || 'Cancelled' }) + '\n');
+}
+
+// Spawn runner_bridge with the project on PYTHONPATH and the token refresh hook configured
+function spawnBridge(args, { envConfig, refreshToken, localPort }, kind) {
+    // Token refresh for long runs: the bridge calls back into /api/user-aggregate/token.
+    // Passed via the environment (not argv) so the refresh token never shows in logs/process lists.
+    let tokenRefreshConfig = '';
+    if (refreshToken && envConfig && envConfig.environment && envConfig.tenant && localPort) {
+        tokenRefreshConfig = JSON.stringify({
+            url: `http://127.0.0.1:${localPort}/api/user-aggregate/token`,
+            environment: envConfig.environment,
+            tenant: envConfig.tenant,
+            refreshToken
+        });
+    }
+
+    return metrics.trackProcess(spawn('python', ['-u', ...args], {
+        windowsHide: true,
+        env: {
+            ...process.env,
+            PYTHONIOENCODING: 'utf-8',
+            // Add components folder to PYTHONPATH so scripts can import from it
+            PYTHONPATH: process.env.PYTHONPATH
+                ? process.env.PYTHONPATH + path.delimiter + path.join(__dirname, '..')
+                : path.join(__dirname, '..'),
+            'GOOGLE_API_KEY': getGoogleApiKey(),
+            BRIDGE_TOKEN_REFRESH: tokenRefreshConfig
+        }
+    }), kind);
+}
+
+// Temp NDJSON file for a set of rows (Fix for ENAMETOOLONG: rows never go on the command line)
+function writeRunData(rows) {
+    const timestamp = Date.now();
+    const dataFileName = `run_data_${timestamp}_${Math.random().toString(36).substring(7)}.ndjson`;
+    const dataFilePath = path.join(__dirname, '..', 'temp_data', dataFileName);
+    const tempDataDir = path.dirname(dataFilePath);
+    try {
+        if (!fs.existsSync(tempDataDir)) fs.mkdirSync(tempDataDir, { recursive: true });
+        writeNdjsonSync(dataFilePath, rows);
+    } catch (fileErr) {
+        console.error('[Execute] Failed to write data file:', fileErr);
+        throw new Error('Failed to prepare execution data');
+    }
+    return dataFilePath;
+}
+
+// Classify a parsed bridge result block: { kind: 'success' | 'unauthorized' | 'error', result }
+// `unauthorized`: a row reported 401 (scanned by BridgeOutputParser as rows arrived)
+function classifyBridgeResult(scriptName, result, unauthorized) {
+    if (result.status === 'error') {
+        metrics.recordExecution(scriptName, 'error', result);
+        return { kind: 'error', result };
+    }
+
+    // Run metrics (components/metrics.py): server log only, the UI still gets result.data
+    if (result.metrics) {
+        const m = result.metrics;
+        console.log(`[Execute] Metrics: ${m.http_requests} requests in ${m.duration_s}s, ` +
+            `rows p50 ${m.rows && m.rows.p50_ms}ms / p95 ${m.rows && m.rows.p95_ms}ms, ` +
+            `peak in-flight ${m.concurrency && m.concurrency.peak_inflight}`);
+    }
+    if (result.profile) {
+        console.log(`[Execute] Profile: ${result.profile.samples} samples -> ${result.profile.collapsed} (summary: ${result.profile.summary})`);
+    }
+    if (result.cancelled) {
+        console.warn(`[Execute] Run stopped early (${result.cancelled}); returning ${Array.isArray(result.data) ? result.data.length : 0} finished rows.`);
+    }
+
+    // [401 PROPAGATION]
+    // Session timeout indicators (Status: 401) in the results
+    if (unauthorized) {
+        console.warn('[Execute] Detected Session Timeout (401) in script results. Propagating 401 status.');
+        metrics.recordExecution(scriptName, 'unauthorized', result);
+        metrics.unauthorizedEvents.inc({ script: scriptName });
+        return { kind: 'unauthorized', result };
+    }
+
+    metrics.recordExecution(scriptName, 'success', result);
+    return { kind: 'success', result };
+}
+
+/**
+ * Spawn runner_bridge for one set of rows and parse its output.
+ * Used by /api/scripts/execute (the job queue uses warm workers, see startBridgeWorker).
+ *
+ * Resolves to { kind, result, code, stdoutData, stderrData, error } where kind is
+ * 'success' | 'unauthorized' | 'error' (bridge reported an error) | 'failed' (non-zero exit)
+ * | 'invalid_output'. Rejects only if the run could not be prepared.
+ * `onSpawn(child)` receives the process. Aborting `signal` (or reaching `deadline`, epoch ms)
+ * cancels cooperatively: finished rows come back with result.cancelled set, and the process
+ * is killed only if it has not exited `graceSeconds` later.
+ */
+function runBridge({ scriptName, scriptRun, rows, token, envConfig, refreshToken, debug, profile, localPort, onSpawn,
+    signal, deadline, graceSeconds = 30 }) {
+    return new Promise((resolve, reject) => {
+        // Prepare Arguments
+        // NDJSON (one row per line) so we never build one giant JSON string here
+        // and the bridge can parse/stream it line by line.
+        let dataFilePath;
+        try {
+            dataFilePath = writeRunData(rows);
+        } catch (e) {
+            return reject(e);
+        }
+
+        const args = bridgeArgs(scriptRun, { token, envConfig, debug, profile, deadline });
+        args.splice(3, 0, "--data-file", dataFilePath, "--data-format", "ndjson");
+        args.push("--control-stdin");
+
+        console.log(`Executing Python Script: ${scriptName}`);
+        console.log(`[Execute] Env Config:`, JSON.stringify(envConfig));
+
+        metrics.rowsProcessed.inc({ script: scriptName }, rows.length);
+        const spawnedAt = process.hrtime.bigint();
+        const runner = spawnBridge(args, { envConfig, refreshToken, localPort }, 'execute');
+        if (onSpawn) onSpawn(runner);
+        runner.stdin.on('error', () => { }); // EPIPE if the bridge already exited
+
+        // Cooperative cancel first, hard kill after the grace period
+        let killTimer = null;
+        const requestCancel = (reason) => {
+            if (killTimer || runner.exitCode !== null) return;
+            console.warn(`[Execute] Cancelling ${scriptName}: ${reason}`);
+            sendBridgeCancel(runner, reason);
+            killTimer = setTimeout(() => runner.kill(), graceSeconds * 1000);
+        };
+        const onAbort = () => requestCancel(String(signal.reason || 'Cancelled'));
+        if (signal) {
+            if (signal.aborted) onAbort();
+            else signal.addEventListener('abort', onAbort, { once: true });
+        }
+        // The bridge enforces the deadline itself; this is the backstop if it is stuck in a row
+        const deadlineTimer = deadline
+            ? setTimeout(() => requestCancel('Deadline exceeded'), Math.max(0, deadline - Date.now()) + 1000)
+            : null;
+
+        // Logs go to a bounded ring, result rows are parsed as they arrive (backend/bridge_output.js)
+        let parsed = null;
+        const parser = new BridgeOutputParser({ onResult: (result, info) => { parsed = { result, ...info }; } });
+        const stderrLog = new LogRing(64 * 1024);
+
+        runner.stdout.on('data', (data) => {
+            metrics.stdoutBytes.inc({ script: scriptName }, data.length);
+            parser.feed(data);
+        });
+
+        runner.stderr.on('data', (data) => {
+            stderrLog.push(data.toString());
+        });
+
+        runner.on('close', (code) => {
+            metrics.bridgeWallSeconds.observe({ script: scriptName }, Number(process.hrtime.bigint() - spawnedAt) / 1e9);
+            clearTimeout(killTimer);
+            clearTimeout(deadlineTimer);
+            if (signal) signal.removeEventListener('abort', onAbort);
+            // Cleanup Data File
+            try { if (fs.existsSync(dataFilePath)) fs.unlinkSync(dataFilePath); } catch (e) { }
+            parser.end();
+
+            // Recent log lines (not the full output) for error details
+            let stdoutData = parser.logText();
+            const stderrData = stderrLog.text();
+            if (parsed && parsed.result) {
+                stdoutData += '\n---JSON_START---\n' + JSON.stringify({ ...parsed.result, data: undefined });
+            }
+
+            if (code !== 0) {
+                metrics.recordExecution(scriptName, 'error');
+                console.error(`Python Script Failed (${code}):`, stderrData);
+                // Try to see if there is an error message in stdout as well
+                console.error(`Python Script Output (stdout tail):`, stdoutData);
+                return resolve({ kind: 'failed', code, stdoutData, stderrData });
+            }
+
+            // Bridge prints: ---JSON_START--- followed by the result object (after any script logs)
+            if (!parsed || !parsed.result) {
+                metrics.recordExecution(scriptName, 'invalid_output');
+                const reason = (parsed && parsed.error) || parser.error || 'No JSON start delimiter found in output';
+                console.error('Failed to parse Python output:', reason);
+                return resolve({
+                    kind: 'invalid_output',
+                    code,
+                    stdoutData,
+                    error: `${reason}\n\n[Output tail]:\n${stdoutData}`
+                });
+            }
+            resolve({ ...classifyBridgeResult(scriptName, parsed.result, parsed.unauthorized), code });
+        });
+    });
+}
+
+/**
+ * Warm bridge worker for the job scheduler: one `runner_bridge --serve` process that keeps
+ * the interpreter, imports, interceptor and token alive and runs work units sent over stdin.
+ *
+ * Returns { child, run(rows) -> Promise<outcome like runBridge>, cancel(reason, graceSeconds), close() }.
+ * Units run one at a time; if the process dies mid-unit the unit resolves as 'failed' and the
+ * worker is dead. cancel() lets the unit in flight finish its dispatched rows (partial result).
+ * `logFile` keeps the full worker log (the console only gets a bounded copy in memory).
+ */
+function startBridgeWorker({ scriptName, scriptRun, token, envConfig, refreshToken, debug, profile, localPort, deadline, logFile, rowIndex }) {
+    const args = bridgeArgs(scriptRun, { token, envConfig, debug, profile, deadline });
+    args.push("--serve");
+    const spawnedAt = process.hrtime.bigint();
+    const child = spawnBridge(args, { envConfig, refreshToken, localPort }, 'worker');
+
+    let current = null;     // { resolve, dataFilePath }
+    let unitSeq = 0;
+    const stderrLog = new LogRing(64 * 1024);
+    const worker = { child, dead: false };
+
+    const settle = (outcome) => {
+        const unit = current;
+        current = null;
+        try { if (fs.existsSync(unit.dataFilePath)) fs.unlinkSync(unit.dataFilePath); } catch (e) { }
+        unit.resolve(outcome);
+    };
+
+    // One parser for all units: it returns to log mode after every result block
+    const parser = new BridgeOutputParser({
+        logFile,
+        onResult: (result, info) => {
+            if (!current) return;
+            if (!result) {
+                metrics.recordExecution(scriptName, 'invalid_output');
+                return settle({ kind: 'invalid_output', code: 0, stdoutData: parser.logText(), error: info.error });
+            }
+            settle({ ...classifyBridgeResult(scriptName, result, info.unauthorized), code: 0 });
+        }
+    });
+    child.stdout.on('data', (data) => {
+        metrics.stdoutBytes.inc({ script: scriptName }, data.length);
+        parser.feed(data);
+    });
+
+    child.stderr.on('data', (data) => {
+        stderrLog.push(data.toString());
+    });
+    child.stdin.on('error', () => { }); // EPIPE after a crash surfaces through 'close'
+
+    child.on('close', (code) => {
+        worker.dead = true;
+        parser.end();
+        metrics.bridgeWallSeconds.observe({ script: scriptName }, Number(process.hrtime.bigint() - spawnedAt) / 1e9);
+        if (current) {
+            metrics.recordExecution(scriptName, 'error');
+            console.error(`[Worker] Bridge worker exited (${code}) during a unit:`, stderrLog.text());
+            settle({ kind: 'failed', code, stdoutData: parser.logText(), stderrData: stderrLog.text() });
+        }
+    });
+    child.on('error', (e) => {
+        worker.dead = true;
+        stderrLog.push(e.message);
+    });
+
+    worker.run = (rows, { retry = false } = {}) => new Promise((resolve, reject) => {
+        if (worker.dead) return resolve({ kind: 'failed', code: null, stdoutData: parser.logText(), stderrData: stderrLog.text() });
+        let dataFilePath;
+        try {
+            dataFilePath = writeRunData(rows);
+        } catch (e) {
+            return reject(e);
+        }
+        metrics.rowsProcessed.inc({ script: scriptName }, rows.length);
+        current = { resolve, dataFilePath };
+        const request = { unit: ++unitSeq, dataFile: dataFilePath };
+        // Upload index of every row: run journal keys (units are not contiguous after grouping/stealing)
+        if (rowIndex) request.rowIndexes = rows.map(row => rowIndex.get(row));
+        // Previous worker died mid-unit: skip rows the journal has seen
+        if (retry) request.retry = true;
+        child.stdin.write(JSON.stringify(request) + '\n');
+    });
+
+    // Cooperative cancel of the unit in flight; killed if still busy after graceSeconds
+    worker.cancel = (reason, graceSeconds = 30) => {
+        if (worker.dead) return;
+        sendBridgeCancel(child, reason);
+        const timer = setTimeout(() => { if (current && !worker.dead) child.kill(); }, graceSeconds * 1000);
+        if (timer.unref) timer.unref();
+    };
+
+    // End of input lets the bridge exit on its own; kill only if it is stuck mid-unit
+    worker.close = () => {
+        if (worker.dead) return;
+        if (current) child.kill();
+        else child.stdin.end();
+    };
+    return worker;
+}
+
 // Helper for GET requests
 function handleGetRequest(req, res, pathSuffix, logPrefix) {
     const { environment, tenant } = req.query;
@@ -155,6 +578,12 @@ function handleGetRequest(req, res, pathSuffix, logPrefix) {
 }
 
 module.exports = function (app) {
+    // GET /metrics - Prometheus text format (backend/metrics.js); survives the per-run console.clear()
+    app.get('/metrics', (req, res) => {
+        res.set('Content-Type', 'text/plain; version=0.0.4; charset=utf-8');
+        res.send(metrics.render());
+    });
+
     // POST /api/geocode - Get address components from Google Geocoding API
     app.post('/api/geocode', async (req, res) => {
         const { address, lat, lng } = req.body;
@@ -808,7 +1237,7 @@ module.exports = function (app) {
         console.clear();
         console.log('\n--- NEW SCRIPT EXECUTION STARTED ---\n');
 
-        const { scriptName, rows, token, envConfig } = req.body;
+        const { scriptName, rows, token, envConfig, refreshToken } = req.body;
         console.log(`[DEBUG] /api/scripts/execute - Body Keys: ${Object.keys(req.body || {}).join(', ')}`);
         console.log(`[DEBUG] scriptName: ${scriptName}, rows length: ${rows ? rows.length : 'N/A'}`);
 
@@ -816,193 +1245,276 @@ module.exports = function (app) {
             return res.status(400).json({ error: 'Missing required parameters' });
         }
 
-        const finalToken = token || "";
-
         // [Fix for Parity with Test Run] Inject apiBaseUrl if missing
-        if (envConfig && envConfig.environment) {
-            console.log(`[Execute] Resolving URL for env: ${envConfig.environment}`);
-            const { apiBaseUrl } = getEnvUrls(envConfig.environment);
-            if (apiBaseUrl) {
-                envConfig.apiBaseUrl = apiBaseUrl;
-                // Also ensure 'apiurl' and 'base_url' are set for parity with legacy/hallucinated scripts
-                if (!envConfig.apiurl) envConfig.apiurl = apiBaseUrl;
-                if (!envConfig.base_url) envConfig.base_url = apiBaseUrl;
-            }
-        }
+        applyEnvUrls(envConfig);
 
         // Locate the script
-        // UPDATED: Runnable scripts are now in 'Converted Scripts' sibling folder
-        const scriptPath = path.join(__dirname, '..', 'Converted Scripts', scriptName);
-        const bridgePath = path.join(__dirname, '..', 'Manager', 'runner_bridge.py');
-
-        console.log(`[Execute] Looking for script at: ${scriptPath}`);
-        if (!fs.existsSync(scriptPath)) {
-            console.error(`[Execute] Script NOT FOUND at: ${scriptPath}`);
+        const scriptRun = resolveScriptRun(scriptName);
+        if (!scriptRun) {
             return res.status(404).json({ error: 'Script file not found' });
         }
 
-        // LOAD COLUMNS FROM REGISTRY (Fallback to Code Header)
-        let columns = [];
-        try {
-            const registryPath = path.join(__dirname, '..', 'System', 'scripts_registry.json');
-            if (fs.existsSync(registryPath)) {
-                const registry = JSON.parse(fs.readFileSync(registryPath, 'utf8'));
-                const entry = registry.find(r => r.filename === scriptName || r.name === scriptName);
-                if (entry) {
-                    columns = entry.expected_columns || (entry.columns ? entry.columns.map(c => c.name || c.header) : []);
-                }
-            }
+        // The browser gave up (tab closed / request aborted): let the bridge wind down instead of
+        // spending API calls on rows nobody will see. Optional deadlineSeconds bounds the run.
+        const controller = new AbortController();
+        res.on('close', () => {
+            if (!res.writableFinished) controller.abort('Client disconnected');
+        });
+        const deadlineSeconds = Number(req.body.deadlineSeconds) || 0;
 
-            // FALLBACK 0: Read from Code Header (Truth Source)
-            if (columns.length === 0) {
+        let outcome;
+        try {
+            outcome = await runBridge({
+                scriptName, scriptRun, rows, token, envConfig, refreshToken,
+                debug: req.body.debug === true,
+                profile: req.body.profile === true,
+                localPort: req.socket.localPort,
+                signal: controller.signal,
+                deadline: deadlineSeconds > 0 ? Date.now() + deadlineSeconds * 1000 : null
+            });
+        } catch (e) {
+            return res.status(500).json({ error: e.message });
+        } finally {
+            // Cleanup Temporary Test Scripts
+            if (scriptName.startsWith('TEST_')) {
                 try {
-                    const content = fs.readFileSync(scriptPath, 'utf8');
-                    const headerMatch = content.match(/#\s*EXPECTED_INPUT_COLUMNS:\s*([^\n]+)/);
-                    if (headerMatch && headerMatch[1]) {
-                        columns = headerMatch[1].split(',').map(c => c.trim()).filter(c => c);
-                    }
-                } catch (e) {
-                    console.error("[Execute] Failed to parse columns from code header:", e);
+                    if (fs.existsSync(scriptRun.scriptPath)) fs.unlinkSync(scriptRun.scriptPath);
+                } catch (cleanupErr) {
+                    console.error('Warning: Failed to cleanup temp script:', cleanupErr.message);
                 }
             }
-        } catch (e) {
-            console.warn(`[Execute] Failed to load columns for script: ${e.message}`);
         }
 
-        // Prepare Arguments
-        // Fix for ENAMETOOLONG: Write rows to temp file
-        const timestamp = Date.now();
-        const dataFileName = `run_data_${timestamp}_${Math.random().toString(36).substring(7)}.json`;
-        const dataFilePath = path.join(__dirname, '..', 'temp_data', dataFileName);
-        const tempDataDir = path.dirname(dataFilePath);
-        try {
-            if (!fs.existsSync(tempDataDir)) fs.mkdirSync(tempDataDir, { recursive: true });
-            fs.writeFileSync(dataFilePath, JSON.stringify(rows));
-        } catch (fileErr) {
-            console.error('[Execute] Failed to write data file:', fileErr);
-            return res.status(500).json({ error: 'Failed to prepare execution data' });
+        const { kind, result } = outcome;
+        if (kind === 'failed') {
+            return res.status(500).json({
+                error: 'Script execution failed',
+                details: outcome.stderrData + "\n---\n" + outcome.stdoutData
+            });
+        }
+        if (kind === 'invalid_output') {
+            return res.status(500).json({ error: 'Invalid output from script', details: outcome.error });
+        }
+        if (kind === 'error') {
+            return res.status(500).json({ error: result.message, trace: result.traceback });
+        }
+        if (result.profile) {
+            res.set('X-Profile-Summary', path.basename(result.profile.summary));
+        }
+        if (result.cancelled) {
+            // Partial results: only rows that finished before the cancel/deadline
+            res.set('X-Run-Cancelled', result.cancelled);
         }
+        if (kind === 'unauthorized') {
+            return res.status(401).json(result.data);
+        }
+        res.json(result.data);
+    });
 
-        const args = [
-            bridgePath,
-            "--script", scriptPath,
-            "--data-file", dataFilePath,
-            "--token", finalToken,
-            "--env", JSON.stringify(envConfig || {}),
-            "--columns", JSON.stringify(columns)
-        ];
+    // ---------------------------------------------------------------------------
+    // Async job queue (backend/jobs.js): submit returns a job id, the server runs it
+    // ---------------------------------------------------------------------------
+    const jobManager = new JobManager({
+        limits: loadLimits(readDb()),
+        // Warm runner_bridge --serve processes fed by the scheduler (backend/scheduler.js)
+        startWorker: (job) => startBridgeWorker({
+            scriptName: job.scriptName,
+            token: job.token,
+            deadline: job.deadline,
+            logFile: path.join(path.dirname(job.resultsPath), 'bridge.log'),
+            rowIndex: job.rowIndex,
+            ...job.options
+        })
+    });
 
-        // Only add debug flag if explicitly requested (e.g. from Test Run or strict debug mode)
-        // We do NOT want this on by default for Production runs just because attributes are allowed.
-        if (req.body.debug === true) {
-            args.push("--debug");
+    // Job access check: the caller must send the key returned when the job was submitted
+    // (the bearer token cannot be verified here, so it does not grant access)
+    const findJob = (req, res) => {
+        const job = jobManager.get(req.params.id);
+        if (!job) {
+            res.status(404).json({ error: 'Job not found' });
+            return null;
         }
+        if (!jobManager.checkKey(job, req.headers['x-job-key'])) {
+            res.status(403).json({ error: 'Missing or invalid job key' });
+            return null;
+        }
+        return job;
+    };
 
-        console.log(`Executing Python Script: ${scriptName}`);
-        console.log(`[Execute] Env Config:`, JSON.stringify(envConfig));
-
-        const runner = spawn('python', ['-u', ...args], {
-            windowsHide: true,
-            env: {
-                ...process.env,
-                PYTHONIOENCODING: 'utf-8',
-                // Add components folder to PYTHONPATH so scripts can import from it
-                PYTHONPATH: process.env.PYTHONPATH
-                    ? process.env.PYTHONPATH + path.delimiter + path.join(__dirname, '..')
-                    : path.join(__dirname, '..'),
-                'GOOGLE_API_KEY': getGoogleApiKey()
+    // POST /api/jobs - Queue a script execution (same body as /api/scripts/execute)
+    app.post('/api/jobs', (req, res) => {
+        const { scriptName, rows, token, envConfig, refreshToken } = req.body;
+        if (!scriptName || !Array.isArray(rows)) {
+            return res.status(400).json({ error: 'Missing required parameters' });
+        }
+        if (!token) {
+            return res.status(401).json({ error: 'A token is required to submit a job' });
+        }
+        applyEnvUrls(envConfig);
+        const scriptRun = resolveScriptRun(scriptName);
+        if (!scriptRun) {
+            return res.status(404).json({ error: 'Script file not found' });
+        }
+        // Work unit planning from the registry (what script.js used to batch by)
+        const entry = scriptRun.entry || {};
+        const { job, jobKey } = jobManager.submit({
+            token,
+            scriptName,
+            rows,
+            plan: {
+                batchSize: parseInt(entry.batchSize, 10) || 1,
+                multithreaded: entry.isMultithreaded === true,
+                groupByColumn: entry.groupByColumn || ''
+            },
+            // Optional wall-clock limit from submission; the job then returns what finished
+            deadlineSeconds: Number(req.body.deadlineSeconds) || Number(entry.deadlineSeconds) || 0,
+            rowOffset: (envConfig && Number.isInteger(envConfig.rowOffset) && envConfig.rowOffset > 0) ? envConfig.rowOffset : 0,
+            options: {
+                scriptRun,
+                envConfig,
+                refreshToken,
+                debug: req.body.debug === true,
+                profile: req.body.profile === true,
+                localPort: req.socket.localPort
             }
         });
+        // The key is only returned here: it is required for status, results, cancel and download
+        res.status(202).json({ ...jobManager.describe(job), jobKey });
+    });
 
-        let stdoutData = '';
-        let stderrData = '';
-
-        runner.stdout.on('data', (data) => {
-            const chunk = data.toString();
-            stdoutData += chunk;
-            process.stdout.write(chunk); // Pipe to server console
-        });
+    // GET /api/jobs/:id - Status and progress
+    app.get('/api/jobs/:id', (req, res) => {
+        const job = findJob(req, res);
+        if (job) res.json(jobManager.describe(job));
+    });
 
-        runner.stderr.on('data', (data) => {
-            stderrData += data.toString();
-        });
+    // GET /api/jobs/:id/results?offset=0&limit=1000 - Rows finished so far (partial while running)
+    app.get('/api/jobs/:id/results', async (req, res) => {
+        const job = findJob(req, res);
+        if (!job) return;
+        const offset = Math.max(0, parseInt(req.query.offset, 10) || 0);
+        const limit = Math.min(10000, Math.max(1, parseInt(req.query.limit, 10) || 1000));
+        try {
+            const rows = await jobManager.readResults(job, offset, limit);
+            res.json({
+                status: job.status,
+                offset,
+                nextOffset: offset + rows.length,
+                processedRows: job.processedRows,
+                done: FINAL_STATES.includes(job.status) && offset + rows.length >= job.processedRows,
+                rows
+            });
+        } catch (e) {
+            res.status(500).json({ error: `Failed to read results: ${e.message}` });
+        }
+    });
 
-        runner.on('close', (code) => {
-            // Cleanup Data File
-            try { if (fs.existsSync(dataFilePath)) fs.unlinkSync(dataFilePath); } catch (e) { }
+    // POST /api/jobs/:id/cancel - Stop a queued or running job (rows in flight finish, results are kept)
+    app.post('/api/jobs/:id/cancel', (req, res) => {
+        const job = findJob(req, res);
+        if (job) res.json(jobManager.describe(jobManager.cancel(job.id)));
+    });
 
-            if (code !== 0) {
-                console.error(`Python Script Failed (${code}):`, stderrData);
-                // Try to see if there is an error message in stdout as well
-                console.error(`Python Script Output (stdout):`, stdoutData);
+    // GET /api/jobs/:id/download?format=json|ndjson|xlsx|csv|parquet - Results file (streamed, not buffered)
+    app.get('/api/jobs/:id/download', async (req, res) => {
+        const job = findJob(req, res);
+        if (!job) return;
+        const format = ['ndjson', 'xlsx', 'csv', 'parquet'].includes(req.query.format) ? req.query.format : 'json';
+        const baseName = `${path.parse(job.scriptName).name}_${job.id.slice(0, 8)}`;
+        if (exporter.FORMATS[format]) {
+            return exportJobResults(job, format, baseName, res);
+        }
+        res.set('Content-Disposition', `attachment; filename="${baseName}.${format}"`);
 
-                return res.status(500).json({
-                    error: 'Script execution failed',
-                    details: stderrData + "\n---\n" + stdoutData
-                });
+        const input = fs.createReadStream(job.resultsPath, { encoding: 'utf8' });
+        input.on('error', (e) => {
+            if (!res.headersSent) res.status(500).json({ error: e.message });
+            else res.end();
+        });
+        if (format === 'ndjson') {
+            res.type('application/x-ndjson');
+            return input.pipe(res);
+        }
+        res.type('application/json');
+        res.write('[');
+        let first = true;
+        const lines = readline.createInterface({ input, crlfDelay: Infinity });
+        lines.on('line', (line) => {
+            if (!line) return;
+            if (!res.write((first ? '' : ',') + line)) {
+                lines.pause();
+                res.once('drain', () => lines.resume());
             }
+            first = false;
+        });
+        lines.on('close', () => res.end(']'));
+    });
 
-            try {
-                // Parse distribution from bridge
-                // Bridge prints JSON to stdout. User script might have printed logs before it.
-                // We look for the last line or substring that looks like JSON.
-                // The bridge prints: print(json.dumps({"status": "success", ...}))
-                // So we look for the last "{" and parse from there.
-
-                const raw = stdoutData.trim();
-                // Robust Delimiter-based parsing
-                const delimiter = '---JSON_START---';
-                const parts = raw.split(delimiter);
-
-                let jsonStr;
-                if (parts.length < 2) {
-                    // Fallback for older scripts or crash before delimiter
-                    throw new Error('No JSON start delimiter found in output');
-                } else {
-                    jsonStr = parts[parts.length - 1].trim();
-                }
-
-                const result = JSON.parse(jsonStr);
-
-                if (result.status === 'error') {
-                    return res.status(500).json({ error: result.message, trace: result.traceback });
-                }
-
-                // [401 PROPAGATION]
-                // Scan results for session timeout indicators (Status: 401)
-                const hasUnauthorizedError = Array.isArray(result.data) && result.data.some(row => {
-                    const responseText = String(row.Response || row.response || '');
-                    return responseText.includes('Status: 401');
-                });
-
-                if (hasUnauthorizedError) {
-                    console.warn('[Execute] Detected Session Timeout (401) in script results. Propagating 401 status.');
-                    return res.status(401).json(result.data);
-                }
-
-                res.json(result.data);
+    // Spreadsheet exports (backend/export.js): columns in outputConfig.uiMapping order,
+    // rows streamed from results.ndjson so a 200k-row job never sits in memory
+    const exportJobResults = async (job, format, baseName, res) => {
+        const entry = (job.options.scriptRun && job.options.scriptRun.entry) || {};
+        let columns;
+        try {
+            columns = await exporter.exportColumns(job.resultsPath, entry.outputConfig);
+        } catch (e) {
+            return res.status(500).json({ error: `Failed to read results: ${e.message}` });
+        }
+        res.set('X-Job-Status', job.status);
+        if (format === 'parquet') {
+            return exportParquet(job, columns, baseName, res);
+        }
+        res.type(exporter.FORMATS[format].type);
+        res.set('Content-Disposition', `attachment; filename="${baseName}.${format}"`);
+        try {
+            if (format === 'csv') await exporter.writeCsv(job.resultsPath, columns, res);
+            else await exporter.writeXlsx(job.resultsPath, columns, res);
+        } catch (e) {
+            console.error(`[Export] ${format} export of job ${job.id} failed:`, e.message);
+            if (!res.headersSent) res.status(500).json({ error: `Export failed: ${e.message}` });
+            else res.destroy(e);
+        }
+    };
 
-            } catch (e) {
-                console.error('Failed to parse Python output:', e);
-                console.error('Raw Output:', stdoutData);
-                // DEBUG: Show what we failed to parse
-                const extractionDebug = (typeof jsonStr !== 'undefined') ? `\n[Extracted]: ${jsonStr}` : '\n[Extraction Failed]';
-                res.status(500).json({
-                    error: 'Invalid output from script',
-                    details: `Parse Error: ${e.message}\n${extractionDebug}\n\n[Full Output]:\n${stdoutData}`
-                });
-            } finally {
-                // Cleanup Temporary Test Scripts
-                if (scriptName.startsWith('TEST_')) {
-                    try {
-                        if (fs.existsSync(scriptPath)) fs.unlinkSync(scriptPath);
-                    } catch (cleanupErr) {
-                        console.error('Warning: Failed to cleanup temp script:', cleanupErr.message);
-                    }
-                }
+    // Parquet is written by Manager/export_results.py (pyarrow) into the job folder, then streamed
+    const exportParquet = (job, columns, baseName, res) => {
+        const exporterPath = path.join(__dirname, '..', 'Manager', 'export_results.py');
+        const outputPath = path.join(path.dirname(job.resultsPath), `export_${Date.now()}.parquet`);
+        const removeOutput = () => fs.unlink(outputPath, () => { });
+        const pyProc = metrics.trackProcess(spawn('python', [
+            exporterPath, '--input', job.resultsPath, '--output', outputPath, '--columns', JSON.stringify(columns)
+        ], {
+            windowsHide: true,
+            env: { ...process.env, PYTHONIOENCODING: 'utf-8' }
+        }), 'export');
+        let err = '';
+        pyProc.stderr.on('data', d => err += d.toString());
+        pyProc.on('error', (e) => {
+            removeOutput();
+            if (!res.headersSent) res.status(500).json({ error: `Export failed: ${e.message}` });
+        });
+        pyProc.on('close', (code) => {
+            if (code === 3) {
+                removeOutput();
+                return res.status(501).json({ error: 'Parquet export needs pyarrow on the server (pip install pyarrow)' });
+            }
+            if (code !== 0) {
+                removeOutput();
+                return res.status(500).json({ error: 'Parquet export failed', details: err });
             }
+            res.type(exporter.FORMATS.parquet.type);
+            res.set('Content-Disposition', `attachment; filename="${baseName}.parquet"`);
+            const input = fs.createReadStream(outputPath);
+            input.on('error', (e) => {
+                removeOutput();
+                if (!res.headersSent) res.status(500).json({ error: e.message });
+                else res.end();
+            });
+            input.on('close', removeOutput);
+            input.pipe(res);
         });
-    });
+    };
 
     // Configure Multer for Script Uploads
     const upload = multer({
@@ -1022,9 +1534,10 @@ module.exports = function (app) {
 
     // POST Generate Token for User Aggregate
     app.post('/api/user-aggregate/token', async (req, res) => {
-        const { environment, tenant, username, password } = req.body;
+        const { environment, tenant, username, password, refreshToken } = req.body;
 
-        if (!environment || !tenant || !username || !password) {
+        // Either a password login or a refresh_token grant (used by runner_bridge token refresh)
+        if (!environment || !tenant || (!refreshToken && (!username || !password))) {
             return res.status(400).json({ error: 'All fields are required' });
         }
 
@@ -1037,9 +1550,14 @@ module.exports = function (app) {
 
         // Prepare form data
         const formData = new URLSearchParams();
-        formData.append('grant_type', 'password');
-        formData.append('username', username);
-        formData.append('password', password);
+        if (refreshToken) {
+            formData.append('grant_type', 'refresh_token');
+            formData.append('refresh_token', refreshToken);
+        } else {
+            formData.append('grant_type', 'password');
+            formData.append('username', username);
+            formData.append('password', password);
+        }
         formData.append('client_id', 'resource_server');
         formData.append('client_secret', 'resource_server');
         formData.append('scope', 'openid');
@@ -1156,9 +1674,9 @@ module.exports = function (app) {
         if (!description) return res.status(400).json({ error: 'Missing description' });
 
         const generatorPath = path.join(__dirname, '..', 'Manager', 'script_generator.py');
-        const pythonProcess = spawn('python', [generatorPath], {
+        const pythonProcess = metrics.trackProcess(spawn('python', [generatorPath], {
             env: { ...process.env, PYTHONIOENCODING: 'utf-8', 'GOOGLE_API_KEY': getGoogleApiKey() }
-        });
+        }), 'generate');
 
         let stdoutData = '';
         pythonProcess.stdout.on('data', d => stdoutData += d.toString());
@@ -1319,9 +1837,9 @@ module.exports = function (app) {
         const analyzerPath = path.join(__dirname, '..', 'Manager', 'script_analyzer.py');
 
         // Spawn Python Analyzer
-        const pythonProcess = spawn('python', [analyzerPath], {
+        const pythonProcess = metrics.trackProcess(spawn('python', [analyzerPath], {
             env: { ...process.env, PYTHONIOENCODING: 'utf-8', 'GOOGLE_API_KEY': getGoogleApiKey() }
-        });
+        }), 'analyze');
 
         let stdoutData = '';
         let stderrData = '';
@@ -1420,9 +1938,9 @@ module.exports = function (app) {
 
         const runConversion = () => {
             return new Promise((resolve, reject) => {
-                const pyProc = spawn('python', [converterPath], {
+                const pyProc = metrics.trackProcess(spawn('python', [converterPath], {
                     env: { ...process.env, PYTHONIOENCODING: 'utf-8' }
-                });
+                }), 'convert');
                 let result = '';
                 let err = '';
 
@@ -1470,7 +1988,7 @@ module.exports = function (app) {
             i === 0 ? a : (args[i - 1] === '--token' ? '[REDACTED]' : (args[i - 1] === '--data' ? '[DATA]' : a))
         ).join(' '));
 
-        const pythonProcess = spawn('python', args, {
+        const pythonProcess = metrics.trackProcess(spawn('python', args, {
             env: {
                 ...process.env,
                 PYTHONIOENCODING: 'utf-8',
@@ -1479,7 +1997,7 @@ module.exports = function (app) {
                     : path.join(__dirname, '..'),
                 'GOOGLE_API_KEY': getGoogleApiKey()
             }
-        });
+        }), 'test_run');
 
         // Set a timeout to prevent indefinite hanging (90 seconds)
         const TIMEOUT_MS = 90000;
@@ -1709,10 +2227,10 @@ module.exports = function (app) {
                         args.push('--no-threading');
                     }
 
-                    const pyProc = spawn('python', args, {
+                    const pyProc = metrics.trackProcess(spawn('python', args, {
                         windowsHide: true,
                         env: { ...process.env, PYTHONIOENCODING: 'utf-8' }
-                    });
+                    }), 'convert');
                     let result = '';
                     let err = '';
                     pyProc.stdout.on('data', d => result += d.toString());
@@ -2077,10 +2595,10 @@ module.exports = function (app) {
 
         const reverserPath = path.join(__dirname, '..', 'Manager', 'script_reverser.py');
 
-        const pythonProcess = spawn('python', [reverserPath], {
+        const pythonProcess = metrics.trackProcess(spawn('python', [reverserPath], {
             windowsHide: true,
             env: { ...process.env, PYTHONIOENCODING: 'utf-8', 'GOOGLE_API_KEY': getGoogleApiKey() }
-        });
+        }), 'reverse');
 
         let stdoutData = '';
         let stderrData = '';
@@ -0,0 +1,227 @@
+/**
+ * Bridge Output
+ * Incremental parser for runner_bridge stdout.
+ *
+ * The execute handler used to append every stdout chunk to one string and split it at
+ * exit. Scripts that log request/response bodies produced hundreds of MB that way. Here
+ * stdout is split into lines as it arrives and each line is routed by frame:
+ *
+ *   log lines           -> echoed to the console, kept in a bounded ring (and an optional file)
+ *   [OUTPUT_DATA_DUMP]  -> skipped (a copy of the results, only the test-run view reads it)
+ *   ---RESULTS_START--- -> one result row per line (runner_bridge --result-frames), parsed
+ *                          one at a time and checked for 401s as they arrive
+ *   ---JSON_START---    -> the next line is the result object (status, metrics, ...)
+ *
+ * After a result object the parser is back in log mode, so warm workers (--serve) reuse
+ * one parser for all of their units.
+ *
+ * Usage:
+ *   const parser = new BridgeOutputParser({ onResult: (result, info) => ... });
+ *   child.stdout.on('data', chunk => parser.feed(chunk));
+ *   child.on('close', () => parser.end());
+ */
+
+const fs = require('fs');
+
+const NEWLINE = 0x0a;
+const DEFAULT_LOG_BYTES = 256 * 1024;
+const DEFAULT_MAX_LOG_LINE = 16 * 1024;
+
+/**
+ * Keeps the most recent `maxBytes` of text (oldest lines are dropped).
+ */
+class LogRing {
+    constructor(maxBytes = DEFAULT_LOG_BYTES) {
+        this.maxBytes = maxBytes;
+        this.lines = [];
+        this.head = 0;
+        this.bytes = 0;
+        this.dropped = 0;
+    }
+
+    push(line) {
+        this.lines.push(line);
+        this.bytes += line.length + 1;
+        while (this.bytes > this.maxBytes && this.head < this.lines.length - 1) {
+            this.bytes -= this.lines[this.head].length + 1;
+            this.lines[this.head++] = null;
+            this.dropped++;
+        }
+        // Compact now and then instead of shifting on every push
+        if (this.head > 1024 && this.head * 2 > this.lines.length) {
+            this.lines = this.lines.slice(this.head);
+            this.head = 0;
+        }
+    }
+
+    text() {
+        const kept = this.lines.slice(this.head).join('\n');
+        return this.dropped ? `[... ${this.dropped} earlier lines dropped ...]\n${kept}` : kept;
+    }
+}
+
+class BridgeOutputParser {
+    /**
+     * @param {object} [options]
+     * @param {function} [options.onResult]   (result, { rows, unauthorized }) once per result block;
+     *                                        framed rows are put back into result.data
+     * @param {function} [options.onRow]      (row) for each framed result row as it is parsed
+     * @param {boolean}  [options.echo]       Echo log lines to the server console (default true)
+     * @param {number}   [options.maxLogBytes] Size of the log ring
+     * @param {string}   [options.logFile]    Also append every log line to this file
+     */
+    constructor({ onResult = null, onRow = null, echo = true, maxLogBytes = DEFAULT_LOG_BYTES, logFile = null } = {}) {
+        this.onResult = onResult;
+        this.onRow = onRow;
+        this.echo = echo;
+        this.log = new LogRing(maxLogBytes);
+        this.logStream = logFile ? fs.createWriteStream(logFile, { flags: 'a' }) : null;
+        this.mode = 'log';
+        this.partial = [];
+        this.partialBytes = 0;
+        this.truncated = false;
+        this.rows = [];
+        this.unauthorized = false;
+        this.dumpBytes = 0;
+        this.results = 0;
+        this.error = null;
+    }
+
+    // Log lines may be cut short in memory; frames must stay whole
+    get keepsWholeLines() {
+        return this.mode === 'rows' || this.mode === 'result';
+    }
+
+    feed(chunk) {
+        let start = 0;
+        while (start < chunk.length) {
+            const end = chunk.indexOf(NEWLINE, start);
+            if (end === -1) {
+                this.keepPartial(chunk.subarray(start));
+                return;
+            }
+            this.keepPartial(chunk.subarray(start, end));
+            this.flushLine();
+            start = end + 1;
+        }
+    }
+
+    keepPartial(piece) {
+        if (piece.length === 0) return;
+        if (this.mode === 'dump') {
+            this.dumpBytes += piece.length;
+            // Only the closing marker matters; keep the start of the line to recognise it
+            if (this.partialBytes >= 64) return;
+        } else if (!this.keepsWholeLines && this.partialBytes >= DEFAULT_MAX_LOG_LINE) {
+            this.truncated = true;
+            return;
+        }
+        this.partial.push(Buffer.from(piece));
+        this.partialBytes += piece.length;
+    }
+
+    flushLine() {
+        let line = this.partial.length === 1 ? this.partial[0].toString('utf8') : Buffer.concat(this.partial).toString('utf8');
+        if (line.endsWith('\r')) line = line.slice(0, -1);
+        const truncated = this.truncated;
+        this.partial = [];
+        this.partialBytes = 0;
+        this.truncated = false;
+        this.handleLine(line, truncated);
+    }
+
+    handleLine(line, truncated) {
+        const marker = line.trim();
+        if (this.mode === 'dump') {
+            if (marker.startsWith('[/OUTPUT_DATA_DUMP]')) {
+                this.logLine(`[OUTPUT_DATA_DUMP] ${this.dumpBytes} bytes (not kept)`);
+                this.mode = 'log';
+            }
+            return;
+        }
+        if (marker === '---RESULTS_START---') {
+            this.mode = 'rows';
+            return;
+        }
+        if (marker === '---JSON_START---') {
+            this.mode = 'result';
+            return;
+        }
+        if (this.mode === 'rows') {
+            if (!marker) return;
+            this.parseRow(line);
+            return;
+        }
+        if (this.mode === 'result') {
+            if (!marker) return;
+            this.parseResult(line);
+            return;
+        }
+        if (marker === '[OUTPUT_DATA_DUMP]') {
+            this.mode = 'dump';
+            this.dumpBytes = 0;
+            return;
+        }
+        this.logLine(truncated ? `${line} [... line truncated]` : line);
+    }
+
+    logLine(line) {
+        if (this.echo) process.stdout.write(line + '\n'); // Pipe to server console
+        this.log.push(line);
+        if (this.logStream) this.logStream.write(line + '\n');
+    }
+
+    parseRow(line) {
+        let row;
+        try {
+            row = JSON.parse(line);
+        } catch (e) {
+            this.error = `Invalid result row: ${e.message}`;
+            return;
+        }
+        // [401 PROPAGATION] scan as rows arrive instead of over the whole result at the end
+        if (!this.unauthorized && row && String(row.Response || row.response || '').includes('Status: 401')) {
+            this.unauthorized = true;
+        }
+        this.rows.push(row);
+        if (this.onRow) this.onRow(row);
+    }
+
+    parseResult(line) {
+        this.mode = 'log';
+        let result;
+        try {
+            result = JSON.parse(line);
+        } catch (e) {
+            this.error = `Parse Error: ${e.message}\n[Extracted]: ${line.slice(0, 2000)}`;
+            this.rows = [];
+            this.unauthorized = false;
+            if (this.onResult) this.onResult(null, { error: this.error });
+            return;
+        }
+        let unauthorized = this.unauthorized;
+        if (result && result.data === null && Array.isArray(this.rows)) {
+            result.data = this.rows;
+        } else if (result && Array.isArray(result.data)) {
+            // Unframed output (older bridge): scan the inline rows
+            unauthorized = result.data.some(row => String((row && (row.Response || row.response)) || '').includes('Status: 401'));
+        }
+        this.rows = [];
+        this.unauthorized = false;
+        this.error = null;
+        this.results++;
+        if (this.onResult) this.onResult(result, { unauthorized });
+    }
+
+    // End of stream: a last line without a newline still counts
+    end() {
+        if (this.partialBytes > 0) this.flushLine();
+        if (this.logStream) this.logStream.end();
+    }
+
+    logText() {
+        return this.log.text();
+    }
+}
+
+module.exports = { BridgeOutputParser, LogRing };
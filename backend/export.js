@@ -0,0 +1,301 @@
+/**
+ * Export
+ * Streams job results (temp_data/jobs/<id>/results.ndjson) out as XLSX, CSV or Parquet.
+ *
+ * The browser used to build the workbook with XLSX.utils.json_to_sheet after holding every
+ * result in memory, which froze the tab on large runs. Here the NDJSON file is read twice
+ * line by line: once to collect the columns, once to write rows, so memory stays flat
+ * regardless of the number of rows.
+ *
+ * Column order: outputConfig.uiMapping colNames first, then any other keys in first-seen
+ * order, with the lowercase name/code/status/response keys last (as the browser export did).
+ *
+ * XLSX is written without a library: worksheet XML with inline strings (no shared string
+ * table to keep in memory), zipped on the fly (deflateRaw + data descriptors). Parquet is
+ * written by Manager/export_results.py (needs pyarrow).
+ *
+ * Usage:
+ *   const columns = await exportColumns(resultsPath, entry.outputConfig);
+ *   await writeXlsx(resultsPath, columns, res);
+ */
+
+const fs = require('fs');
+const readline = require('readline');
+const zlib = require('zlib');
+
+const FORMATS = {
+    xlsx: { type: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', extension: 'xlsx' },
+    csv: { type: 'text/csv; charset=utf-8', extension: 'csv' },
+    parquet: { type: 'application/vnd.apache.parquet', extension: 'parquet' }
+};
+
+// Keys the UI adds or shows last (same lists as the browser export)
+const HIDDEN_KEYS = ['row'];
+const TRAILING_KEYS = ['name', 'code', 'status', 'response'];
+
+// Excel's cell text limit
+const MAX_CELL_CHARS = 32767;
+
+async function* readRows(ndjsonPath) {
+    const input = fs.createReadStream(ndjsonPath, { encoding: 'utf8' });
+    const lines = readline.createInterface({ input, crlfDelay: Infinity });
+    try {
+        for await (const line of lines) {
+            if (line) yield JSON.parse(line);
+        }
+    } finally {
+        lines.close();
+        input.destroy();
+    }
+}
+
+/**
+ * Export columns for a results file (first pass over the rows).
+ */
+async function exportColumns(ndjsonPath, outputConfig) {
+    const mapped = ((outputConfig && Array.isArray(outputConfig.uiMapping)) ? outputConfig.uiMapping : [])
+        .map(m => m && m.colName)
+        .filter(Boolean);
+    const seen = new Set(mapped);
+    const extras = [];
+    const trailing = new Set();
+    for await (const row of readRows(ndjsonPath)) {
+        if (!row || typeof row !== 'object') continue;
+        for (const key of Object.keys(row)) {
+            if (seen.has(key) || HIDDEN_KEYS.includes(key)) continue;
+            seen.add(key);
+            if (TRAILING_KEYS.includes(key)) trailing.add(key);
+            else extras.push(key);
+        }
+    }
+    return [...mapped, ...extras, ...TRAILING_KEYS.filter(key => trailing.has(key))];
+}
+
+const cellText = (value) => {
+    if (value === null || value === undefined) return '';
+    if (typeof value === 'object') return JSON.stringify(value);
+    return String(value);
+};
+
+// Write respecting backpressure; fails if the stream closes first (client went away)
+const write = (out, chunk) => new Promise((resolve, reject) => {
+    if (out.destroyed) return reject(new Error('Output closed'));
+    if (out.write(chunk)) return resolve();
+    const done = (error) => {
+        out.off('drain', onDrain);
+        out.off('close', onClose);
+        if (error) reject(error);
+        else resolve();
+    };
+    const onDrain = () => done();
+    const onClose = () => done(new Error('Output closed'));
+    out.on('drain', onDrain);
+    out.on('close', onClose);
+});
+
+// -- CSV ------------------------------------------------------------------------------
+
+const csvField = (value) => {
+    const text = cellText(value);
+    return /[",\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+};
+
+async function writeCsv(ndjsonPath, columns, out) {
+    // BOM so Excel opens UTF-8 CSVs correctly
+    await write(out, '﻿' + columns.map(csvField).join(',') + '\r\n');
+    let batch = '';
+    let count = 0;
+    for await (const row of readRows(ndjsonPath)) {
+        batch += columns.map(column => csvField(row ? row[column] : '')).join(',') + '\r\n';
+        if (++count % 500 === 0) {
+            await write(out, batch);
+            batch = '';
+        }
+    }
+    if (batch) await write(out, batch);
+    out.end();
+}
+
+// -- XLSX -----------------------------------------------------------------------------
+
+const CRC_TABLE = (() => {
+    const table = new Int32Array(256);
+    for (let n = 0; n < 256; n++) {
+        let c = n;
+        for (let k = 0; k < 8; k++) c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1;
+        table[n] = c;
+    }
+    return table;
+})();
+
+const crc32 = (buffer, previous = 0) => {
+    let crc = ~previous;
+    for (let i = 0; i < buffer.length; i++) crc = CRC_TABLE[(crc ^ buffer[i]) & 0xff] ^ (crc >>> 8);
+    return ~crc >>> 0;
+};
+
+/**
+ * Minimal streaming ZIP writer (deflate, data descriptors, no Zip64: entries < 4 GB).
+ */
+class ZipWriter {
+    constructor(out) {
+        this.out = out;
+        this.offset = 0;
+        this.entries = [];
+    }
+
+    async emit(buffer) {
+        this.offset += buffer.length;
+        await write(this.out, buffer);
+    }
+
+    /**
+     * Add a file from an (async) iterable of strings/Buffers, compressed as it is read.
+     */
+    async addEntry(name, chunks) {
+        const nameBytes = Buffer.from(name, 'utf8');
+        const headerOffset = this.offset;
+        const header = Buffer.alloc(30);
+        header.writeUInt32LE(0x04034b50, 0);
+        header.writeUInt16LE(20, 4);          // version needed
+        header.writeUInt16LE(0x0808, 6);      // data descriptor + UTF-8 names
+        header.writeUInt16LE(8, 8);           // deflate
+        header.writeUInt32LE(0, 10);          // time/date
+        header.writeUInt32LE(0, 14);          // crc (in descriptor)
+        header.writeUInt32LE(0, 18);          // sizes (in descriptor)
+        header.writeUInt32LE(0, 22);
+        header.writeUInt16LE(nameBytes.length, 26);
+        header.writeUInt16LE(0, 28);
+        await this.emit(Buffer.concat([header, nameBytes]));
+
+        let crc = 0;
+        let size = 0;
+        let compressed = 0;
+        const deflate = zlib.createDeflateRaw();
+        const finished = (async () => {
+            for await (const piece of deflate) {
+                compressed += piece.length;
+                await this.emit(piece);
+            }
+        })();
+        finished.catch(() => { }); // awaited below; avoid an unhandled rejection meanwhile
+        try {
+            for await (const chunk of chunks) {
+                const buffer = Buffer.isBuffer(chunk) ? chunk : Buffer.from(chunk, 'utf8');
+                crc = crc32(buffer, crc);
+                size += buffer.length;
+                await write(deflate, buffer);
+            }
+            deflate.end();
+        } catch (e) {
+            deflate.destroy();
+            // The output side failing is the root cause; report that one
+            await finished;
+            throw e;
+        }
+        await finished;
+
+        const descriptor = Buffer.alloc(16);
+        descriptor.writeUInt32LE(0x08074b50, 0);
+        descriptor.writeUInt32LE(crc, 4);
+        descriptor.writeUInt32LE(compressed, 8);
+        descriptor.writeUInt32LE(size, 12);
+        await this.emit(descriptor);
+        this.entries.push({ nameBytes, crc, size, compressed, headerOffset });
+    }
+
+    async finish() {
+        const start = this.offset;
+        for (const entry of this.entries) {
+            const record = Buffer.alloc(46);
+            record.writeUInt32LE(0x02014b50, 0);
+            record.writeUInt16LE(20, 4);      // version made by
+            record.writeUInt16LE(20, 6);      // version needed
+            record.writeUInt16LE(0x0808, 8);
+            record.writeUInt16LE(8, 10);
+            record.writeUInt32LE(0, 12);
+            record.writeUInt32LE(entry.crc, 16);
+            record.writeUInt32LE(entry.compressed, 20);
+            record.writeUInt32LE(entry.size, 24);
+            record.writeUInt16LE(entry.nameBytes.length, 28);
+            record.writeUInt16LE(0, 30);      // extra
+            record.writeUInt16LE(0, 32);      // comment
+            record.writeUInt16LE(0, 34);      // disk
+            record.writeUInt16LE(0, 36);      // internal attributes
+            record.writeUInt32LE(0, 38);      // external attributes
+            record.writeUInt32LE(entry.headerOffset, 42);
+            await this.emit(Buffer.concat([record, entry.nameBytes]));
+        }
+        const end = Buffer.alloc(22);
+        end.writeUInt32LE(0x06054b50, 0);
+        end.writeUInt16LE(this.entries.length, 8);
+        end.writeUInt16LE(this.entries.length, 10);
+        end.writeUInt32LE(this.offset - start, 12);
+        end.writeUInt32LE(start, 16);
+        await this.emit(end);
+        this.out.end();
+    }
+}
+
+const xmlText = (text) => text
+    // Characters XML 1.0 cannot carry at all
+    .replace(/[\u0000-\u0008\u000b\u000c\u000e-\u001f￾￿]/g, '')
+    .replace(/&/g, '&amp;')
+    .replace(/</g, '&lt;')
+    .replace(/>/g, '&gt;');
+
+const xlsxCell = (value) => {
+    if (typeof value === 'number' && Number.isFinite(value)) return `<c><v>${value}</v></c>`;
+    if (typeof value === 'boolean') return `<c t="b"><v>${value ? 1 : 0}</v></c>`;
+    const text = cellText(value);
+    if (!text) return '<c/>';
+    return `<c t="inlineStr"><is><t xml:space="preserve">${xmlText(text.slice(0, MAX_CELL_CHARS))}</t></is></c>`;
+};
+
+async function* sheetXml(ndjsonPath, columns) {
+    yield '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' +
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>' +
+        `<row r="1">${columns.map(xlsxCell).join('')}</row>`;
+    let batch = '';
+    let count = 0;
+    for await (const row of readRows(ndjsonPath)) {
+        batch += `<row r="${count + 2}">${columns.map(column => xlsxCell(row ? row[column] : null)).join('')}</row>`;
+        if (++count % 500 === 0) {
+            yield batch;
+            batch = '';
+        }
+    }
+    yield batch + '</sheetData></worksheet>';
+}
+
+const XLSX_PARTS = {
+    '[Content_Types].xml': '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' +
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">' +
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>' +
+        '<Default Extension="xml" ContentType="application/xml"/>' +
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>' +
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>' +
+        '</Types>',
+    '_rels/.rels': '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' +
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">' +
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>' +
+        '</Relationships>',
+    'xl/workbook.xml': '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' +
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">' +
+        '<sheets><sheet name="Results" sheetId="1" r:id="rId1"/></sheets></workbook>',
+    'xl/_rels/workbook.xml.rels': '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' +
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">' +
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>' +
+        '</Relationships>'
+};
+
+async function writeXlsx(ndjsonPath, columns, out) {
+    const zip = new ZipWriter(out);
+    for (const [name, content] of Object.entries(XLSX_PARTS)) {
+        await zip.addEntry(name, [content]);
+    }
+    await zip.addEntry('xl/worksheets/sheet1.xml', sheetXml(ndjsonPath, columns));
+    await zip.finish();
+}
+
+module.exports = { FORMATS, exportColumns, writeCsv, writeXlsx, readRows };
@@ -0,0 +1,368 @@
+/**
+ * Jobs
+ * Asynchronous script executions with job ids.
+ *
+ * POST /api/jobs queues a run and returns immediately with a job id; the server runs it
+ * on a bounded pool (global and per-user concurrency limits) while the browser only
+ * polls, so big runs survive page refreshes and total load is decided server-side.
+ *
+ * A job's rows are split into work units by backend/scheduler.js and run on warm bridge
+ * workers (runner_bridge --serve). Results of finished units are appended to
+ * temp_data/jobs/<id>/results.ndjson in completion order, which is what the
+ * partial-results and download endpoints read.
+ *
+ * Access: submit returns a per-job key (jobKey) generated by the server; every other job
+ * endpoint requires it (X-Job-Key header). Only its hash is kept. The user derived from
+ * the bearer token is not verified here, so it is used for fair scheduling only, never
+ * for access.
+ *
+ * Cancelling (or passing the optional per-job deadline) is cooperative: no new units are
+ * started, workers stop dispatching rows (components/cancellation.py) and the rows in
+ * flight finish and are kept. Workers still busy after cancelGraceSeconds are killed.
+ *
+ * Limits (System/db.json "job_queue", overridden by environment variables):
+ *   maxConcurrent      JOB_MAX_CONCURRENT        jobs running at once (default 2)
+ *   maxPerUser         JOB_MAX_PER_USER          jobs running at once per user (default 1)
+ *   workersPerJob      JOB_WORKERS_PER_JOB       warm workers of a multithreaded script (default 5)
+ *   chunkSize          JOB_CHUNK_SIZE            largest work unit in rows (default 1000)
+ *   targetUnitSeconds  JOB_TARGET_UNIT_SECONDS   work per unit once latency is known (default 20)
+ *   cancelGraceSeconds JOB_CANCEL_GRACE_SECONDS  time a cancelled unit gets to finish its rows (default 30)
+ *   ttlHours           JOB_TTL_HOURS             finished jobs are forgotten after this (default 24)
+ */
+
+const fs = require('fs');
+const path = require('path');
+const readline = require('readline');
+const crypto = require('crypto');
+const { ChunkScheduler, buildAtoms } = require('./scheduler');
+
+const JOBS_DIR = path.join(__dirname, '..', 'temp_data', 'jobs');
+const JOURNALS_DIR = path.join(__dirname, '..', 'temp_data', 'journals');
+const FINAL_STATES = ['completed', 'failed', 'cancelled', 'expired', 'unauthorized'];
+
+const DEFAULTS = {
+    maxConcurrent: 2,
+    maxPerUser: 1,
+    workersPerJob: 5,
+    chunkSize: 1000,
+    targetUnitSeconds: 20,
+    cancelGraceSeconds: 30,
+    ttlHours: 24
+};
+
+// User key from the bearer token (tenant/user claims, not verified): per-user limits only
+const userFromToken = (token) => {
+    try {
+        const payload = JSON.parse(Buffer.from(String(token).split('.')[1], 'base64url').toString('utf8'));
+        const user = payload.preferred_username || payload.email || payload.sub;
+        const tenant = payload.tenant || (payload.iss ? String(payload.iss).split('/').pop() : '');
+        if (user) return tenant ? `${tenant}/${user}` : String(user);
+    } catch (e) { }
+    return 'anonymous';
+};
+
+const hashKey = (key) => crypto.createHash('sha256').update(String(key)).digest();
+
+const isSuccess = (row) => {
+    const status = String((row && (row.Status || row.status)) || '');
+    return /pass|success/i.test(status);
+};
+
+class JobManager {
+    /**
+     * @param {object} options
+     * @param {function} options.startWorker  (job) => warm worker ({ run(rows), close(), dead, child },
+     *                                        see startBridgeWorker in api.js)
+     * @param {object} [options.limits]       Overrides for DEFAULTS
+     */
+    constructor({ startWorker, limits = {} }) {
+        this.startWorker = startWorker;
+        this.limits = { ...DEFAULTS, ...limits };
+        this.jobs = new Map();
+        this.queue = [];
+        this.running = new Set();
+
+        const sweep = setInterval(() => this.sweep(), 60 * 60 * 1000);
+        if (sweep.unref) sweep.unref();
+    }
+
+    /**
+     * @param {object} plan             { batchSize, multithreaded, groupByColumn } from the registry entry
+     * @param {number} [deadlineSeconds] Stop the job this long after submission (0 = no deadline)
+     * @param {number} [rowOffset]       Upload index of rows[0] ("Start from Row" - 1), for run journal keys
+     * @returns {{ job: object, jobKey: string }} jobKey is only returned here (see checkKey)
+     */
+    submit({ token, scriptName, rows, plan = {}, deadlineSeconds = 0, rowOffset = 0, options = {} }) {
+        const id = crypto.randomUUID();
+        const dir = path.join(JOBS_DIR, id);
+        // Every job journals its rows (components/run_journal.py): a unit retried after a worker
+        // crash must not run rows that already went through
+        let journalPath = null;
+        if (!options.envConfig || !options.envConfig.jobId) {
+            options = { ...options, envConfig: { ...(options.envConfig || {}), jobId: `job_${id}` } };
+            // Private to this job (a caller-chosen jobId is shared by re-runs and kept)
+            journalPath = path.join(JOURNALS_DIR, `job_${id}.sqlite`);
+        }
+        fs.mkdirSync(dir, { recursive: true });
+        const jobKey = crypto.randomBytes(24).toString('base64url');
+        const job = {
+            id,
+            keyHash: hashKey(jobKey),
+            user: userFromToken(token),
+            scriptName,
+            status: 'queued',
+            totalRows: rows.length,
+            processedRows: 0,
+            passed: 0,
+            failed: 0,
+            units: { done: 0, running: 0, steals: 0, retries: 0, workers: 0 },
+            errors: [],
+            createdAt: new Date().toISOString(),
+            startedAt: null,
+            finishedAt: null,
+            deadline: deadlineSeconds > 0 ? Date.now() + deadlineSeconds * 1000 : null,
+            cancelReason: null,
+            resultsPath: path.join(dir, 'results.ndjson'),
+            journalPath,
+            // Not exposed: needed to run the job
+            rows,
+            // row -> upload index, sent with every work unit (components/run_journal.py keys)
+            rowIndex: new Map(rows.map((row, i) => [row, rowOffset + i])),
+            token,
+            plan,
+            options,
+            cancelRequested: false,
+            scheduler: null,
+            workers: new Set(),
+            deadlineTimer: null
+        };
+        fs.writeFileSync(job.resultsPath, '');
+        if (job.deadline) {
+            job.deadlineTimer = setTimeout(() => this.expire(job), deadlineSeconds * 1000);
+            if (job.deadlineTimer.unref) job.deadlineTimer.unref();
+        }
+        this.jobs.set(id, job);
+        this.queue.push(job);
+        console.log(`[Jobs] Queued ${id} (${scriptName}, ${rows.length} rows) for ${job.user}`);
+        this.pump();
+        return { job, jobKey };
+    }
+
+    get(id) {
+        return this.jobs.get(id) || null;
+    }
+
+    // Does the caller hold the key handed out on submit?
+    checkKey(job, key) {
+        if (!key) return false;
+        return crypto.timingSafeEqual(job.keyHash, hashKey(key));
+    }
+
+    // Public view of a job (no rows/token)
+    describe(job) {
+        const position = job.status === 'queued' ? this.queue.indexOf(job) + 1 : null;
+        return {
+            id: job.id,
+            scriptName: job.scriptName,
+            user: job.user,
+            status: job.status,
+            queuePosition: position,
+            totalRows: job.totalRows,
+            processedRows: job.processedRows,
+            passed: job.passed,
+            failed: job.failed,
+            units: job.units,
+            rowsPerSecond: job.rowsPerSecond || null,
+            errors: job.errors.slice(-5),
+            cancelReason: job.cancelReason,
+            deadline: job.deadline ? new Date(job.deadline).toISOString() : null,
+            createdAt: job.createdAt,
+            startedAt: job.startedAt,
+            finishedAt: job.finishedAt
+        };
+    }
+
+    cancel(id, reason = 'Cancelled by user') {
+        const job = this.jobs.get(id);
+        if (!job || FINAL_STATES.includes(job.status) || job.cancelRequested) return job;
+        job.cancelRequested = true;
+        job.cancelReason = reason;
+        if (job.status === 'queued') {
+            this.queue = this.queue.filter(j => j !== job);
+            this.finish(job, job.expired ? 'expired' : 'cancelled');
+        } else {
+            // No new units; units in flight finish their dispatched rows and are kept
+            if (job.scheduler) job.scheduler.stop();
+            for (const worker of job.workers) worker.cancel(reason, this.limits.cancelGraceSeconds);
+        }
+        console.log(`[Jobs] Cancel requested for ${id}: ${reason}`);
+        return job;
+    }
+
+    // Deadline reached: same as a cancel, finishing as 'expired'
+    expire(job) {
+        if (FINAL_STATES.includes(job.status)) return;
+        job.expired = true;
+        job.errors.push(`Deadline exceeded after ${job.processedRows}/${job.totalRows} rows`);
+        this.cancel(job.id, 'Deadline exceeded');
+    }
+
+    // Start queued jobs while the global and per-user limits allow
+    pump() {
+        for (const job of [...this.queue]) {
+            if (this.running.size >= this.limits.maxConcurrent) break;
+            const userRunning = Array.from(this.running).filter(j => j.user === job.user).length;
+            if (userRunning >= this.limits.maxPerUser) continue;
+            this.queue = this.queue.filter(j => j !== job);
+            this.running.add(job);
+            this.execute(job).catch(e => {
+                job.errors.push(e.message);
+                this.finish(job, 'failed');
+            });
+        }
+    }
+
+    async execute(job) {
+        job.status = 'running';
+        job.startedAt = new Date().toISOString();
+        const plan = job.plan;
+        const limits = this.limits;
+        const scheduler = new ChunkScheduler({
+            workers: plan.multithreaded ? limits.workersPerJob : 1,
+            batchSize: plan.batchSize,
+            maxUnitRows: limits.chunkSize,
+            targetUnitSeconds: limits.targetUnitSeconds,
+            // Crashed units are retried only for scripts that journal each row as it runs
+            // (run_in_parallel); a sequential script journals at the end, so a retry would repeat rows
+            unitRetries: plan.multithreaded ? 1 : 0
+        });
+        job.scheduler = scheduler;
+        job.units = scheduler.stats;
+        const startedMs = Date.now();
+        let unauthorized = false;
+
+        await scheduler.run(buildAtoms(job.rows, plan.groupByColumn), {
+            startWorker: () => this.startWorker(job),
+            onWorker: (worker, up) => {
+                if (up) job.workers.add(worker);
+                else job.workers.delete(worker);
+            },
+            onUnit: (unit, outcome) => {
+                // Killed after the grace period: its rows are not known to have finished
+                if (job.cancelRequested && outcome.kind === 'failed') return;
+                let results;
+                if (outcome.kind === 'success' || outcome.kind === 'unauthorized') {
+                    results = Array.isArray(outcome.result.data) ? outcome.result.data : [];
+                } else {
+                    // Whole unit failed: keep the rows with the error so the download is complete
+                    const message = outcome.kind === 'error'
+                        ? outcome.result.message
+                        : (outcome.kind === 'failed' ? `Script execution failed (exit ${outcome.code})` : 'Invalid output from script');
+                    job.errors.push(`Unit ${unit.seq} (${unit.rows.length} rows): ${message}`);
+                    results = unit.rows.map(row => ({ ...row, Status: 'Fail', Response: message }));
+                }
+                this.append(job, results);
+                job.rowsPerSecond = Math.round(job.processedRows / Math.max(0.001, (Date.now() - startedMs) / 1000) * 100) / 100;
+
+                if (outcome.kind === 'unauthorized' && !unauthorized) {
+                    // Token expired: the remaining rows would all fail the same way
+                    job.errors.push('Session expired (401). Log in again and resubmit the remaining rows.');
+                    unauthorized = true;
+                    scheduler.stop();
+                }
+            }
+        });
+
+        job.scheduler = null;
+        if (unauthorized) return this.finish(job, 'unauthorized');
+        if (job.cancelRequested) return this.finish(job, job.expired ? 'expired' : 'cancelled');
+        this.finish(job, 'completed');
+    }
+
+    append(job, results) {
+        let text = '';
+        for (const row of results) {
+            text += JSON.stringify(row) + '\n';
+            if (isSuccess(row)) job.passed++;
+            else job.failed++;
+        }
+        fs.appendFileSync(job.resultsPath, text);
+        job.processedRows += results.length;
+    }
+
+    finish(job, status) {
+        job.status = status;
+        job.finishedAt = new Date().toISOString();
+        job.rows = null;  // inputs are no longer needed; results live on disk
+        job.rowIndex = null;
+        job.token = null;
+        // Credentials and environment of the run are not needed for status/results/export
+        job.options = { scriptRun: job.options.scriptRun };
+        job.workers.clear();
+        clearTimeout(job.deadlineTimer);
+        this.running.delete(job);
+        console.log(`[Jobs] ${job.id} ${status}: ${job.processedRows}/${job.totalRows} rows (${job.passed} passed, ${job.failed} failed)`);
+        this.pump();
+    }
+
+    /**
+     * Read finished rows [offset, offset + limit) from the results file.
+     */
+    async readResults(job, offset = 0, limit = 1000) {
+        const rows = [];
+        if (!fs.existsSync(job.resultsPath)) return rows;
+        const input = fs.createReadStream(job.resultsPath, { encoding: 'utf8' });
+        const lines = readline.createInterface({ input, crlfDelay: Infinity });
+        let index = 0;
+        for await (const line of lines) {
+            if (!line) continue;
+            if (index >= offset) rows.push(JSON.parse(line));
+            index++;
+            if (rows.length >= limit) break;
+        }
+        lines.close();
+        input.destroy();
+        return rows;
+    }
+
+    // Forget finished jobs older than ttlHours (and their files)
+    sweep() {
+        const cutoff = Date.now() - this.limits.ttlHours * 3600 * 1000;
+        for (const job of this.jobs.values()) {
+            if (!FINAL_STATES.includes(job.status) || Date.parse(job.finishedAt) > cutoff) continue;
+            try { fs.rmSync(path.dirname(job.resultsPath), { recursive: true, force: true }); } catch (e) { }
+            if (job.journalPath) {
+                // SQLite WAL mode leaves -wal / -shm files next to the journal
+                for (const suffix of ['', '-wal', '-shm']) {
+                    try { fs.rmSync(job.journalPath + suffix, { force: true }); } catch (e) { }
+                }
+            }
+            this.jobs.delete(job.id);
+        }
+    }
+}
+
+// Limits from System/db.json "job_queue" with environment variable overrides
+const loadLimits = (db = {}) => {
+    const config = { ...(db.job_queue || {}) };
+    const fromEnv = {
+        maxConcurrent: process.env.JOB_MAX_CONCURRENT,
+        maxPerUser: process.env.JOB_MAX_PER_USER,
+        workersPerJob: process.env.JOB_WORKERS_PER_JOB,
+        chunkSize: process.env.JOB_CHUNK_SIZE,
+        targetUnitSeconds: process.env.JOB_TARGET_UNIT_SECONDS,
+        cancelGraceSeconds: process.env.JOB_CANCEL_GRACE_SECONDS,
+        ttlHours: process.env.JOB_TTL_HOURS
+    };
+    for (const [key, value] of Object.entries(fromEnv)) {
+        if (value !== undefined && value !== '') config[key] = value;
+    }
+    const limits = {};
+    for (const key of Object.keys(DEFAULTS)) {
+        const value = Number(config[key]);
+        if (Number.isFinite(value) && value > 0) limits[key] = value;
+    }
+    return limits;
+};
+
+module.exports = { JobManager, userFromToken, loadLimits, FINAL_STATES };
@@ -0,0 +1,214 @@
+/**
+ * Metrics
+ * Dependency-free Prometheus-style counters, gauges and histograms for the backend.
+ *
+ * The console is cleared on every execution, so anything worth watching over time
+ * (executions, rows, spawn latency, bridge wall time, stdout volume, 401/overload
+ * events) is kept here and exposed in the Prometheus text format on GET /metrics.
+ *
+ * Usage:
+ *   const metrics = require('./metrics');
+ *   metrics.executions.inc({ script: 'Add_Farmer.py', outcome: 'success' });
+ *   metrics.bridgeWallSeconds.observe({ script: 'Add_Farmer.py' }, 12.5);
+ *   const child = metrics.trackProcess(spawn('python', args), 'execute');
+ */
+
+const PREFIX = 'datagen_';
+
+const escapeLabel = (value) => String(value).replace(/\\/g, '\\\\').replace(/\n/g, '\\n').replace(/"/g, '\\"');
+
+const labelKey = (labelNames, labels = {}) =>
+    labelNames.map(name => `${name}="${escapeLabel(labels[name] === undefined ? '' : labels[name])}"`).join(',');
+
+const formatLabels = (key, extra) => {
+    const parts = [key, extra].filter(Boolean).join(',');
+    return parts ? `{${parts}}` : '';
+};
+
+const formatValue = (value) => (Number.isFinite(value) ? String(value) : (value > 0 ? '+Inf' : '-Inf'));
+
+class Counter {
+    constructor(name, help, labelNames = []) {
+        this.name = PREFIX + name;
+        this.help = help;
+        this.labelNames = labelNames;
+        this.type = 'counter';
+        this.values = new Map();
+    }
+
+    inc(labels = {}, value = 1) {
+        const key = labelKey(this.labelNames, labels);
+        this.values.set(key, (this.values.get(key) || 0) + value);
+    }
+
+    lines() {
+        return Array.from(this.values, ([key, value]) => `${this.name}${formatLabels(key)} ${formatValue(value)}`);
+    }
+}
+
+class Gauge extends Counter {
+    constructor(name, help, labelNames = []) {
+        super(name, help, labelNames);
+        this.type = 'gauge';
+    }
+
+    dec(labels = {}, value = 1) {
+        this.inc(labels, -value);
+    }
+
+    set(labels = {}, value) {
+        this.values.set(labelKey(this.labelNames, labels), value);
+    }
+}
+
+class Histogram {
+    constructor(name, help, labelNames = [], buckets = [0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600]) {
+        this.name = PREFIX + name;
+        this.help = help;
+        this.labelNames = labelNames;
+        this.buckets = buckets;
+        this.type = 'histogram';
+        this.values = new Map();
+    }
+
+    observe(labels = {}, value) {
+        if (!Number.isFinite(value)) return;
+        const key = labelKey(this.labelNames, labels);
+        let entry = this.values.get(key);
+        if (!entry) {
+            entry = { counts: new Array(this.buckets.length).fill(0), sum: 0, count: 0 };
+            this.values.set(key, entry);
+        }
+        for (let i = 0; i < this.buckets.length; i++) {
+            if (value <= this.buckets[i]) entry.counts[i]++;
+        }
+        entry.sum += value;
+        entry.count++;
+    }
+
+    lines() {
+        const out = [];
+        for (const [key, entry] of this.values) {
+            this.buckets.forEach((bound, i) => {
+                out.push(`${this.name}_bucket${formatLabels(key, `le="${bound}"`)} ${entry.counts[i]}`);
+            });
+            out.push(`${this.name}_bucket${formatLabels(key, 'le="+Inf"')} ${entry.count}`);
+            out.push(`${this.name}_sum${formatLabels(key)} ${entry.sum}`);
+            out.push(`${this.name}_count${formatLabels(key)} ${entry.count}`);
+        }
+        return out;
+    }
+}
+
+const registry = [];
+const register = (metric) => { registry.push(metric); return metric; };
+
+const executions = register(new Counter('executions_total',
+    'Script executions by script and outcome (success, error, unauthorized, invalid_output)', ['script', 'outcome']));
+const rowsProcessed = register(new Counter('rows_processed_total',
+    'Rows submitted to the bridge per script', ['script']));
+const rowResults = register(new Counter('row_results_total',
+    'Row results returned by the bridge per script and Status (pass, fail, other)', ['script', 'status']));
+const pythonSpawnSeconds = register(new Histogram('python_spawn_seconds',
+    'Time from spawning Python to its first stdout output (interpreter start + imports)', ['kind'],
+    [0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30]));
+const bridgeWallSeconds = register(new Histogram('bridge_wall_seconds',
+    'Wall time of a runner_bridge process per script', ['script']));
+const stdoutBytes = register(new Counter('bridge_stdout_bytes_total',
+    'Bytes of bridge stdout received and parsed per script', ['script']));
+const pythonProcesses = register(new Counter('python_processes_spawned_total',
+    'Python processes spawned by kind and exit status', ['kind', 'exit']));
+const pythonRunning = register(new Gauge('python_processes_running',
+    'Python processes currently running by kind', ['kind']));
+const unauthorizedEvents = register(new Counter('unauthorized_events_total',
+    'Executions that ended with 401/session timeout results', ['script']));
+const overloadEvents = register(new Counter('overload_events_total',
+    'Transient overload events reported by the bridge (429/5xx retries, deferred rows, circuit fast-fails)', ['script', 'reason']));
+
+const startedAt = Date.now();
+
+/**
+ * Count a spawned Python process and its exit. Returns the child for chaining.
+ */
+const trackProcess = (child, kind) => {
+    const started = process.hrtime.bigint();
+    let firstOutput = false;
+    pythonRunning.inc({ kind });
+    if (child.stdout) {
+        child.stdout.once('data', () => {
+            firstOutput = true;
+            pythonSpawnSeconds.observe({ kind }, Number(process.hrtime.bigint() - started) / 1e9);
+        });
+    }
+    let finished = false;
+    const finish = (exit) => {
+        if (finished) return;
+        finished = true;
+        pythonRunning.dec({ kind });
+        pythonProcesses.inc({ kind, exit });
+    };
+    child.on('close', (code) => finish(code === 0 ? 'ok' : (firstOutput ? 'error' : 'failed_start')));
+    child.on('error', () => finish('spawn_error'));
+    return child;
+};
+
+/**
+ * Record the outcome of one /api/scripts/execute run from the parsed bridge result.
+ */
+const recordExecution = (script, outcome, result) => {
+    executions.inc({ script, outcome });
+    if (!result) return;
+    if (Array.isArray(result.data)) {
+        for (const row of result.data) {
+            // Status text varies per script ('Pass', 'Success', 'Failed (JSON Error)'...): bucket it
+            const status = String((row && (row.Status || row.status)) || '');
+            rowResults.inc({ script, status: /pass|success/i.test(status) ? 'pass' : (/fail|error/i.test(status) ? 'fail' : 'other') });
+        }
+    }
+    const counters = (result.metrics && result.metrics.counters) || {};
+    for (const [name, labels] of Object.entries(counters)) {
+        if (!['retries', 'deferred_rows', 'circuit_fast_fail'].includes(name)) continue;
+        for (const [label, count] of Object.entries(labels)) {
+            if (name === 'retries' && label === 'token_refresh') continue;
+            overloadEvents.inc({ script, reason: name === 'retries' ? label : name }, count);
+        }
+    }
+};
+
+/**
+ * Prometheus text exposition of every registered metric.
+ */
+const render = () => {
+    const out = [];
+    for (const metric of registry) {
+        out.push(`# HELP ${metric.name} ${metric.help}`);
+        out.push(`# TYPE ${metric.name} ${metric.type}`);
+        out.push(...metric.lines());
+    }
+    const memory = process.memoryUsage();
+    out.push(`# HELP ${PREFIX}process_uptime_seconds Backend uptime`);
+    out.push(`# TYPE ${PREFIX}process_uptime_seconds gauge`);
+    out.push(`${PREFIX}process_uptime_seconds ${(Date.now() - startedAt) / 1000}`);
+    out.push(`# HELP ${PREFIX}process_resident_memory_bytes Backend resident memory`);
+    out.push(`# TYPE ${PREFIX}process_resident_memory_bytes gauge`);
+    out.push(`${PREFIX}process_resident_memory_bytes ${memory.rss}`);
+    return out.join('\n') + '\n';
+};
+
+module.exports = {
+    Counter,
+    Gauge,
+    Histogram,
+    register,
+    executions,
+    rowsProcessed,
+    rowResults,
+    pythonSpawnSeconds,
+    bridgeWallSeconds,
+    stdoutBytes,
+    unauthorizedEvents,
+    overloadEvents,
+    trackProcess,
+    recordExecution,
+    render
+};
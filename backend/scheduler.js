@@ -0,0 +1,231 @@
+/**
+ * Scheduler
+ * Server-side chunking of a job's rows into work units for warm bridge workers.
+ *
+ * Replaces the browser-side batching of script.js (one request and one Python spawn per
+ * batch, at most 5 at a time): the whole upload is planned here once.
+ *
+ * - Rows are grouped into atoms first (one row, or every row sharing the registry
+ *   "groupByColumn" value); an atom is never split across units.
+ * - Each worker owns a contiguous slice of atoms and takes units from its head. A worker
+ *   that runs dry steals the back half of the fullest remaining slice (work stealing), so
+ *   slow rows on one worker do not leave the others idle at the end.
+ * - Unit size starts at the registry "batchSize" and then follows observed latency: about
+ *   targetUnitSeconds of work per unit, capped by maxUnitRows and by an even share of
+ *   what is left (small units near the end keep the tail balanced).
+ * - A unit whose worker process died is retried once on a fresh worker, only when the
+ *   job allows it (unitRetries > 0: the script journals every row as it runs). The retry
+ *   is flagged so the bridge skips rows the run journal has seen; rows that were in flight
+ *   when the worker died come back failed instead of being sent again.
+ *
+ * Usage:
+ *   const scheduler = new ChunkScheduler({ workers: 4, batchSize: 10 });
+ *   await scheduler.run(buildAtoms(rows, 'farmerId'), {
+ *       startWorker: (index) => startBridgeWorker(...),   // { run(rows, { retry }), close(), dead }
+ *       onUnit: (unit, outcome) => { ... }                 // aggregate results
+ *   });
+ */
+
+const DEFAULTS = {
+    workers: 1,
+    batchSize: 1,
+    maxUnitRows: 1000,
+    targetUnitSeconds: 20,
+    unitRetries: 0
+};
+
+// Latency smoothing for seconds-per-row (recent units weigh more)
+const EWMA_ALPHA = 0.3;
+
+/**
+ * Split rows into atoms: single rows, or groups of rows sharing `groupByColumn`
+ * (groups keep first-seen order, like the browser grouping did).
+ */
+const buildAtoms = (rows, groupByColumn) => {
+    if (!groupByColumn || !String(groupByColumn).trim()) {
+        return rows.map(row => [row]);
+    }
+    const groups = new Map();
+    for (const row of rows) {
+        const key = row[groupByColumn] || 'UNK';
+        if (!groups.has(key)) groups.set(key, []);
+        groups.get(key).push(row);
+    }
+    return Array.from(groups.values());
+};
+
+class Lane {
+    constructor(index, atoms) {
+        this.index = index;
+        this.atoms = atoms;
+        this.head = 0;
+        this.rows = atoms.reduce((n, atom) => n + atom.length, 0);
+    }
+
+    get remainingAtoms() {
+        return this.atoms.length - this.head;
+    }
+
+    // Whole atoms from the head, up to `maxRows` rows (at least one atom)
+    take(maxRows) {
+        const rows = [];
+        while (this.head < this.atoms.length) {
+            const atom = this.atoms[this.head];
+            if (rows.length > 0 && rows.length + atom.length > maxRows) break;
+            rows.push(...atom);
+            this.atoms[this.head++] = null;
+        }
+        this.rows -= rows.length;
+        return rows;
+    }
+
+    // Give away the back half of the remaining atoms
+    steal() {
+        const split = this.head + Math.ceil(this.remainingAtoms / 2);
+        const stolen = this.atoms.slice(split);
+        this.atoms.length = split;
+        const stolenRows = stolen.reduce((n, atom) => n + atom.length, 0);
+        this.rows -= stolenRows;
+        return stolen;
+    }
+}
+
+class ChunkScheduler {
+    /**
+     * @param {object} options
+     * @param {number} [options.workers]            Warm workers for this job
+     * @param {number} [options.batchSize]          Registry batchSize: first and smallest unit size
+     * @param {number} [options.maxUnitRows]        Largest unit
+     * @param {number} [options.targetUnitSeconds]  Work per unit once latency is known
+     * @param {number} [options.unitRetries]        Retries of a unit whose worker died (only safe when
+     *                                              the bridge journals rows; default 0)
+     */
+    constructor(options = {}) {
+        this.options = { ...DEFAULTS };
+        for (const [key, value] of Object.entries(options)) {
+            if (value !== undefined && value !== null) this.options[key] = value;
+        }
+        this.options.batchSize = Math.max(1, Math.floor(Number(this.options.batchSize)) || 1);
+        this.options.maxUnitRows = Math.max(this.options.batchSize, Number(this.options.maxUnitRows) || DEFAULTS.maxUnitRows);
+        this.lanes = [];
+        this.secondsPerRow = null;
+        this.stopped = false;
+        this.stats = { units: 0, running: 0, steals: 0, retries: 0, workers: 0 };
+    }
+
+    stop() {
+        this.stopped = true;
+    }
+
+    get remainingRows() {
+        return this.lanes.reduce((n, lane) => n + lane.rows, 0);
+    }
+
+    // Rows for the next unit from current latency and what is left
+    unitRows() {
+        const { batchSize, maxUnitRows, targetUnitSeconds } = this.options;
+        let size = batchSize;
+        if (this.secondsPerRow) {
+            size = Math.round(targetUnitSeconds / this.secondsPerRow);
+        }
+        const share = Math.ceil(this.remainingRows / Math.max(1, this.lanes.length));
+        return Math.max(batchSize, Math.min(size, maxUnitRows, share));
+    }
+
+    observe(rows, seconds) {
+        if (rows <= 0 || !(seconds > 0)) return;
+        const sample = seconds / rows;
+        this.secondsPerRow = this.secondsPerRow === null
+            ? sample
+            : EWMA_ALPHA * sample + (1 - EWMA_ALPHA) * this.secondsPerRow;
+    }
+
+    // Next unit for a lane: its own head, else steal from the fullest lane
+    next(lane) {
+        if (this.stopped) return null;
+        if (lane.remainingAtoms === 0) {
+            let victim = null;
+            for (const other of this.lanes) {
+                if (other !== lane && other.remainingAtoms > 1 && (!victim || other.rows > victim.rows)) victim = other;
+            }
+            if (!victim) {
+                // Only single-atom lanes left: take one whole
+                victim = this.lanes.find(other => other !== lane && other.remainingAtoms > 0);
+                if (!victim) return null;
+                const rows = victim.take(Infinity);
+                return rows.length ? { lane: lane.index, rows } : null;
+            }
+            lane.atoms = victim.steal();
+            lane.head = 0;
+            lane.rows = lane.atoms.reduce((n, atom) => n + atom.length, 0);
+            this.stats.steals++;
+        }
+        const rows = lane.take(this.unitRows());
+        return rows.length ? { lane: lane.index, rows } : null;
+    }
+
+    /**
+     * Run every atom through the workers.
+     * @param {Array<Array<object>>} atoms  From buildAtoms
+     * @param {object} hooks
+     * @param {function} hooks.startWorker  (laneIndex) => worker ({ run(rows, { retry }), close(), dead })
+     * @param {function} hooks.onUnit       (unit, outcome) => void, after every unit (may be async)
+     * @param {function} [hooks.onWorker]   (worker, started) => void, when a worker starts/stops
+     */
+    async run(atoms, { startWorker, onUnit, onWorker = () => { } }) {
+        const workers = Math.max(1, Math.min(Number(this.options.workers) || 1, atoms.length));
+        const per = Math.ceil(atoms.length / workers);
+        this.lanes = [];
+        for (let i = 0; i < workers; i++) {
+            this.lanes.push(new Lane(i, atoms.slice(i * per, (i + 1) * per)));
+        }
+
+        const laneLoop = async (lane) => {
+            let worker = null;
+            const launch = () => {
+                worker = startWorker(lane.index);
+                this.stats.workers++;
+                onWorker(worker, true);
+            };
+            const retire = () => {
+                if (!worker) return;
+                worker.close();
+                onWorker(worker, false);
+                worker = null;
+            };
+            try {
+                for (let unit = this.next(lane); unit; unit = this.next(lane)) {
+                    unit.seq = ++this.stats.units;
+                    let outcome;
+                    for (let attempt = 0; ; attempt++) {
+                        if (!worker || worker.dead) {
+                            retire();
+                            launch();
+                        }
+                        const started = Date.now();
+                        this.stats.running++;
+                        try {
+                            outcome = await worker.run(unit.rows, { retry: attempt > 0 });
+                        } finally {
+                            this.stats.running--;
+                        }
+                        if (outcome.kind === 'success' || outcome.kind === 'unauthorized') {
+                            this.observe(unit.rows.length, (Date.now() - started) / 1000);
+                        }
+                        // Worker crashed mid-unit: retry on a fresh process (unless stopping)
+                        if (outcome.kind !== 'failed' || this.stopped || attempt >= this.options.unitRetries) break;
+                        this.stats.retries++;
+                        console.warn(`[Scheduler] Unit ${unit.seq} (${unit.rows.length} rows) failed on worker ${lane.index}; retrying`);
+                    }
+                    await onUnit(unit, outcome);
+                }
+            } finally {
+                retire();
+            }
+        };
+
+        await Promise.all(this.lanes.map(laneLoop));
+    }
+}
+
+module.exports = { ChunkScheduler, buildAtoms };
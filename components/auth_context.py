@@ -0,0 +1,154 @@
+"""
+Auth Context Component
+Parses the bearer token once per run and shares the result.
+
+Holds the decoded JWT claims (user, tenant, expiry) and pre-built Authorization headers
+so that request logging, master_search and the bridge interceptor do not base64-decode
+and JSON-parse the same token on every request. The expiry is exposed so long runs can
+refresh the token before requests start failing with 401.
+"""
+
+import base64
+import json
+import threading
+import time
+
+
+def decode_claims(token):
+    """
+    Decode the payload of a JWT without verifying it.
+
+    Returns:
+        dict of claims, or None if the token is not a decodable JWT
+    """
+    if not token:
+        return None
+    if token.startswith('Bearer '):
+        token = token[len('Bearer '):]
+    parts = token.split('.')
+    if len(parts) < 2:
+        return None
+    payload = parts[1]
+    pad = len(payload) % 4
+    if pad:
+        payload += '=' * (4 - pad)
+    try:
+        return json.loads(base64.urlsafe_b64decode(payload).decode('utf-8'))
+    except Exception:
+        return None
+
+
+class AuthContext:
+    """
+    Parsed view of one bearer token.
+
+    Attributes:
+        token: Raw token (no 'Bearer ' prefix)
+        bearer: 'Bearer <token>'
+        headers: {'Authorization': bearer} - shared, do not mutate
+        claims: Decoded JWT claims (or {})
+        user, tenant: From preferred_username/sub and the issuer realm
+        expires_at: Epoch seconds from 'exp' (None if unknown)
+        summary: 'User: x | Tenant: y' (the legacy TOKEN META string)
+    """
+
+    def __init__(self, token):
+        self._lock = threading.Lock()
+        self.version = 0
+        self.update(token)
+
+    def update(self, token):
+        """Swap in a new token (e.g. after a refresh)."""
+        token = (token or '').strip()
+        if token.startswith('Bearer '):
+            token = token[len('Bearer '):]
+        claims = decode_claims(token)
+
+        with self._lock:
+            self.token = token
+            self.bearer = f"Bearer {token}" if token else ''
+            self.headers = {'Authorization': self.bearer}
+            self.claims = claims or {}
+            self.user = self.claims.get('preferred_username') or self.claims.get('sub')
+            iss = self.claims.get('iss', '')
+            self.tenant = iss.split('/')[-1] if '/' in iss else 'Unknown'
+            exp = self.claims.get('exp')
+            self.expires_at = float(exp) if isinstance(exp, (int, float)) else None
+            if not token or len(token) < 10:
+                self.summary = "Invalid/Empty Token"
+            elif claims is None:
+                self.summary = "Not a JWT" if len(token.split('.')) < 2 else "Decode Error"
+            else:
+                self.summary = f"User: {self.user} | Tenant: {self.tenant}"
+            self.expiry_warned = False
+            self.version += 1
+
+    def seconds_until_expiry(self, now=None):
+        """Seconds left before 'exp' (negative if expired), or None if unknown."""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - (now if now is not None else time.time())
+
+    def is_expiring(self, margin=60):
+        """True if the token expires within `margin` seconds."""
+        remaining = self.seconds_until_expiry()
+        return remaining is not None and remaining <= margin
+
+    def describe_expiry(self):
+        remaining = self.seconds_until_expiry()
+        if remaining is None:
+            return "expiry unknown"
+        if remaining <= 0:
+            return "EXPIRED"
+        return f"expires in {int(remaining // 60)}m {int(remaining % 60)}s"
+
+
+_current = None
+_by_token = {}
+_cache_lock = threading.Lock()
+_MAX_TOKENS = 16
+
+
+def init(token):
+    """Create the run-wide context (called once by runner_bridge)."""
+    global _current
+    _current = for_token(token)
+    return _current
+
+
+def get_current():
+    """The run-wide context, or None if the bridge did not initialise one."""
+    return _current
+
+
+def for_token(token):
+    """
+    Memoised context for a token string ('Bearer ' prefix optional).
+    Returns the run-wide context when the token matches it.
+    """
+    raw = (token or '').strip()
+    if raw.startswith('Bearer '):
+        raw = raw[len('Bearer '):]
+    current = _current
+    if current is not None and current.token == raw:
+        return current
+    ctx = _by_token.get(raw)
+    if ctx is None:
+        ctx = AuthContext(raw)
+        with _cache_lock:
+            if len(_by_token) >= _MAX_TOKENS:
+                _by_token.clear()
+            _by_token[raw] = ctx
+    return ctx
+
+
+def describe(auth_header):
+    """Legacy TOKEN META string for an Authorization header value."""
+    if not auth_header or auth_header == 'None':
+        return "Invalid/Empty Token"
+    return for_token(auth_header).summary
+
+
+def headers_for(env_config):
+    """Pre-built Authorization headers for env_config['token'] (shared dict, do not mutate)."""
+    return for_token(env_config.get('token', '')).headers
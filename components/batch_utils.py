@@ -0,0 +1,219 @@
+"""
+Batch Utils Component
+Collects per-row payloads and sends them to bulk ("/batch") endpoints.
+
+Many farm APIs have a batch form (e.g. /croppable-areas/plot-risk/batch) that accepts a
+list of items and answers with a response keyed by item id. Instead of hand-building
+batches and index maps in every script:
+
+1. BatchCollector - rows (possibly from thread_utils workers) submit() their payload and
+   get a Future; batches flush by size or time window and several run concurrently.
+2. run_batched    - convenience wrapper for the common "all rows up front" case.
+3. make_json_sender - builds a send_batch function for a JSON list endpoint.
+"""
+
+import threading
+import time
+import concurrent.futures
+
+
+class BatchRequestError(Exception):
+    """Raised by a sender when the batch call itself fails (non-2xx)."""
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+        super().__init__(f"Batch request failed (Status {status_code}): {str(body)[:500]}")
+
+
+class BatchCollector:
+    """
+    Groups submitted payloads into batches and maps keyed results back to submitters.
+
+    Args:
+        send_batch: send_batch(list_of_payloads) -> dict {item_key: item_result}.
+                    Raise to fail every item of the batch.
+        key_func: key_func(payload) -> key used in the response dict.
+        batch_size: Flush as soon as this many payloads are pending.
+        max_wait: Flush a partial batch after this many seconds (None = only on size/close).
+        max_concurrent: Number of batches in flight at once.
+
+    Usage:
+        with BatchCollector(sender, lambda p: p['croppableAreaId']) as collector:
+            future = collector.submit(payload)
+        item_result = future.result()   # None if the response had no entry for the key
+    """
+
+    def __init__(self, send_batch, key_func, batch_size=25, max_wait=0.5, max_concurrent=4):
+        self.send_batch = send_batch
+        self.key_func = key_func
+        self.batch_size = max(1, int(batch_size))
+        self.max_wait = max_wait
+        self._pending = []
+        self._oldest = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, int(max_concurrent)))
+        self._flusher = threading.Thread(target=self._flush_loop, name="batch-flusher", daemon=True)
+        self._flusher.start()
+
+    def submit(self, payload):
+        """Queue one payload. Returns a Future resolving to its item result."""
+        future = concurrent.futures.Future()
+        key = str(self.key_func(payload))
+        batch = None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BatchCollector is closed")
+            self._pending.append((key, payload, future))
+            if len(self._pending) == 1:
+                self._oldest = time.monotonic()
+                self._cond.notify()
+            if len(self._pending) >= self.batch_size:
+                batch = self._take()
+        if batch:
+            self._dispatch(batch)
+        return future
+
+    def flush(self):
+        """Send whatever is pending now."""
+        with self._cond:
+            batch = self._take()
+        if batch:
+            self._dispatch(batch)
+
+    def close(self, wait=True):
+        """Flush remaining payloads and stop accepting new ones."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._flusher.join()
+        self.flush()
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _take(self):
+        # Caller holds the lock
+        batch = self._pending
+        self._pending = []
+        self._oldest = None
+        return batch
+
+    def _flush_loop(self):
+        # Time-window flushing for partial batches
+        with self._cond:
+            while not self._closed:
+                if not self._pending or self.max_wait is None:
+                    self._cond.wait()
+                    continue
+                remaining = self._oldest + self.max_wait - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                batch = self._take()
+                self._cond.release()
+                try:
+                    self._dispatch(batch)
+                finally:
+                    self._cond.acquire()
+
+    def _dispatch(self, batch):
+        self._executor.submit(self._send, batch)
+
+    def _send(self, batch):
+        try:
+            response = self.send_batch([payload for _, payload, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        response = response or {}
+        for key, _, future in batch:
+            future.set_result(response.get(key))
+
+
+def _default_apply_error(row, error):
+    row['Status'] = 'Fail'
+    row['API_Response'] = f"Batch Error: {str(error)}"
+
+
+def run_batched(rows, build_payload, send_batch, apply_result, key_func,
+                batch_size=25, max_concurrent=4, apply_error=None):
+    """
+    Sends one payload per row through a batch endpoint and maps results back to the rows.
+
+    Args:
+        rows: Input rows (list or iterable).
+        build_payload: build_payload(row) -> payload, or None to skip the row.
+        send_batch: See BatchCollector.
+        apply_result: apply_result(row, item_result) - item_result is None if the
+                      response had no entry for the row's key.
+        key_func: key_func(payload) -> response key.
+        batch_size: Items per batch call.
+        max_concurrent: Batch calls in flight at once.
+        apply_error: apply_error(row, exception) when the batch call failed
+                     (default sets Status='Fail').
+
+    Returns:
+        The rows (updated in place).
+    """
+    apply_error = apply_error or _default_apply_error
+    submitted = []
+    with BatchCollector(send_batch, key_func, batch_size=batch_size, max_wait=None,
+                        max_concurrent=max_concurrent) as collector:
+        for row in rows:
+            payload = build_payload(row)
+            if payload is None:
+                continue
+            submitted.append((row, collector.submit(payload)))
+
+    for row, future in submitted:
+        try:
+            item_result = future.result()
+        except Exception as e:
+            apply_error(row, e)
+            continue
+        apply_result(row, item_result)
+    return rows
+
+
+def make_json_sender(url, headers, result_path=None, method='POST', timeout=60):
+    """
+    Build a send_batch function that sends the payload list as JSON.
+
+    Args:
+        url: Batch endpoint URL.
+        headers: Request headers (Authorization etc.).
+        result_path: Dot path to the keyed results in the response (e.g. 'srPlotDetails').
+                     None = the response body itself is the keyed dict.
+        method: HTTP method.
+        timeout: Request timeout in seconds.
+
+    Returns:
+        callable(list) -> dict
+    """
+    import requests
+    from components.master_search import _get_nested_value
+
+    def send(payloads):
+        response = requests.request(method, url, headers=headers, json=payloads, timeout=timeout)
+        if not 200 <= response.status_code < 300:
+            try:
+                body = response.json()
+            except ValueError:
+                body = response.text
+            raise BatchRequestError(response.status_code, body)
+        data = response.json()
+        if result_path:
+            data = _get_nested_value(data, result_path)
+        return {str(k): v for k, v in (data or {}).items()}
+
+    return send
@@ -0,0 +1,144 @@
+"""
+Cancellation Component
+Cooperative cancellation and deadlines for bridge runs.
+
+Once a run is cancelled (by the backend, or because its deadline passed) it winds down
+instead of being killed mid-row:
+
+1. thread_utils stops dispatching new rows; rows already in flight finish and their
+   results are returned as a partial result set. Parked (deferred) rows are not retried.
+2. The bridge interceptor stops retrying/backing off, and refuses new requests made
+   outside a dispatched row (e.g. sequential scripts that loop over rows themselves).
+3. The backend (backend/api.js) kills the process only if it has not finished within
+   its grace period.
+
+Control channel: the backend writes JSON lines to the bridge's stdin
+(--control-stdin, always on for --serve workers):
+    {"control": "cancel", "reason": "Cancelled by user"}
+Other lines are handed to the caller (work units of runner_bridge --serve).
+
+Usage:
+    from components import cancellation
+    cancellation.set_deadline(time.time() + 600)
+    if cancellation.is_cancelled(): ...
+    cancellation.wait(5.0)    # sleep that wakes up on cancel; True if cancelled
+"""
+
+import json
+import sys
+import threading
+import time
+
+
+class CancelledError(Exception):
+    """Raised for work refused because the run was cancelled or is past its deadline."""
+
+
+_event = threading.Event()
+_lock = threading.Lock()
+_reason = None
+_deadline = None  # epoch seconds
+_state = threading.local()
+
+
+def cancel(reason="Cancelled"):
+    """Cancel the run (first reason wins)."""
+    global _reason
+    with _lock:
+        if _event.is_set():
+            return
+        _reason = reason
+        _event.set()
+    print(f"🛑 [CANCEL] {reason}: no new rows will be started; finishing rows in flight", flush=True)
+
+
+def set_deadline(epoch_seconds):
+    """Run-wide deadline (epoch seconds); None clears it."""
+    global _deadline
+    _deadline = float(epoch_seconds) if epoch_seconds else None
+    if _deadline:
+        remaining = _deadline - time.time()
+        print(f"⏱️  [DEADLINE] Run must finish within {max(0.0, remaining):.0f}s", flush=True)
+
+
+def is_cancelled():
+    """True once cancelled or past the deadline."""
+    if _event.is_set():
+        return True
+    if _deadline is not None and time.time() >= _deadline:
+        cancel("Deadline exceeded")
+        return True
+    return False
+
+
+def reason():
+    return _reason
+
+
+def check():
+    """Raise CancelledError if the run is cancelled."""
+    if is_cancelled():
+        raise CancelledError(_reason)
+
+
+def wait(seconds):
+    """Sleep up to `seconds`, waking early on cancel or deadline. True if cancelled."""
+    if _deadline is not None:
+        seconds = min(seconds, max(0.0, _deadline - time.time()))
+    _event.wait(max(0.0, seconds))
+    return is_cancelled()
+
+
+def reset(keep_deadline=False):
+    """
+    Clear cancellation and (unless keep_deadline) the deadline. Warm workers reset before
+    every unit: a cancel applies to the unit in flight, the run's deadline to all of them.
+    """
+    global _reason, _deadline
+    with _lock:
+        _event.clear()
+        _reason = None
+        if not keep_deadline:
+            _deadline = None
+
+
+# --- Per-row state (thread-local, set by thread_utils) -----------------------
+
+def begin_row():
+    """Mark the current thread as processing a dispatched row (allowed to drain)."""
+    _state.active = True
+
+
+def end_row():
+    _state.active = False
+
+
+def in_row():
+    return getattr(_state, 'active', False)
+
+
+# --- Control channel -----------------------------------------------------------
+
+def watch_stdin(on_line=None):
+    """
+    Read control messages from stdin on a daemon thread. Lines that are not control
+    messages go to on_line(line); on_line(None) signals EOF.
+    """
+    def _read():
+        for line in sys.stdin:
+            message = None
+            if line.lstrip().startswith('{"control"'):
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    message = None
+            if message is not None and message.get('control') == 'cancel':
+                cancel(message.get('reason') or "Cancelled")
+            elif on_line is not None:
+                on_line(line)
+        if on_line is not None:
+            on_line(None)
+
+    thread = threading.Thread(target=_read, name="control-stdin", daemon=True)
+    thread.start()
+    return thread
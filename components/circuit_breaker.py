@@ -0,0 +1,161 @@
+"""
+Circuit Breaker Component
+Per-endpoint circuit breakers for the bridge request path.
+
+Endpoints are keyed by host + path prefix (default: first 4 segments, e.g.
+'/services/utilservice/api/geojson'), so one degraded service does not slow down
+rows that only use healthy ones.
+
+States:
+    closed    - requests flow; consecutive transient failures are counted
+    open      - requests fail fast with CircuitOpenError until the cooldown ends
+    half_open - one probe request is let through; success closes, failure re-opens
+                (with a doubled cooldown, capped)
+
+Only transient failures (timeouts, connection errors, 429/5xx) trip a breaker; 4xx
+responses are the caller's problem and count as a healthy endpoint.
+"""
+
+import threading
+import time
+import urllib.parse
+
+try:
+    from requests.exceptions import ConnectionError as _BaseError
+except ImportError:
+    _BaseError = ConnectionError
+
+DEFAULTS = {
+    'failure_threshold': 5,    # consecutive failures that open the circuit
+    'cooldown': 30.0,          # seconds open before the half-open probe
+    'max_cooldown': 300.0,
+    'path_depth': 4,           # path segments in the endpoint key
+    'timeout': (10, 120),      # default (connect, read) timeout for requests without one
+}
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitOpenError(_BaseError):
+    """Raised instead of sending a request to an endpoint whose circuit is open."""
+
+    def __init__(self, key, retry_in):
+        self.key = key
+        self.retry_in = retry_in
+        super().__init__(f"Circuit open for {key}: endpoint is failing, skipped (next probe in {retry_in:.0f}s)")
+
+
+def endpoint_key(url, depth=None):
+    """host + first `depth` path segments (numeric/id-like segments are cut off)."""
+    depth = DEFAULTS['path_depth'] if depth is None else depth
+    try:
+        parts = urllib.parse.urlsplit(url)
+    except Exception:
+        return str(url)
+    segments = []
+    for segment in parts.path.split('/'):
+        if not segment:
+            continue
+        if segment.isdigit() or len(segment) >= 24:
+            break
+        segments.append(segment)
+        if len(segments) >= depth:
+            break
+    return f"{parts.netloc}/{'/'.join(segments)}"
+
+
+class CircuitBreaker:
+    """State of one endpoint."""
+
+    def __init__(self, key, failure_threshold=None, cooldown=None, max_cooldown=None):
+        self.key = key
+        self.failure_threshold = failure_threshold or DEFAULTS['failure_threshold']
+        self.base_cooldown = cooldown or DEFAULTS['cooldown']
+        self.max_cooldown = max_cooldown or DEFAULTS['max_cooldown']
+        self.cooldown = self.base_cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.fast_failed = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Raise CircuitOpenError if the request must not be sent."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if self.state == OPEN and remaining <= 0:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                print(f"🔌 [CIRCUIT] {self.key}: half-open, sending probe", flush=True)
+                return
+            self.fast_failed += 1
+            raise CircuitOpenError(self.key, max(0.0, remaining))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"✅ [CIRCUIT] {self.key}: recovered, circuit closed "
+                      f"({self.fast_failed} requests fast-failed while open)", flush=True)
+            self.state = CLOSED
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self._probe_in_flight = False
+
+    def record_failure(self, reason):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                self._open(f"probe failed ({reason})")
+                return
+            self.failures += 1
+            if self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._open(f"{self.failures} consecutive failures, last: {reason}")
+
+    def release_probe(self):
+        """Request ended without telling us anything about the endpoint (e.g. a local error)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _open(self, why):
+        # Caller holds the lock
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._probe_in_flight = False
+        print(f"⛔ [CIRCUIT] {self.key}: circuit OPEN for {self.cooldown:.0f}s - {why}", flush=True)
+
+
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+def configure(**options):
+    """Override DEFAULTS (e.g. from env_config) before the first request."""
+    for name, value in options.items():
+        if value is not None and name in DEFAULTS:
+            DEFAULTS[name] = value
+
+
+def get_breaker(url):
+    """The breaker for the endpoint of `url` (created on first use)."""
+    key = endpoint_key(url)
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.setdefault(key, CircuitBreaker(key))
+    return breaker
+
+
+def apply_default_timeout(kwargs):
+    """Give requests without an explicit timeout the default one (requests never times out otherwise)."""
+    if kwargs.get('timeout') is None and DEFAULTS['timeout']:
+        kwargs['timeout'] = DEFAULTS['timeout']
+
+
+def summary():
+    """{key: state} for every endpoint that is not closed."""
+    return {key: b.state for key, b in _breakers.items() if b.state != CLOSED}
@@ -0,0 +1,124 @@
+"""
+Codec Component
+One JSON encoder/decoder for the bridge and the request path.
+
+Uses orjson when installed, then msgspec, then the stdlib json module. Whatever the
+backend, the output is the same valid JSON:
+    - datetime/date/time (incl. pandas Timestamp) -> ISO 8601 strings
+    - NaN / Infinity / NaT                        -> null (JSON.parse in api.js rejects NaN)
+    - numpy scalars and arrays                    -> plain numbers / lists
+    - Decimal -> float, set/tuple -> list, anything else -> str() (like default=str)
+    - compact separators, UTF-8 (non-ASCII is not escaped)
+
+Usage:
+    from components import codec
+    text = codec.dumps(obj)            # str
+    raw = codec.dumps_bytes(obj)       # bytes
+    obj = codec.loads(text_or_bytes)
+"""
+
+import datetime
+import decimal
+import json
+import math
+
+try:
+    import orjson
+    BACKEND = 'orjson'
+except ImportError:
+    orjson = None
+    try:
+        import msgspec
+        BACKEND = 'msgspec'
+    except ImportError:
+        msgspec = None
+        BACKEND = 'json'
+
+
+def _finite(value):
+    return None if isinstance(value, float) and not math.isfinite(value) else value
+
+
+def to_jsonable(obj):
+    """Fallback conversion for values the backend cannot encode natively."""
+    type_name = type(obj).__name__
+    if type_name == 'NaTType':
+        return None
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)) or hasattr(obj, 'isoformat'):
+        try:
+            return obj.isoformat()
+        except Exception:
+            return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return _finite(float(obj))
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    # numpy arrays / scalars (checked by duck typing so numpy stays optional)
+    if hasattr(obj, 'tolist') and hasattr(obj, 'dtype'):
+        value = obj.tolist()
+        if isinstance(value, list):
+            return _sanitize(value)
+        return _finite(value)
+    if hasattr(obj, 'item') and hasattr(obj, 'dtype'):
+        return _finite(obj.item())
+    return str(obj)
+
+
+def _sanitize(obj):
+    """stdlib path: json encodes float NaN itself (never calls default), so replace it first."""
+    if isinstance(obj, float):
+        return _finite(obj)
+    if isinstance(obj, dict):
+        return {k if isinstance(k, (str, int, float, bool)) or k is None else str(k): _sanitize(v)
+                for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_sanitize(v) for v in obj]
+    return obj
+
+
+if BACKEND == 'orjson':
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj, indent=False):
+        options = _OPTIONS | orjson.OPT_INDENT_2 if indent else _OPTIONS
+        try:
+            return orjson.dumps(obj, default=to_jsonable, option=options)
+        except TypeError:
+            # e.g. integers beyond 64 bits or unusual dict keys: take the portable path
+            return _stdlib_dumps(obj, indent).encode('utf-8')
+
+    def loads(data):
+        return orjson.loads(data)
+
+elif BACKEND == 'msgspec':
+    _encoder = msgspec.json.Encoder(enc_hook=to_jsonable)
+    _decoder = msgspec.json.Decoder()
+
+    def dumps_bytes(obj, indent=False):
+        try:
+            raw = _encoder.encode(obj)
+        except (TypeError, msgspec.EncodeError):
+            return _stdlib_dumps(obj, indent).encode('utf-8')
+        return msgspec.json.format(raw, indent=2) if indent else raw
+
+    def loads(data):
+        return _decoder.decode(data)
+
+else:
+    def dumps_bytes(obj, indent=False):
+        return _stdlib_dumps(obj, indent).encode('utf-8')
+
+    def loads(data):
+        return json.loads(data)
+
+
+def _stdlib_dumps(obj, indent=False):
+    return json.dumps(_sanitize(obj), default=to_jsonable, ensure_ascii=False,
+                      indent=2 if indent else None, separators=None if indent else (',', ':'))
+
+
+def dumps(obj, indent=False):
+    """Encode to a JSON string."""
+    if BACKEND == 'json':
+        return _stdlib_dumps(obj, indent)
+    return dumps_bytes(obj, indent).decode('utf-8')
@@ -12,6 +12,10 @@ class ScriptExecutorV2 {
     constructor(config = {}) {
         this.apiBaseUrl = config.apiBaseUrl || '';
         this.debug = config.debug || false;
+        // Optional SSO refresh token: lets the backend renew the access token during long runs
+        this.refreshToken = config.refreshToken || null;
+        // Optional: run the bridge with the sampling profiler (runner_bridge --profile)
+        this.profile = config.profile || false;
     }
 
     /**
@@ -37,6 +41,8 @@ class ScriptExecutorV2 {
             scriptName: scriptName, // Filename (e.g., 'Script.py')
             rows: rows,
             token: token,
+            refreshToken: this.refreshToken,
+            profile: this.profile,
             envConfig: cleanConfig
         };
     }
@@ -95,6 +101,82 @@ class ScriptExecutorV2 {
             throw error; // Re-throw for UI to handle
         }
     }
+
+    /**
+     * Async jobs (backend/jobs.js): the server runs the upload and the browser only polls.
+     * Submitting returns a jobKey; every later request for the job must send it.
+     */
+    async jobRequest(url, jobKey, options = {}) {
+        const response = await fetch(url, {
+            ...options,
+            headers: {
+                'Content-Type': 'application/json',
+                ...(jobKey ? { 'X-Job-Key': jobKey } : {})
+            }
+        });
+        const body = await response.json();
+        if (!response.ok) throw new Error(body.error || `Job request failed with status ${response.status}`);
+        return body;
+    }
+
+    /**
+     * Queue a run. @returns {Promise<Object>} Job status ({ id, jobKey, status, queuePosition, ... })
+     */
+    async submitJob(scriptName, rows, token, envConfig, meta = {}) {
+        if (!scriptName) throw new Error('Script Name is required');
+        if (!rows || rows.length === 0) throw new Error('No data rows to process');
+        const payload = this.preparePayload(scriptName, rows, token, envConfig, meta);
+        return this.jobRequest('/api/jobs', null, { method: 'POST', body: JSON.stringify(payload) });
+    }
+
+    async getJob(jobId, jobKey) {
+        return this.jobRequest(`/api/jobs/${encodeURIComponent(jobId)}`, jobKey);
+    }
+
+    async cancelJob(jobId, jobKey) {
+        return this.jobRequest(`/api/jobs/${encodeURIComponent(jobId)}/cancel`, jobKey, { method: 'POST' });
+    }
+
+    async fetchJobResults(jobId, jobKey, offset = 0, limit = 1000) {
+        return this.jobRequest(`/api/jobs/${encodeURIComponent(jobId)}/results?offset=${offset}&limit=${limit}`, jobKey);
+    }
+
+    /**
+     * Export a job's results, built and streamed by the server (backend/export.js), so large
+     * runs do not have to be turned into a workbook in the page.
+     * @param {string} format 'xlsx' | 'csv' | 'parquet' | 'json' | 'ndjson'
+     * @returns {Promise<Blob>}
+     */
+    async downloadJobResults(jobId, jobKey, format = 'xlsx') {
+        const response = await fetch(`/api/jobs/${encodeURIComponent(jobId)}/download?format=${encodeURIComponent(format)}`, {
+            headers: jobKey ? { 'X-Job-Key': jobKey } : {}
+        });
+        if (!response.ok) {
+            const body = await response.json().catch(() => ({}));
+            throw new Error(body.error || `Download failed with status ${response.status}`);
+        }
+        return response.blob();
+    }
+
+    /**
+     * Poll a job until it finishes, collecting rows as they complete.
+     * @param {Function} [onProgress] Called with (status, newRows) after every poll
+     * @returns {Promise<{status: Object, results: Array}>}
+     */
+    async waitForJob(jobId, jobKey, onProgress = null, intervalMs = 2000) {
+        const results = [];
+        for (;;) {
+            const page = await this.fetchJobResults(jobId, jobKey, results.length, 5000);
+            results.push(...page.rows);
+            const status = await this.getJob(jobId, jobKey);
+            if (onProgress) onProgress(status, page.rows);
+            if (page.done || (['completed', 'failed', 'cancelled', 'expired', 'unauthorized'].includes(status.status)
+                && results.length >= status.processedRows)) {
+                return { status, results };
+            }
+            if (page.rows.length === 0) await new Promise(resolve => setTimeout(resolve, intervalMs));
+        }
+    }
 }
 
 // Attach to window for global access
@@ -175,7 +175,7 @@ class LoginComponent {
                 const data = await res.json();
 
                 if (data.access_token) {
-                    this.onLoginSuccess(data.access_token, { environment: env, tenant, username });
+                    this.onLoginSuccess(data.access_token, { environment: env, tenant, username, refreshToken: data.refresh_token || null });
 
                     // Switch to Logged In View
                     document.getElementById('lc-view-form').style.display = 'none';
@@ -10,6 +10,9 @@ Supports two modes:
 import requests
 import json
 
+from components import auth_context
+from components import metrics
+
 
 def _get_nested_value(data, path):
     """
@@ -94,13 +97,7 @@ def _resolve_path_variables(endpoint, path_variables_config, env_config, cache=N
     
     resolved_endpoint = endpoint
     base_url = env_config.get('apiBaseUrl', '')
-    token = env_config.get('token', '')
-    
-    # Ensure Bearer prefix
-    if token and not token.startswith('Bearer '):
-        token = f"Bearer {token}"
-        
-    headers = {'Authorization': token}
+    headers = auth_context.headers_for(env_config)
     
     for var_name, var_config in path_variables_config.items():
         placeholder = f"{{{var_name}}}"
@@ -171,6 +168,7 @@ def fetch_all(master_type, env_config):
         print(f"❌ [MASTER_SEARCH] Config not found for master type: {master_type}")
         return []
     
+    metrics.count('master_fetch_all', master_type)
     base_url = env_config.get('apiBaseUrl', '')
     endpoint = master_config.get('api_endpoint', '')
     
@@ -186,11 +184,7 @@ def fetch_all(master_type, env_config):
     url = f"{base_url}{endpoint}"
     
     try:
-        token = env_config.get('token', '')
-        if token and not token.startswith('Bearer '):
-            token = f"Bearer {token}"
-            
-        headers = {'Authorization': token}
+        headers = auth_context.headers_for(env_config)
         response = requests.get(url, headers=headers, timeout=30)
         response.raise_for_status()
         
@@ -248,6 +242,8 @@ def search(master_type, query_value, env_config, cache=None):
         }
     
     cache_key = f"{master_type}:{str(query_value).strip().lower()}"
+    if cache is not None:
+        metrics.cache_event(master_type, cache_key in cache)
     if cache is not None and cache_key in cache:
         cached = cache[cache_key]
         if cached['found']:
@@ -278,11 +274,7 @@ def search(master_type, query_value, env_config, cache=None):
     url = f"{base_url}{endpoint}"
     
     try:
-        token = env_config.get('token', '')
-        if token and not token.startswith('Bearer '):
-            token = f"Bearer {token}"
-            
-        headers = {'Authorization': token}
+        headers = auth_context.headers_for(env_config)
         
         # Custom Query Param Handling to enforce %20 instead of +
         # requests.get(params=...) produces + for spaces, which some APIs reject
@@ -0,0 +1,289 @@
+"""
+Metrics Component
+In-process metrics registry for one bridge run.
+
+The bridge interceptor reports every HTTP attempt (latency, status, bytes); thread_utils
+reports every row; master_search reports cache hits. At the end of the run the bridge adds
+summary() to its JSON output as "metrics", next to "data":
+
+    endpoints    per endpoint template ("GET /services/farm/api/farmers/{id}"):
+                 latency histogram (ms), p50/p95/max, status counts, bytes sent/received
+    rows         per-row elapsed and HTTP time, i.e. how much of a row is client CPU
+    caches       master_search hit/miss counts and hit rate per master type
+    counters     retries, deferred rows, circuit fast-fails, token refreshes
+    concurrency  requests started and max in-flight requests over time
+
+Per-row fields (with env_config['rowTimings'] = True, see thread_utils.run_in_parallel):
+    _elapsed_ms   wall time of the row
+    _http_calls   HTTP attempts made while processing the row (retries included)
+
+Usage:
+    from components import metrics
+    started = metrics.request_started()
+    ...
+    metrics.request_finished('GET', url, started, status=200, bytes_received=512)
+"""
+
+import bisect
+import re
+import threading
+import time
+import urllib.parse
+
+# Upper bounds (ms) of the latency histogram buckets; one more bucket catches the rest
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+MAX_TIMELINE_POINTS = 120
+
+_ID_SEGMENT = re.compile(r'^(\d+|[0-9a-fA-F-]{16,}|[A-Za-z0-9_-]{24,})$')
+
+
+def endpoint_template(method, url):
+    """'GET /services/farm/api/farmers/{id}': id-like path segments collapsed, query dropped."""
+    try:
+        parts = urllib.parse.urlsplit(url)
+    except Exception:
+        return f"{method.upper()} {url}"
+    segments = ['{id}' if _ID_SEGMENT.match(s) else s for s in parts.path.split('/')]
+    return f"{method.upper()} {'/'.join(segments) or '/'}"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (ms)."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS_MS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimate from the buckets (linear within the bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                low = BUCKETS_MS[i - 1] if i > 0 else 0.0
+                high = BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max
+                return round(min(low + (high - low) * (rank - seen) / n, self.max), 1)
+            seen += n
+        return round(self.max, 1)
+
+    def to_dict(self):
+        labels = [f"le_{b}" for b in BUCKETS_MS] + ['inf']
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 1) if self.count else None,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'max_ms': round(self.max, 1),
+            'buckets': {label: n for label, n in zip(labels, self.counts) if n},
+        }
+
+
+class _Endpoint:
+    __slots__ = ('latency', 'status', 'errors', 'bytes_sent', 'bytes_received')
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.status = {}
+        self.errors = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+class Registry:
+    """Thread-safe metrics for one run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.monotonic()
+            self.endpoints = {}
+            self.counters = {}
+            self.caches = {}
+            self.rows = {'count': 0, 'elapsed': Histogram(), 'http_ms': 0.0, 'elapsed_ms': 0.0, 'http_calls': 0}
+            self.inflight = 0
+            self.timeline = {}  # second -> [requests started, max in-flight]
+
+    # -- HTTP ---------------------------------------------------------------
+
+    def request_started(self):
+        now = time.monotonic()
+        with self._lock:
+            self.inflight += 1
+            point = self.timeline.setdefault(int(now - self.started), [0, 0])
+            point[0] += 1
+            if self.inflight > point[1]:
+                point[1] = self.inflight
+        return now
+
+    def request_finished(self, method, url, started, status=None, error=None, bytes_sent=0, bytes_received=0):
+        elapsed_ms = (time.monotonic() - started) * 1000
+        key = endpoint_template(method, url)
+        with self._lock:
+            self.inflight -= 1
+            endpoint = self.endpoints.get(key)
+            if endpoint is None:
+                endpoint = self.endpoints[key] = _Endpoint()
+            endpoint.latency.observe(elapsed_ms)
+            if error:
+                endpoint.errors[error] = endpoint.errors.get(error, 0) + 1
+            else:
+                endpoint.status[str(status)] = endpoint.status.get(str(status), 0) + 1
+            endpoint.bytes_sent += bytes_sent or 0
+            endpoint.bytes_received += bytes_received or 0
+        row = _row_state()
+        if row is not None:
+            row[0] += 1
+            row[1] += elapsed_ms
+        return elapsed_ms
+
+    # -- Counters / caches ------------------------------------------------------
+
+    def count(self, name, label='total', n=1):
+        with self._lock:
+            bucket = self.counters.setdefault(name, {})
+            bucket[label] = bucket.get(label, 0) + n
+
+    def cache_event(self, name, hit):
+        with self._lock:
+            entry = self.caches.setdefault(name, [0, 0])
+            entry[0 if hit else 1] += 1
+
+    # -- Rows -------------------------------------------------------------------
+
+    def observe_row(self, elapsed_ms, http_calls, http_ms):
+        with self._lock:
+            rows = self.rows
+            rows['count'] += 1
+            rows['elapsed'].observe(elapsed_ms)
+            rows['elapsed_ms'] += elapsed_ms
+            rows['http_ms'] += http_ms
+            rows['http_calls'] += http_calls
+
+    # -- Summary ----------------------------------------------------------------
+
+    def _timeline(self):
+        if not self.timeline:
+            return {'step_s': 1, 'points': []}
+        last = max(self.timeline)
+        step = max(1, -(-(last + 1) // MAX_TIMELINE_POINTS))
+        points = {}
+        for second, (started, peak) in self.timeline.items():
+            point = points.setdefault(second // step * step, [0, 0])
+            point[0] += started
+            point[1] = max(point[1], peak)
+        return {
+            'step_s': step,
+            'points': [{'t': t, 'requests': p[0], 'max_inflight': p[1]} for t, p in sorted(points.items())],
+        }
+
+    def summary(self):
+        with self._lock:
+            duration = time.monotonic() - self.started
+            endpoints = {}
+            for key, e in sorted(self.endpoints.items(), key=lambda kv: -kv[1].latency.total):
+                entry = e.latency.to_dict()
+                entry.update(status=dict(e.status), bytes_sent=e.bytes_sent, bytes_received=e.bytes_received)
+                if e.errors:
+                    entry['errors'] = dict(e.errors)
+                endpoints[key] = entry
+            rows = self.rows
+            row_summary = rows['elapsed'].to_dict()
+            row_summary.pop('buckets', None)
+            if rows['count']:
+                row_summary.update(
+                    http_calls_per_row=round(rows['http_calls'] / rows['count'], 2),
+                    http_share=round(min(1.0, rows['http_ms'] / rows['elapsed_ms']), 3) if rows['elapsed_ms'] else None,
+                )
+            caches = {
+                name: {'hits': h, 'misses': m, 'hit_rate': round(h / (h + m), 3) if h + m else None}
+                for name, (h, m) in self.caches.items()
+            }
+            return {
+                'duration_s': round(duration, 3),
+                'http_requests': sum(e.latency.count for e in self.endpoints.values()),
+                'bytes_sent': sum(e.bytes_sent for e in self.endpoints.values()),
+                'bytes_received': sum(e.bytes_received for e in self.endpoints.values()),
+                'endpoints': endpoints,
+                'rows': row_summary,
+                'caches': caches,
+                'counters': {name: dict(v) for name, v in self.counters.items()},
+                'concurrency': dict(self._timeline(), peak_inflight=max((p[1] for p in self.timeline.values()), default=0)),
+            }
+
+
+# -- Per-row state (thread-local, set by thread_utils) ------------------------------
+
+_local = threading.local()
+
+
+def _row_state():
+    return getattr(_local, 'row', None)
+
+
+def begin_row():
+    """Start counting HTTP calls/time for the row processed by this thread."""
+    _local.row = [0, 0.0]
+
+
+def end_row(elapsed_ms=None):
+    """Stop counting; returns (http_calls, http_ms). Records the row if elapsed_ms is given."""
+    row = getattr(_local, 'row', None) or [0, 0.0]
+    _local.row = None
+    if elapsed_ms is not None:
+        REGISTRY.observe_row(elapsed_ms, row[0], row[1])
+    return row[0], row[1]
+
+
+# -- Request helpers ------------------------------------------------------------------
+
+def body_size(kwargs):
+    """Approximate request body size from requests kwargs (data/json already encoded by transport)."""
+    data = kwargs.get('data')
+    if isinstance(data, (bytes, bytearray, str)):
+        return len(data)
+    size = 0
+    files = kwargs.get('files')
+    if isinstance(files, dict):
+        for entry in files.values():
+            content = entry[1] if isinstance(entry, tuple) and len(entry) >= 2 else entry
+            if isinstance(content, (bytes, bytearray, str)):
+                size += len(content)
+    return size
+
+
+def response_size(response, stream=False):
+    """Response body size without consuming streamed bodies."""
+    length = response.headers.get('Content-Length') if response.headers is not None else None
+    if length and str(length).isdigit():
+        return int(length)
+    if stream:
+        return 0
+    try:
+        return len(response.content or b'')
+    except Exception:
+        return 0
+
+
+REGISTRY = Registry()
+
+request_started = REGISTRY.request_started
+request_finished = REGISTRY.request_finished
+count = REGISTRY.count
+cache_event = REGISTRY.cache_event
+observe_row = REGISTRY.observe_row
+summary = REGISTRY.summary
+reset = REGISTRY.reset
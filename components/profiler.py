@@ -0,0 +1,155 @@
+"""
+Profiler Component
+Low-overhead sampling profiler for bridge runs (runner_bridge --profile).
+
+A background thread snapshots the stacks of all threads (sys._current_frames) every few
+milliseconds, so the ThreadPoolExecutor workers of thread_utils are profiled too (cProfile
+only sees the thread that enabled it). Idle workers waiting for work are left out.
+
+Writes two files to temp_data/profiles/:
+    <name>.collapsed   flamegraph-compatible collapsed stacks ("thread;outer;...;leaf count"),
+                       for flamegraph.pl, speedscope or inferno
+    <name>.txt         top-N functions by self and inclusive samples
+
+Usage:
+    from components import profiler
+    sampler = profiler.StackSampler(interval=0.005).start()
+    ...
+    sampler.stop()
+    paths = sampler.write(profiler.profile_dir(), "Add_Farmer_20250101_120000")
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+
+# Leaf frames of threads that are only waiting for work (not worth a sample)
+IDLE_LEAVES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),     # pool worker blocked in SimpleQueue.get (C code)
+}
+
+# Thread plumbing present in every worker stack; left out of the inclusive ranking
+PLUMBING_FILES = ('threading.py', 'thread.py')
+
+_THREAD_SUFFIX = re.compile(r'_\d+$')
+
+
+def profile_dir():
+    """temp_data/profiles under the project root."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, 'temp_data', 'profiles')
+
+
+def _label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples every thread's Python stack at a fixed interval."""
+
+    def __init__(self, interval=0.005, max_depth=100, include_idle=False):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.include_idle = include_idle
+        self.stacks = {}        # (thread, frame labels outer -> leaf) -> samples
+        self.samples = 0
+        self.ticks = 0
+        self.started = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - (self.started or time.perf_counter())
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            self.ticks += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    # New worker: refresh ident -> name, grouping pool workers ("ThreadPoolExecutor-0")
+                    names = {t.ident: _THREAD_SUFFIX.sub('', t.name) for t in threading.enumerate()}
+                code = frame.f_code
+                if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(_label(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                key = (names.get(ident, f"thread-{ident}"), tuple(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.samples += 1
+
+    # -- Reports ------------------------------------------------------------------
+
+    def collapsed(self):
+        """Collapsed-stack lines, heaviest first."""
+        lines = []
+        for (thread, stack), n in sorted(self.stacks.items(), key=lambda kv: -kv[1]):
+            frames = ';'.join(f.replace(';', ',') for f in (thread,) + stack)
+            lines.append(f"{frames} {n}")
+        return lines
+
+    def top(self, n=25):
+        """{'self': [...], 'inclusive': [...]} with samples and share of all samples."""
+        own_samples = {}
+        inclusive = {}
+        for (_, stack), count in self.stacks.items():
+            if not stack:
+                continue
+            own_samples[stack[-1]] = own_samples.get(stack[-1], 0) + count
+            for label in set(stack):
+                if label.rsplit(' (', 1)[-1].split(':')[0] in PLUMBING_FILES:
+                    continue
+                inclusive[label] = inclusive.get(label, 0) + count
+        total = self.samples or 1
+
+        def rank(table):
+            return [{'function': label, 'samples': count, 'share': round(count / total, 4)}
+                    for label, count in sorted(table.items(), key=lambda kv: -kv[1])[:n]]
+
+        return {'self': rank(own_samples), 'inclusive': rank(inclusive)}
+
+    def summary_text(self, n=25):
+        top = self.top(n)
+        out = [f"Samples: {self.samples} over {self.duration:.1f}s "
+               f"(interval {self.interval * 1000:.1f} ms, {len(self.stacks)} unique stacks)", ""]
+        for title, key in (("Top functions by self samples (where time is spent)", 'self'),
+                           ("Top functions by inclusive samples (incl. callees)", 'inclusive')):
+            out.append(title)
+            for entry in top[key]:
+                out.append(f"  {entry['share'] * 100:6.2f}%  {entry['samples']:>8}  {entry['function']}")
+            out.append("")
+        return "\n".join(out)
+
+    def write(self, directory, name, top_n=25):
+        """Write <name>.collapsed and <name>.txt; returns their paths."""
+        os.makedirs(directory, exist_ok=True)
+        collapsed_path = os.path.join(directory, f"{name}.collapsed")
+        summary_path = os.path.join(directory, f"{name}.txt")
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(self.collapsed()))
+            f.write("\n")
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(self.summary_text(top_n))
+        return {'collapsed': collapsed_path, 'summary': summary_path}
@@ -0,0 +1,220 @@
+"""
+Request Log Component
+Low-overhead structured logging for the converter-injected _log_req.
+
+Levels:
+    error - only failed requests (status >= 400 or exception), with a truncated body
+    info  - (default) one compact line per request: method, path, status, latency, bytes;
+            bodies only for errors (plus an optional sampled fraction of successes)
+    debug - the legacy verbose block: token meta, pretty-printed body
+
+Lines keep the [API_DEBUG] prefix so the UI log viewer still highlights them. Output goes
+through a buffered background writer instead of one print() per line; runner_bridge
+calls flush() before it prints the ---JSON_START--- result block.
+"""
+
+import sys
+import time
+import random
+import atexit
+import threading
+import queue
+import urllib.parse
+
+LEVELS = {'error': 40, 'info': 20, 'debug': 10}
+
+_config = {
+    'level': LEVELS['info'],
+    'body_sample_rate': 0.0,   # fraction of successful responses whose body is logged at info
+    'body_limit': 500,         # chars of body kept at info/error level
+}
+
+
+def configure(level=None, body_sample_rate=None, body_limit=None):
+    """
+    Set the logging level and body capture options.
+
+    Args:
+        level: 'error' | 'info' | 'debug' (case-insensitive)
+        body_sample_rate: 0.0 - 1.0, share of successful bodies logged at info level
+        body_limit: max body characters at info/error level
+    """
+    if level is not None:
+        _config['level'] = LEVELS.get(str(level).lower(), LEVELS['info'])
+    if body_sample_rate is not None:
+        _config['body_sample_rate'] = max(0.0, min(1.0, float(body_sample_rate)))
+    if body_limit is not None:
+        _config['body_limit'] = int(body_limit)
+
+
+def is_enabled(level):
+    return LEVELS[level] >= _config['level']
+
+
+class _BufferedWriter:
+    """Background thread that batches log lines into few large stdout writes."""
+
+    def __init__(self, stream_getter, flush_interval=0.2):
+        self._stream_getter = stream_getter
+        self._flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def write(self, line):
+        if self._thread is None:
+            self._start()
+        self._queue.put(line)
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far has been written."""
+        if self._thread is None:
+            return
+        marker = threading.Event()
+        self._queue.put(marker)
+        marker.wait(timeout)
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            markers = []
+            deadline = time.monotonic() + self._flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    markers.append(item)
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    stream = self._stream_getter()
+                    stream.write('\n'.join(batch) + '\n')
+                    stream.flush()
+                except Exception:
+                    pass
+            for marker in markers:
+                marker.set()
+
+
+_writer = _BufferedWriter(lambda: sys.stdout)
+
+
+def emit(line):
+    """Queue one log line."""
+    _writer.write(line)
+
+
+def flush():
+    """Write out all queued lines (call before printing result delimiters)."""
+    _writer.flush()
+
+
+atexit.register(flush)
+
+
+def _short_path(url):
+    try:
+        parts = urllib.parse.urlsplit(url)
+        return parts.path + (f"?{parts.query}" if parts.query else "")
+    except Exception:
+        return str(url)
+
+
+def _response_size(resp):
+    try:
+        length = resp.headers.get('Content-Length')
+        if length is not None:
+            return int(length)
+        return len(resp.content or b'')
+    except Exception:
+        return 0
+
+
+def _body_preview(resp, limit=None, pretty=False):
+    try:
+        text = resp.text
+        if not text or not text.strip():
+            return "[Empty Response]"
+        if pretty:
+            try:
+                from components import codec
+                return codec.dumps(codec.loads(resp.content), indent=True)
+            except Exception:
+                return text[:4000]
+        return text[:limit] if limit else text
+    except Exception:
+        return "Binary/No Content"
+
+
+def _token_meta(kwargs):
+    # Resolved lazily: only debug level needs it. Claims are parsed once per token.
+    from components import auth_context
+    headers = kwargs.get('headers') or {}
+    return auth_context.describe(headers.get('Authorization', 'None'))
+
+
+def log_request(method, url, kwargs, resp=None, error=None, elapsed_ms=0.0):
+    """
+    Record one request according to the configured level.
+    """
+    level = _config['level']
+    failed = error is not None or (resp is not None and resp.status_code >= 400)
+
+    if level <= LEVELS['debug']:
+        lines = [
+            "[API_DEBUG] ----------------------------------------------------------------",
+            f"[API_DEBUG] 🚀 REQUEST: {method} {url}",
+            f"[API_DEBUG] 🔑 TOKEN META: {_token_meta(kwargs)}",
+        ]
+        if error is not None:
+            lines.append(f"[API_DEBUG] ❌ EXCEPTION: {error}")
+        else:
+            status_icon = "✅" if 200 <= resp.status_code < 300 else "❌"
+            lines.append(f"[API_DEBUG] {status_icon} RESPONSE [{resp.status_code}] ({elapsed_ms:.0f} ms)")
+            lines.append(f"[API_DEBUG] 📄 BODY:\n{_body_preview(resp, pretty=True)}")
+        lines.append("[API_DEBUG] ----------------------------------------------------------------\n")
+        emit('\n'.join(lines))
+        return
+
+    if not failed and level > LEVELS['info']:
+        return
+
+    path = _short_path(url)
+    if error is not None:
+        emit(f"[API_DEBUG] {method} {path} EXC {elapsed_ms:.0f}ms {type(error).__name__}: {error}")
+        return
+
+    line = f"[API_DEBUG] {method} {path} {resp.status_code} {elapsed_ms:.0f}ms {_response_size(resp)}B"
+    if failed or (_config['body_sample_rate'] and random.random() < _config['body_sample_rate']):
+        line += f" | {_body_preview(resp, limit=_config['body_limit'])}"
+    emit(line)
+
+
+def logged_request(method, url, **kwargs):
+    """
+    Perform a request through `requests` (so the bridge interceptor still applies) and log it.
+    Drop-in body for the converter's _log_req.
+    """
+    import requests
+
+    start = time.perf_counter()
+    try:
+        resp = requests.request(method, url, **kwargs)
+    except Exception as e:
+        log_request(method, url, kwargs, error=e, elapsed_ms=(time.perf_counter() - start) * 1000)
+        raise
+    log_request(method, url, kwargs, resp=resp, elapsed_ms=(time.perf_counter() - start) * 1000)
+    return resp
@@ -0,0 +1,208 @@
+"""
+Retry Queue Component
+Defers rows that failed for transient reasons instead of blocking a worker thread.
+
+Transient = timeouts, connection resets, 429, 502/503/504 and the gateway's
+"unconditional drop overload" text. Flow:
+
+1. thread_utils starts each row with begin_row().
+2. The bridge interceptor retries a transient response once after a short backoff. If it
+   is still transient, it calls mark_transient() and hands the response back to the
+   script, which records the row as failed as usual.
+3. thread_utils sees the mark (take_transient()) and parks the row in a DelayedQueue
+   with exponential backoff. Healthy rows keep flowing through the window; parked
+   rows are re-submitted when their delay elapses (or at the end of the run).
+4. After max_attempts deferrals the last result is kept as the row's final result.
+
+Side effects: a deferred row is re-run from the start, so a row is only deferred while
+none of its mutating calls (anything but GET/HEAD/OPTIONS) may have reached the server
+(record_mutation()). Mutating requests themselves are only retried on 429/503 or when the
+request provably never left the client (connect failure); a 502/504 or read timeout on a
+POST may already have been applied and is handed back to the script as is.
+
+Outside a deferrable row (sequential scripts, run_grouped), the interceptor falls back to
+blocking retries with exponential backoff (see blocking_delay()).
+"""
+
+import heapq
+import random
+import threading
+import time
+
+RETRYABLE_STATUS = (429, 502, 503, 504)
+# Answers that mean the request was not processed (safe to resend even a POST)
+NOT_APPLIED_STATUS = (429, 503)
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+OVERLOAD_TEXT = "unconditional drop overload"
+
+DEFAULTS = {
+    'max_attempts': 3,     # deferrals per row before the failure is final
+    'base_delay': 5.0,     # seconds before the first re-try of a parked row
+    'max_delay': 60.0,
+}
+
+_state = threading.local()
+
+
+class Deferred:
+    """Returned in place of a row result when the row hit a transient failure."""
+
+    __slots__ = ('reason', 'result')
+
+    def __init__(self, reason, result=None):
+        self.reason = reason
+        self.result = result
+
+
+def transient_reason(response):
+    """Short reason string if the response is a transient failure, else None."""
+    if response is None:
+        return None
+    if response.status_code in RETRYABLE_STATUS:
+        return f"HTTP {response.status_code}"
+    try:
+        if response.status_code >= 400 and response.text and OVERLOAD_TEXT in response.text.lower():
+            return "Server overload"
+    except Exception:
+        pass
+    return None
+
+
+def is_retryable_exception(error):
+    """Timeouts and connection failures (requests or socket level)."""
+    try:
+        import requests
+        if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+            return True
+    except ImportError:
+        pass
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+
+def is_safe_method(method):
+    """True for methods without side effects (may be resent freely)."""
+    return str(method or '').upper() in SAFE_METHODS
+
+
+def never_sent(error):
+    """True if the request failed before it reached the server (connection never opened)."""
+    try:
+        import requests
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+    except ImportError:
+        pass
+    # requests.ConnectionError wraps urllib3's MaxRetryError(reason=NewConnectionError)
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if type(error).__name__ in ('NewConnectionError', 'ConnectTimeoutError', 'ConnectionRefusedError'):
+            return True
+        error = getattr(error, 'reason', None) or (error.args[0] if getattr(error, 'args', None)
+                                                   and isinstance(error.args[0], BaseException) else None)
+    return False
+
+
+def may_have_applied(status_code):
+    """False when a response status shows the server did not apply the request."""
+    return status_code < 400 or (status_code >= 500 and status_code not in NOT_APPLIED_STATUS)
+
+
+def retry_after_seconds(response, default):
+    """Honour a numeric Retry-After header when the server sends one."""
+    try:
+        value = response.headers.get('Retry-After')
+        if value is not None:
+            return max(0.0, min(float(value), DEFAULTS['max_delay']))
+    except Exception:
+        pass
+    return default
+
+
+def backoff_delay(attempt, base=None, cap=None):
+    """Exponential backoff with jitter for the given attempt (1-based)."""
+    base = DEFAULTS['base_delay'] if base is None else base
+    cap = DEFAULTS['max_delay'] if cap is None else cap
+    delay = min(cap, base * (2 ** max(0, attempt - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def blocking_delay(attempt, response=None):
+    """Delay for in-thread retries when the row cannot be deferred (capped at 30s)."""
+    default = min(30.0, 2.0 * (2 ** max(0, attempt - 1)))
+    return retry_after_seconds(response, default) if response is not None else default
+
+
+# --- Per-row state (thread-local) --------------------------------------------
+
+def begin_row():
+    """Mark the current thread as processing a deferrable row."""
+    _state.active = True
+    _state.reason = None
+    _state.mutated = False
+
+
+def end_row():
+    _state.active = False
+
+
+def in_row():
+    """True if a transient failure in this thread can be deferred."""
+    return getattr(_state, 'active', False)
+
+
+def mark_transient(reason):
+    """Flag the current row for deferral (no-op outside a deferrable row)."""
+    if in_row():
+        _state.reason = reason
+
+
+def record_mutation():
+    """A mutating call of the current row may have been applied: the row must not be re-run."""
+    _state.mutated = True
+
+
+def row_mutated():
+    return getattr(_state, 'mutated', False)
+
+
+def take_transient():
+    """Return and clear the current row's transient reason (None once the row mutated anything)."""
+    reason = getattr(_state, 'reason', None)
+    _state.reason = None
+    return None if row_mutated() else reason
+
+
+# --- Delayed queue -----------------------------------------------------------
+
+class DelayedQueue:
+    """Min-heap of parked items ordered by the time they become due."""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = 0
+        self.parked_total = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def park(self, entry, attempt):
+        """Park an entry for its attempt-th retry."""
+        due = time.monotonic() + backoff_delay(attempt)
+        heapq.heappush(self._heap, (due, self._seq, entry))
+        self._seq += 1
+        self.parked_total += 1
+        return due
+
+    def pop_due(self, now=None):
+        """Entries whose delay has elapsed."""
+        now = time.monotonic() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        return due
+
+    def seconds_until_next(self):
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
@@ -0,0 +1,187 @@
+"""
+Row Store Component
+Compact, column-oriented container for bridge input data (opt-in).
+
+A list of per-row dicts repeats every column name and carries a hash table per row.
+RowStore keeps one list per column, shared by all rows, and hands out lightweight
+Row views (__slots__) that behave like dicts for scripts:
+
+    row.get('Farmer Name')     row['Status'] = 'Pass'     row.copy()  -> plain dict
+
+Enabled per script with "rowStore": "columnar" in the registry (see runner_bridge --row-store).
+"""
+
+import threading
+from collections.abc import MutableMapping, Sequence
+
+
+# Marks "this row has no value for this column" (distinct from None)
+_MISSING = object()
+
+
+class Row(MutableMapping):
+    """Dict-like view of a single row inside a RowStore."""
+
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    @property
+    def store(self):
+        """The RowStore this view reads from."""
+        return self._store
+
+    @property
+    def index(self):
+        """Position of the row in its store (views are created per access, so compare this, not id())."""
+        return self._index
+
+    def __getitem__(self, key):
+        column = self._store._columns.get(key)
+        if column is None:
+            raise KeyError(key)
+        value = column[self._index]
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        column = self._store._columns.get(key)
+        if column is None:
+            column = self._store._add_column(key)
+        column[self._index] = value
+
+    def __delitem__(self, key):
+        column = self._store._columns.get(key)
+        if column is None or column[self._index] is _MISSING:
+            raise KeyError(key)
+        column[self._index] = _MISSING
+
+    def __iter__(self):
+        index = self._index
+        for key, column in list(self._store._columns.items()):
+            if column[index] is not _MISSING:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        column = self._store._columns.get(key)
+        return column is not None and column[self._index] is not _MISSING
+
+    def get(self, key, default=None):
+        # Hot path for scripts: avoid the KeyError round trip of Mapping.get
+        column = self._store._columns.get(key)
+        if column is None:
+            return default
+        value = column[self._index]
+        return default if value is _MISSING else value
+
+    def copy(self):
+        """Detached plain dict (same as dict.copy() for regular rows)."""
+        return self.to_dict()
+
+    def to_dict(self):
+        index = self._index
+        return {
+            key: column[index]
+            for key, column in list(self._store._columns.items())
+            if column[index] is not _MISSING
+        }
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class RowStore(Sequence):
+    """
+    Column-oriented list of rows.
+
+    Behaves like the list of dicts scripts already receive (len, indexing, iteration,
+    enumerate), but stores each column once as a list.
+    """
+
+    def __init__(self):
+        self._columns = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._key_index = None  # (column count, header index), see row_utils.find_key
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build a store from an iterable of dicts (consumed incrementally).
+        """
+        store = cls()
+        for record in records:
+            store.append(record)
+        return store
+
+    def append(self, record):
+        """Append a dict as a new row. Returns the Row view."""
+        index = self._size
+        for column in self._columns.values():
+            column.append(_MISSING)
+        self._size += 1
+        row = Row(self, index)
+        for key, value in record.items():
+            row[key] = value
+        return row
+
+    def _add_column(self, key):
+        with self._lock:
+            column = self._columns.get(key)
+            if column is None:
+                column = [_MISSING] * self._size
+                self._columns[key] = column
+            return column
+
+    @property
+    def columns(self):
+        """Column names in first-seen order."""
+        return list(self._columns.keys())
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Row(self, i) for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('RowStore index out of range')
+        return Row(self, index)
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield Row(self, i)
+
+    def to_records(self):
+        """Materialise as a list of plain dicts (for JSON output)."""
+        return [row.to_dict() for row in self]
+
+    def to_frame(self):
+        """Build a pandas DataFrame directly from the columns (no per-row dicts)."""
+        import pandas as pd
+        return pd.DataFrame({
+            key: [None if v is _MISSING else v for v in column]
+            for key, column in self._columns.items()
+        })
+
+
+def to_plain(value):
+    """
+    Convert Row / RowStore objects (possibly nested in lists) back to plain dicts/lists.
+    Anything else is returned unchanged.
+    """
+    if isinstance(value, Row):
+        return value.to_dict()
+    if isinstance(value, RowStore):
+        return value.to_records()
+    if isinstance(value, list):
+        return [to_plain(v) for v in value]
+    return value
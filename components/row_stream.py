@@ -0,0 +1,153 @@
+"""
+Row Stream Component
+Incremental loading of bridge input rows from NDJSON (one JSON object per line).
+
+api.js writes the uploaded rows as NDJSON into temp_data so that neither side has to
+hold one giant JSON string. The bridge either:
+1. load_ndjson()  - parses line by line into a list (default, works for every script)
+2. NDJSONRows()   - lazy, re-iterable view for scripts registered with "streamInput": true,
+                    consumed by thread_utils through a bounded window
+
+Converted scripts also get `data_df` (a DataFrame of the input). data_frame() builds it
+for lists and columnar stores; for NDJSONRows it returns a LazyFrame that only loads
+the rows if the script actually touches data_df, so streamed input stays streamed.
+"""
+
+import json
+
+
+def iter_ndjson(path):
+    """
+    Yield one row per non-empty line of an NDJSON file.
+
+    Args:
+        path: Path to the NDJSON file
+
+    Yields:
+        dict per line
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Invalid NDJSON at line {line_no}: {e}")
+
+
+def load_ndjson(path):
+    """Parse an NDJSON file into a list of rows (no intermediate full-file string)."""
+    return list(iter_ndjson(path))
+
+
+class NDJSONRows:
+    """
+    Lazy, re-iterable sequence of rows backed by an NDJSON file.
+
+    Only the current line is held in memory while iterating. len() counts lines
+    without parsing them, and data[0] is supported so scripts can peek at the
+    first row (e.g. to detect optional columns). It is not a Sequence: any other
+    index or slice raises TypeError.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._len = None
+        self._first = None
+
+    def __iter__(self):
+        return iter_ndjson(self.path)
+
+    def __len__(self):
+        if self._len is None:
+            count = 0
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        count += 1
+            self._len = count
+        return self._len
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        # Only the literal int 0 (not False, 0.0, -len or slices): everything else would need
+        # random access into the file
+        if type(index) is int and index == 0:
+            if self._first is None:
+                self._first = next(iter(self), None)
+            if self._first is None:
+                raise IndexError('NDJSONRows index out of range')
+            return self._first
+        raise TypeError(f"NDJSONRows[{index!r}]: streamed input only supports iteration and data[0]; "
+                        "use list(data) to materialise")
+
+    def __repr__(self):
+        return f"NDJSONRows({self.path!r})"
+
+
+class LazyFrame:
+    """
+    Stand-in for data_df over streamed input: the DataFrame is built on first use
+    (attribute access, indexing, len, iteration), with a warning that this loads
+    every row into memory.
+    """
+
+    def __init__(self, rows):
+        self._rows = rows
+        self._frame = None
+
+    def _load(self):
+        if self._frame is None:
+            import pandas as pd
+            print("⚠️  [STREAM] data_df used with streamed input: loading every row into a DataFrame", flush=True)
+            self._frame = pd.DataFrame(list(self._rows))
+        return self._frame
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+
+    def __len__(self):
+        return len(self._rows) if self._frame is None else len(self._frame)
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __repr__(self):
+        return f"LazyFrame({self._rows!r})" if self._frame is None else repr(self._frame)
+
+
+def loaded_frame(df):
+    """
+    The pandas DataFrame behind data_df, for syncing it back into the result: the frame
+    itself, the loaded frame of a LazyFrame, or None when a LazyFrame was never used
+    (the rows are the result then; nothing is loaded just to sync).
+    """
+    if isinstance(df, LazyFrame):
+        return df._frame
+    try:
+        import pandas as pd
+    except ImportError:
+        return None
+    return df if isinstance(df, pd.DataFrame) else None
+
+
+def data_frame(data):
+    """data_df for a script's input: lazy for streamed rows, from columns for a RowStore."""
+    if isinstance(data, NDJSONRows):
+        return LazyFrame(data)
+    if hasattr(data, 'to_frame'):
+        return data.to_frame()
+    import pandas as pd
+    return pd.DataFrame(data)
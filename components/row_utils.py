@@ -0,0 +1,133 @@
+"""
+Row Utilities Component
+Header -> key resolution for converted scripts.
+
+Converted scripts address cells by their Excel header ("Farmer Name", " farmer_name", ...).
+Instead of normalising every key of every row on each lookup, a normalised header index
+is built once per row schema (the ordered tuple of keys) and shared by all rows with
+that schema.
+
+Finding the schema of a plain dict still means reading its keys, so the index last used
+by each thread is remembered together with the row it was used for: the further cells of
+the same row (the usual access pattern) resolve without touching the keys. RowStore rows
+share one index per store, kept on the store and rebuilt only when a column is added.
+"""
+
+import threading
+
+# Bounded so that scripts adding many dynamic output columns cannot grow it forever
+_MAX_SCHEMAS = 256
+
+_index_cache = {}
+_index_lock = threading.Lock()
+_last = threading.local()  # .row, .size, .index: last dict row resolved on this thread
+
+
+def normalize_header(header):
+    """Case/whitespace-insensitive form of a header (used by set_cell_value)."""
+    return str(header).strip().lower()
+
+
+def loose_header(header):
+    """Like normalize_header, but also treats '_' and ' ' as equal (used by get_cell_value)."""
+    return str(header).strip().lower().replace('_', ' ')
+
+
+def _build_index(keys):
+    exact = {}
+    loose = {}
+    for key in keys:
+        exact.setdefault(normalize_header(key), key)
+        loose.setdefault(loose_header(key), key)
+    return exact, loose
+
+
+def _schema_index(schema):
+    index = _index_cache.get(schema)
+    if index is not None:
+        return index
+    index = _build_index(schema)
+    with _index_lock:
+        if len(_index_cache) >= _MAX_SCHEMAS:
+            _index_cache.clear()
+        _index_cache[schema] = index
+    return index
+
+
+def _store_index(store):
+    """Index over every column of a RowStore (columns are only ever added)."""
+    columns = store._columns
+    cached = store._key_index
+    if cached is not None and cached[0] == len(columns):
+        return cached[1]
+    exact = {}
+    loose = {}
+    for key in list(columns):
+        exact.setdefault(normalize_header(key), []).append(key)
+        loose.setdefault(loose_header(key), []).append(key)
+    index = (exact, loose)
+    store._key_index = (len(columns), index)
+    return index
+
+
+def get_key_index(row):
+    """
+    Return (exact_index, loose_index) for the row's schema.
+
+    Both map a normalised header to the FIRST key of the row that produces it,
+    preserving the original "first matching column wins" behaviour.
+
+    Args:
+        row: dict-like row (anything with .keys())
+
+    Returns:
+        tuple(dict, dict)
+    """
+    size = len(row)
+    if getattr(_last, 'row', None) is row and _last.size == size:
+        return _last.index
+    index = _schema_index(tuple(row.keys()))
+    _last.row, _last.size, _last.index = row, size, index
+    return index
+
+
+def find_key(row, header, loose=True):
+    """
+    Resolve a header to the actual key present in the row.
+
+    Args:
+        row: dict-like row
+        header: Header name as written in the script
+        loose: If True, '_' and ' ' are interchangeable
+
+    Returns:
+        Matching key or None
+    """
+    store = getattr(row, 'store', None)
+    if store is not None and hasattr(store, '_key_index'):
+        # RowStore view: store-wide index, first column that this row has a value for
+        exact, loose_index = _store_index(store)
+        candidates = loose_index.get(loose_header(header)) if loose else exact.get(normalize_header(header))
+        for key in candidates or ():
+            if key in row:
+                return key
+        return None
+    exact, loose_index = get_key_index(row)
+    if loose:
+        return loose_index.get(loose_header(header))
+    return exact.get(normalize_header(header))
+
+
+def get_value(row, header, default=""):
+    """Read a cell by header. Returns default if the column does not exist."""
+    key = find_key(row, header)
+    if key is None:
+        return default
+    return row[key]
+
+
+def set_value(row, header, value):
+    """Write a cell by header, reusing an existing column if one matches."""
+    key = find_key(row, header, loose=False)
+    row[header if key is None else key] = value
+    return True
@@ -0,0 +1,273 @@
+"""
+Run Journal Component
+Append-only per-job journal of completed rows so interrupted runs can resume.
+
+Rows are keyed by a hash of their input content plus their position in the uploaded
+file ("<hash>@<upload index>"). The upload index comes from the backend (--row-offset,
+or "rowIndexes" of a --serve work unit), so the key does not depend on how the upload
+was split into chunks/units, and identical rows in different units stay distinct.
+Without indexes (single local run) duplicates are numbered in input order instead.
+Each job id gets one SQLite file under temp_data/journals; several bridge processes
+(warm workers of one job) can write to it at once.
+
+Flow (driven by runner_bridge):
+    journal = run_journal.start(job_id, data, resume=True)   # -> journal.remaining rows
+    (or run_journal.start(job_id, data, indexes=[...]) with upload indexes per row)
+    ... module.run(journal.remaining, ...) ...                # thread_utils records rows as they finish
+    results = journal.finish(results)                         # record + merge skipped rows back in
+
+Crash retries: thread_utils also marks each row as started (mark_item_started) before it
+runs. A work unit retried after its worker died is planned with skip_recorded=True: rows
+that finished keep their journaled result, and rows that were running when the worker
+died are reported as failed instead of being run again (their POST/PUT calls may
+already have gone through).
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections.abc import Mapping
+
+_FAIL_MARKERS = ('fail', 'error')
+INTERRUPTED_MESSAGE = "Worker stopped while this row was running; not retried automatically (it may have been applied)"
+
+
+def row_key(row):
+    """Stable content hash of one input row."""
+    if isinstance(row, Mapping):
+        row = dict(row)
+    raw = json.dumps(row, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def is_success(result):
+    """A journaled row counts as done unless its Status looks like a failure."""
+    if not isinstance(result, Mapping):
+        return result is not None
+    from components import row_utils
+    status = str(row_utils.get_value(result, 'Status', '')).strip().lower()
+    if any(marker in status for marker in _FAIL_MARKERS):
+        return False
+    return 'status: 401' not in str(row_utils.get_value(result, 'API_Response', '')).lower()
+
+
+def journal_dir():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_dir, 'temp_data', 'journals')
+
+
+def _safe_job_id(job_id):
+    safe = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in str(job_id))
+    if len(safe) > 80:
+        safe = safe[:40] + '_' + hashlib.sha1(safe.encode('utf-8')).hexdigest()[:16]
+    return safe
+
+
+class RunJournal:
+    """
+    Args:
+        job_id: Identifier shared by every chunk/re-run of one logical job
+        directory: Where the SQLite file lives (default temp_data/journals)
+    """
+
+    def __init__(self, job_id, directory=None):
+        self.job_id = str(job_id)
+        directory = directory or journal_dir()
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{_safe_job_id(job_id)}.sqlite")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            " row_key TEXT PRIMARY KEY, ok INTEGER NOT NULL, result TEXT, updated_at REAL)"
+        )
+        self._conn.commit()
+
+        self.keys = []          # key per input row (original order)
+        self.remaining = []     # rows still to process
+        self._remaining_keys = []
+        self._skipped = {}      # original index -> journaled result
+        self._keys_by_id = {}   # id(row) -> key, for thread_utils
+        self._store = None      # RowStore serving self.remaining (see use_store)
+        self.recorded = 0
+
+    # --- Planning -------------------------------------------------------------
+
+    def plan(self, rows, resume=False, indexes=None, skip_recorded=False):
+        """
+        Assign keys to the input rows and (on resume) drop the ones already done.
+
+        Args:
+            indexes: Upload index of every row (same length as rows), from the backend
+            skip_recorded: Skip every row the journal has seen, including failed and
+                interrupted ones (retry of a unit whose worker died)
+        """
+        rows = rows if isinstance(rows, list) else list(rows)
+        if indexes is not None:
+            indexes = list(indexes)
+            if len(indexes) != len(rows):
+                raise ValueError(f"{len(indexes)} row indexes for {len(rows)} rows")
+            self.keys = [f"{row_key(row)}@{index}" for row, index in zip(rows, indexes)]
+        else:
+            seen = {}
+            self.keys = []
+            for row in rows:
+                base = row_key(row)
+                n = seen.get(base, 0)
+                seen[base] = n + 1
+                self.keys.append(base if n == 0 else f"{base}#{n}")
+
+        if skip_recorded:
+            done = self.completed(include_failed=True)
+        else:
+            done = self.completed() if resume else {}
+        self.remaining, self._remaining_keys, self._skipped = [], [], {}
+        for index, (row, key) in enumerate(zip(rows, self.keys)):
+            if key in done:
+                result = done[key]
+                if result is None:
+                    # Started but never finished: outcome unknown
+                    result = _interrupted_result(row)
+                self._skipped[index] = result
+            else:
+                self.remaining.append(row)
+                self._remaining_keys.append(key)
+        self._keys_by_id = {id(row): key for row, key in zip(self.remaining, self._remaining_keys)}
+        self._store = None
+        return self.remaining
+
+    def use_store(self, store):
+        """
+        The remaining rows are handed to the script as views of a RowStore (row i of the
+        store = remaining row i). Views are created on every access, so rows are matched
+        to their keys by position in the store instead of by object identity.
+        """
+        if len(store) != len(self._remaining_keys):
+            raise ValueError(f"RowStore has {len(store)} rows for {len(self._remaining_keys)} planned rows")
+        self._store = store
+        self._keys_by_id = {}
+        self.remaining = store  # no second list of views
+
+    def _key_for(self, item):
+        if self._store is not None:
+            if getattr(item, 'store', None) is self._store:
+                return self._remaining_keys[item.index]
+            return None
+        return self._keys_by_id.get(id(item))
+
+    @property
+    def skipped_count(self):
+        return len(self._skipped)
+
+    def completed(self, include_failed=False):
+        """{row_key: result} for rows journaled as successful (or every row seen; None = started only)."""
+        query = "SELECT row_key, result FROM rows" + ("" if include_failed else " WHERE ok = 1")
+        with self._lock:
+            cur = self._conn.execute(query)
+            return {key: (json.loads(result) if result is not None else None) for key, result in cur.fetchall()}
+
+    # --- Recording ------------------------------------------------------------
+
+    def record(self, key, result):
+        """Upsert one row result (latest attempt wins)."""
+        from components import row_store
+        result = row_store.to_plain(result)  # RowStore views are not JSON-serialisable
+        payload = json.dumps(result, default=str, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rows (row_key, ok, result, updated_at) VALUES (?, ?, ?, ?)",
+                (key, 1 if is_success(result) else 0, payload, time.time())
+            )
+            self._conn.commit()
+            self.recorded += 1
+
+    def mark_item_started(self, item):
+        """Note that a row handed out by plan() is about to run (kept if it already has a result)."""
+        key = self._key_for(item)
+        if key is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO rows (row_key, ok, result, updated_at) VALUES (?, 0, NULL, ?)",
+                (key, time.time())
+            )
+            self._conn.commit()
+
+    def record_item(self, item, result):
+        """Record a result for a row object handed out by plan() (no-op for unknown objects)."""
+        key = self._key_for(item)
+        if key is not None:
+            self.record(key, result)
+
+    def finish(self, results):
+        """
+        Record the run's results and merge journaled (skipped) rows back in.
+
+        Returns:
+            Results for the full input, in original order when the script returned one
+            result per processed row. Otherwise results that are input rows (edited in place)
+            are journaled and placed by their key; any others follow, unjournaled (logged).
+        """
+        if not isinstance(results, list):
+            return results
+        if len(results) == len(self._remaining_keys):
+            for key, result in zip(self._remaining_keys, results):
+                self.record(key, result)
+            if not self._skipped:
+                return results
+            merged = []
+            new_results = iter(results)
+            for index in range(len(self.keys)):
+                merged.append(self._skipped[index] if index in self._skipped else next(new_results))
+            return merged
+
+        # Not one result per row: positions say nothing, so only results that are the input
+        # row objects themselves (updated in place) can be matched to their keys
+        position = {key: index for index, key in enumerate(self.keys) if index not in self._skipped}
+        placed, unmatched = {}, []
+        for result in results:
+            key = self._key_for(result)
+            if key is not None and position.get(key) not in placed:
+                self.record(key, result)
+                placed[position[key]] = result
+            else:
+                unmatched.append(result)
+        if unmatched:
+            print(f"⚠️  [JOURNAL] {len(results)} results for {len(self._remaining_keys)} rows: "
+                  f"{len(unmatched)} results could not be matched to an input row and were not journaled", flush=True)
+        # Matched and skipped rows in upload order, then whatever could not be placed
+        ordered = {**self._skipped, **placed}
+        return [ordered[i] for i in sorted(ordered)] + unmatched
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _interrupted_result(row):
+    result = dict(row) if isinstance(row, Mapping) else {}
+    result['Status'] = 'Fail'
+    result['Response'] = INTERRUPTED_MESSAGE
+    return result
+
+
+_active = None
+
+
+def start(job_id, rows, resume=False, indexes=None, skip_recorded=False):
+    """Open the job's journal, plan the rows and make it the active journal."""
+    global _active
+    journal = RunJournal(job_id)
+    journal.plan(rows, resume=resume, indexes=indexes, skip_recorded=skip_recorded)
+    _active = journal
+    return journal
+
+
+def get_active():
+    """The journal of the current bridge run, or None."""
+    return _active
@@ -0,0 +1,202 @@
+"""
+Token Refresh Component
+Keeps the run-wide bearer token (components.auth_context) valid during long jobs.
+
+- Refreshes shortly before the JWT 'exp' (background timer + cheap check before each request)
+- Single-flight refresh after a 401 so the interceptor can retry the row's request once
+- Refresh source is pluggable:
+    1. set_refresh_hook(callable) / System/db.json "token_refresh_hook" = "module:function"
+       (server-side config only: env_config comes from the browser and must not pick a
+       module to import)
+    2. BRIDGE_TOKEN_REFRESH env var set by api.js -> POST to the existing
+       /api/user-aggregate/token endpoint with the refresh token (grant_type=refresh_token)
+
+A hook is called with the current AuthContext and returns the new access token, or a dict
+with 'access_token' (and optionally 'refresh_token').
+"""
+
+import os
+import json
+import threading
+import importlib
+import builtins
+import urllib.request
+
+
+class TokenRefresher:
+    """
+    Args:
+        auth: components.auth_context.AuthContext to keep fresh
+        refresh_hook: callable(auth) -> str | dict
+        margin: Refresh this many seconds before expiry
+        env_config: Optional dict whose 'token' is updated on refresh
+    """
+
+    def __init__(self, auth, refresh_hook, margin=120, env_config=None):
+        self.auth = auth
+        self.refresh_hook = refresh_hook
+        self.margin = margin
+        self.env_config = env_config
+        self.refresh_count = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._old_bearers = set()
+        self._timer = None
+        self._stopped = False
+
+    def start(self):
+        """Schedule the proactive refresh for the current token."""
+        self._schedule()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        if self._timer is not None:
+            self._timer.cancel()
+
+    def _schedule(self):
+        if self._stopped:
+            return
+        remaining = self.auth.seconds_until_expiry()
+        if remaining is None:
+            return
+        delay = max(0.0, remaining - self.margin)
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        self.refresh(self.auth.version, reason="expiry")
+
+    def ensure_fresh(self):
+        """Refresh now if the token is inside the margin (called before each request)."""
+        if self.auth.is_expiring(self.margin):
+            self.refresh(self.auth.version, reason="expiry")
+
+    def refresh(self, seen_version, reason="401"):
+        """
+        Refresh the token unless another thread already did since `seen_version`.
+
+        Returns:
+            True if the token is newer than seen_version afterwards
+        """
+        with self._lock:
+            if self.auth.version != seen_version:
+                return True
+            old_bearer = self.auth.bearer
+            try:
+                result = self.refresh_hook(self.auth)
+            except Exception as e:
+                self.failures += 1
+                print(f"❌ [AUTH] Token refresh failed ({reason}): {e}", flush=True)
+                return False
+
+            if isinstance(result, dict):
+                new_token = result.get('access_token')
+            else:
+                new_token = result
+            if not new_token:
+                self.failures += 1
+                print(f"❌ [AUTH] Token refresh returned no access token ({reason})", flush=True)
+                return False
+
+            self._old_bearers.add(old_bearer)
+            self.auth.update(new_token)
+            builtins.token = self.auth.token
+            if self.env_config is not None:
+                self.env_config['token'] = self.auth.token
+            self.refresh_count += 1
+            print(f"🔄 [AUTH] Token refreshed ({reason}). {self.auth.describe_expiry()}", flush=True)
+
+        self._schedule()
+        return True
+
+    def is_stale(self, value):
+        """True if an Authorization value carries a token this run already replaced."""
+        if not value or value == self.auth.bearer:
+            return False
+        return value in self._old_bearers or f"Bearer {value}" in self._old_bearers
+
+    def fix_headers(self, kwargs, session=None):
+        """
+        Swap a stale Authorization header for the current one, in the request kwargs and
+        in the session defaults. Scripts often build headers from the token they got at start.
+        """
+        if session is not None and self.is_stale(session.headers.get('Authorization')):
+            session.headers['Authorization'] = self.auth.bearer
+        headers = kwargs.get('headers')
+        if headers and self.is_stale(headers.get('Authorization')):
+            headers = dict(headers)
+            headers['Authorization'] = self.auth.bearer
+            kwargs['headers'] = headers
+
+
+_hook = None
+
+
+def set_refresh_hook(hook):
+    """Register a custom refresh hook: hook(auth_context) -> token | {'access_token': ...}."""
+    global _hook
+    _hook = hook
+
+
+def _configured_hook_path():
+    """"module:function" from System/db.json "token_refresh_hook", or None."""
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = os.path.join(base_dir, 'System', 'db.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('token_refresh_hook') or None
+
+
+def _load_hook_path(path):
+    module_name, _, func_name = path.partition(':')
+    module = importlib.import_module(module_name)
+    return getattr(module, func_name)
+
+
+def make_endpoint_hook(config):
+    """
+    Hook that calls the Node /api/user-aggregate/token endpoint with a refresh token.
+
+    Args:
+        config: {'url', 'environment', 'tenant', 'refreshToken'}
+    """
+    state = {'refresh_token': config.get('refreshToken')}
+
+    def hook(auth):
+        body = json.dumps({
+            'environment': config.get('environment'),
+            'tenant': config.get('tenant'),
+            'refreshToken': state['refresh_token'],
+        }).encode('utf-8')
+        # urllib (not requests) so the bridge interceptor is not re-entered
+        req = urllib.request.Request(config['url'], data=body, method='POST',
+                                     headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            data = json.loads(resp.read().decode('utf-8'))
+        if data.get('refresh_token'):
+            state['refresh_token'] = data['refresh_token']
+        return data
+
+    return hook
+
+
+def resolve_hook(env_config):
+    """Pick the refresh hook: registered > db.json hook path > api.js refresh config > None."""
+    if _hook is not None:
+        return _hook
+    if env_config and env_config.get('tokenRefreshHook'):
+        print("⚠️  [AUTH] env_config['tokenRefreshHook'] is ignored; configure \"token_refresh_hook\" in System/db.json", flush=True)
+    path = _configured_hook_path()
+    if path:
+        return _load_hook_path(path)
+    raw = os.environ.get('BRIDGE_TOKEN_REFRESH')
+    if raw:
+        config = json.loads(raw)
+        if config.get('url') and config.get('refreshToken'):
+            return make_endpoint_hook(config)
+    return None
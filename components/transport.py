@@ -0,0 +1,328 @@
+"""
+Transport Component
+Pluggable HTTP transport underneath `requests` for the farm API gateway.
+
+Scripts, _log_req, master_search and the bridge interceptor all keep calling `requests`;
+only the last hop changes. With the 'http2' transport, requests to the gateway host are
+sent by a `requests` transport adapter backed by one shared httpx.Client(http2=True), so
+25+ worker threads multiplex over a few TLS connections instead of opening one each.
+requests.Session.request (and therefore the bridge interceptor) runs exactly as before.
+Cookies stay with the requests Session: the shared client keeps none, and Set-Cookie
+headers of HTTP/2 responses are extracted into response.cookies / the Session jar.
+
+Selection (first match wins):
+    env_config['httpTransport']                         - 'requests' (default) | 'http2'
+    System/db.json 'environment_http_transport'          - {"QA1": "http2", ...} per environment
+
+Requires the optional dependency: pip install "httpx[http2]". Without it the run falls
+back to plain requests with a warning.
+
+Wire encoding (encode_body, applied by the bridge interceptor to every request):
+    - json= payloads are sent compact (no whitespace after ',' / ':')
+    - Accept-Encoding explicitly offers gzip/deflate, plus br when a brotli decoder is installed
+    - optional gzip of request bodies above a size threshold, only for endpoints listed in
+      env_config['gzipRequestPaths'] (path prefixes known to accept Content-Encoding: gzip)
+
+URL rewrites (rewrite_url): env_config['urlRewrites'] maps URL prefixes to replacements,
+e.g. {"https://maps.googleapis.com": "http://127.0.0.1:8899/google"}, to send hard-coded
+third-party calls to Manager/mock_farm_server.py during load tests.
+"""
+
+import gzip
+import http.cookiejar
+import json
+import threading
+import urllib.parse
+
+TRANSPORTS = ('requests', 'http2')
+GZIP_MIN_BYTES = 32 * 1024
+
+# Connection-specific headers (RFC 9113 8.2.2): h2 refuses to send them. requests adds
+# 'Connection: keep-alive' to every request by default.
+HOP_BY_HOP_HEADERS = ('connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade')
+
+
+def _brotli_available():
+    for name in ('brotli', 'brotlicffi'):
+        try:
+            __import__(name)
+            return True
+        except ImportError:
+            continue
+    return False
+
+
+ACCEPT_ENCODING = "gzip, deflate, br" if _brotli_available() else "gzip, deflate"
+
+_installed = None
+_lock = threading.Lock()
+
+
+def resolve_name(env_config, db_config=None):
+    """Transport name for this run."""
+    name = (env_config or {}).get('httpTransport')
+    if not name and db_config:
+        per_env = db_config.get('environment_http_transport') or {}
+        environment = str((env_config or {}).get('environment', '')).lower()
+        for key, value in per_env.items():
+            if key.lower() == environment:
+                name = value
+                break
+    name = str(name or 'requests').lower()
+    return name if name in TRANSPORTS else 'requests'
+
+
+def _to_httpx_timeout(httpx, timeout):
+    if timeout is None:
+        return httpx.Timeout(None)
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+class _RawHeaders:
+    """Header access http.cookiejar expects from a response (urllib3's `_original_response.msg`)."""
+
+    def __init__(self, items):
+        self._items = items
+
+    def get_all(self, name, default=None):
+        name = name.lower()
+        values = [value for key, value in self._items if key.lower() == name]
+        return values or default
+
+    getheaders = get_all
+
+
+class _RawResponse:
+    """
+    Stands in for the urllib3 response behind requests.Response.raw on the HTTP/2 path, so
+    requests' cookie handling (response.cookies, Session cookie jar) sees Set-Cookie headers.
+    The body is already read (response._content); there is nothing left to stream.
+    """
+
+    def __init__(self, items):
+        self._original_response = type('_Original', (), {'msg': _RawHeaders(items)})()
+
+    def read(self, *args, **kwargs):
+        return b''
+
+    def close(self):
+        pass
+
+
+def _no_cookie_jar():
+    # The shared client serves every Session of the run: it must not keep cookies of its own
+    # (the requests Session in front of it owns them and sends them in the Cookie header)
+    return http.cookiejar.CookieJar(policy=http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+
+
+def _make_adapter_class():
+    import httpx
+    import requests
+    from requests.adapters import BaseAdapter, HTTPAdapter
+    from requests.cookies import extract_cookies_to_jar
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers, select_proxy
+
+    def _http2_headers(headers):
+        out = {}
+        for key, value in headers.items():
+            name = key.lower()
+            if name in HOP_BY_HOP_HEADERS:
+                continue
+            if name == 'te' and value.strip().lower() != 'trailers':
+                continue
+            out[key] = value
+        return out
+
+    class HTTP2Adapter(BaseAdapter):
+        """requests transport adapter that sends through a shared HTTP/2 httpx client."""
+
+        def __init__(self, max_connections=20):
+            super().__init__()
+            self.client = httpx.Client(
+                http2=True,
+                follow_redirects=False,   # requests.Session handles redirects
+                limits=httpx.Limits(max_connections=max_connections),
+                cookies=_no_cookie_jar(),
+            )
+            # Requests the shared client cannot honour (custom CA bundle / verify=False, client
+            # certificates, proxies) go through the regular requests adapter instead
+            self.fallback = HTTPAdapter()
+
+        def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+            if verify is not True or cert or select_proxy(request.url, proxies or {}):
+                return self.fallback.send(request, stream=stream, timeout=timeout, verify=verify,
+                                          cert=cert, proxies=proxies)
+            try:
+                resp = self.client.request(
+                    request.method,
+                    request.url,
+                    headers=_http2_headers(request.headers),
+                    content=request.body,
+                    timeout=_to_httpx_timeout(httpx, timeout),
+                )
+            except httpx.ConnectTimeout as e:
+                raise requests.exceptions.ConnectTimeout(e, request=request)
+            except httpx.TimeoutException as e:
+                raise requests.exceptions.ReadTimeout(e, request=request)
+            except httpx.TransportError as e:
+                raise requests.exceptions.ConnectionError(e, request=request)
+
+            response = requests.Response()
+            response.status_code = resp.status_code
+            response.reason = resp.reason_phrase
+            # httpx already decoded the body; drop the encoding header so nothing decodes twice
+            headers = CaseInsensitiveDict(resp.headers)
+            headers.pop('Content-Encoding', None)
+            headers['Content-Length'] = str(len(resp.content))
+            response.headers = headers
+            response._content = resp.content
+            response._content_consumed = True
+            response.encoding = get_encoding_from_headers(response.headers)
+            response.url = request.url
+            response.request = request
+            response.connection = self
+            # Set-Cookie -> response.cookies here, and into the Session jar by Session.send
+            response.raw = _RawResponse(resp.headers.multi_items())
+            extract_cookies_to_jar(response.cookies, request, response.raw)
+            return response
+
+        def close(self):
+            # Shared across sessions: requests.request() closes its throwaway Session after every
+            # call, which must not tear down the multiplexed connection.
+            pass
+
+        def shutdown(self):
+            self.client.close()
+            self.fallback.close()
+
+    return HTTP2Adapter
+
+
+def install(name, hosts):
+    """
+    Route requests to `hosts` through the selected transport.
+
+    Args:
+        name: 'requests' | 'http2'
+        hosts: Hostnames (e.g. the gateway from env_config['apiBaseUrl'])
+
+    Returns:
+        The transport actually installed ('requests' if http2 is unavailable).
+    """
+    global _installed
+    if name != 'http2' or not hosts:
+        return 'requests'
+    try:
+        adapter_class = _make_adapter_class()
+        import h2  # noqa: F401 - httpx needs it for http2=True
+    except ImportError as e:
+        print(f"⚠️  [TRANSPORT] HTTP/2 requested but unavailable ({e}); install 'httpx[http2]'. Using requests.", flush=True)
+        return 'requests'
+
+    import requests
+
+    with _lock:
+        if _installed is not None:
+            return 'http2'
+        adapter = adapter_class()
+        host_set = {h.lower() for h in hosts}
+        original_get_adapter = requests.Session.get_adapter
+
+        def get_adapter(self, url):
+            if url.lower().startswith('https://'):
+                host = (urllib.parse.urlsplit(url).hostname or '').lower()
+                if host in host_set:
+                    return adapter
+            return original_get_adapter(self, url)
+
+        requests.Session.get_adapter = get_adapter
+        _installed = adapter
+
+    print(f"⚡ [TRANSPORT] HTTP/2 multiplexing enabled for: {', '.join(sorted(host_set))}", flush=True)
+    return 'http2'
+
+
+def hosts_from_env(env_config):
+    """Gateway hostnames from the env_config base URL keys."""
+    hosts = set()
+    for key in ('apiBaseUrl', 'apiurl', 'base_url'):
+        url = (env_config or {}).get(key)
+        if url:
+            host = urllib.parse.urlsplit(url).hostname
+            if host:
+                hosts.add(host)
+    return hosts
+
+
+def shutdown():
+    """Close the shared HTTP/2 client (end of run)."""
+    if _installed is not None:
+        try:
+            _installed.shutdown()
+        except Exception:
+            pass
+
+
+def rewrite_url(url, rewrites):
+    """Apply the first matching prefix rewrite ({prefix: replacement}) to url."""
+    if rewrites and isinstance(url, str):
+        for prefix, replacement in rewrites.items():
+            if url.startswith(prefix):
+                return replacement + url[len(prefix):]
+    return url
+
+
+def compact_dumps(obj):
+    """JSON bytes without insignificant whitespace (same escaping/NaN rules as requests' json=)."""
+    return json.dumps(obj, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+
+def _header(headers, name):
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return key, value
+    return None, None
+
+
+def encode_body(url, kwargs, gzip_paths=None, gzip_min_bytes=GZIP_MIN_BYTES):
+    """
+    Rewrite request kwargs in place for fewer bytes on the wire.
+
+    Args:
+        url: Request URL (matched against gzip_paths)
+        kwargs: requests keyword arguments
+        gzip_paths: Path prefixes whose endpoints accept gzip request bodies
+                    (True = every endpoint, falsy = never)
+        gzip_min_bytes: Only gzip bodies at least this large
+
+    Returns:
+        Number of body bytes saved (0 if nothing changed).
+    """
+    headers = dict(kwargs.get('headers') or {})
+    if _header(headers, 'Accept-Encoding')[0] is None:
+        headers['Accept-Encoding'] = ACCEPT_ENCODING
+    kwargs['headers'] = headers
+
+    if kwargs.get('json') is None or kwargs.get('data') is not None or kwargs.get('files'):
+        return 0
+
+    body = compact_dumps(kwargs['json'])
+    del kwargs['json']
+    if _header(headers, 'Content-Type')[0] is None:
+        headers['Content-Type'] = 'application/json'
+
+    saved = 0
+    if gzip_paths and len(body) >= gzip_min_bytes and _header(headers, 'Content-Encoding')[0] is None:
+        path = urllib.parse.urlsplit(url).path
+        if gzip_paths is True or any(path.startswith(prefix) for prefix in gzip_paths):
+            compressed = gzip.compress(body, compresslevel=6)
+            if len(compressed) < len(body):
+                saved = len(body) - len(compressed)
+                body = compressed
+                headers['Content-Encoding'] = 'gzip'
+    kwargs['data'] = body
+    return saved
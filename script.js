@@ -11,11 +11,15 @@
 
 // State
 let authToken = null;
+let authRefreshToken = null;
 let currentEnvironment = null;
 let currentTenant = null;
 let selectedDataType = null;
 let uploadedData = [];
 let executionResults = [];
+let executionJobId = null; // Server-side job of the last run (download is exported from it)
+let executionJobKey = null; // Its access key (returned on submit, required by every job endpoint)
+const JOB_STORAGE_KEY = 'bulkExecutionJob'; // { jobId, jobKey, dataType, startFrom, total } of the running job
 let savedLocations = [];
 let ENVIRONMENT_API_URLS = {};
 let ENVIRONMENT_URLS = {};
@@ -99,6 +103,7 @@ function resetState(keepLoginVisible = false) {
     // DO NOT CLEAR AUTH TOKEN IF REQUESTED
     if (!keepLoginVisible) {
         authToken = null;
+        authRefreshToken = null;
         currentEnvironment = null;
         currentTenant = null;
     }
@@ -156,6 +161,7 @@ function resetState(keepLoginVisible = false) {
 // Full Logout
 function fullLogout() {
     authToken = null;
+    authRefreshToken = null;
     currentEnvironment = null;
     currentTenant = null;
 
@@ -220,6 +226,7 @@ const elements = {
     failCount: document.getElementById('fail-count'),
     executionTime: document.getElementById('execution-time'),
     downloadResultsBtn: document.getElementById('download-results-btn'),
+    cancelJobBtn: document.getElementById('cancel-job-btn'),
     resultsTbody: document.getElementById('results-tbody'),
     // Boundary elements
     boundaryConfig: document.getElementById('boundary-config'),
@@ -248,6 +255,7 @@ const elements = {
     additionalAttributesSection: document.getElementById('additional-attributes-section'),
     additionalAttributesInputContainer: document.getElementById('additional-attributes-input-container'),
     startRowInput: document.getElementById('start-row-input'),
+    resumeJournalInput: document.getElementById('resume-journal-input'),
     additionalAttributesInput: document.getElementById('additional-attributes-input'),
     gdprSection: document.getElementById('gdpr-section'),
     isGdprTenant: document.getElementById('is-gdpr-tenant'),
@@ -1193,9 +1201,32 @@ function processFile(file) {
 
 
 
-elements.downloadResultsBtn.addEventListener('click', () => {
+elements.downloadResultsBtn.addEventListener('click', async () => {
     if (executionResults.length === 0) return alert('No results to download');
 
+    const fileName = `Results_${selectedDataType}_${new Date().toISOString().slice(0, 10)}.xlsx`;
+
+    // Job runs: the server streams the workbook from the job's results file
+    // (outputConfig.uiMapping column order), so large runs do not freeze the page
+    if (executionJobId) {
+        try {
+            const executor = new ScriptExecutorV2({});
+            const blob = await executor.downloadJobResults(executionJobId, executionJobKey, 'xlsx');
+            const url = URL.createObjectURL(blob);
+            const link = document.createElement('a');
+            link.href = url;
+            link.download = fileName;
+            document.body.appendChild(link);
+            link.click();
+            link.remove();
+            setTimeout(() => URL.revokeObjectURL(url), 1000);
+            return;
+        } catch (e) {
+            // e.g. the job was cleaned up on the server: build the file from the rows in the page
+            console.warn('[Download] Server export failed, exporting in the browser:', e.message);
+        }
+    }
+
     let ws;
     // Check if Dynamic UI is enabled
     const template = TEMPLATES[selectedDataType];
@@ -1248,7 +1279,6 @@ elements.downloadResultsBtn.addEventListener('click', () => {
     const wb = XLSX.utils.book_new();
     XLSX.utils.book_append_sheet(wb, ws, 'Results');
 
-    const fileName = `Results_${selectedDataType}_${new Date().toISOString().slice(0, 10)}.xlsx`;
     XLSX.writeFile(wb, fileName);
 });
 
@@ -1294,6 +1324,13 @@ function startExecution(buttonText = '⏳ Processing...') {
     elements.failCount.textContent = '0';
     elements.executionTime.textContent = '0.0s';
     executionResults = [];
+    executionJobId = null;
+    executionJobKey = null;
+    if (elements.cancelJobBtn) {
+        elements.cancelJobBtn.classList.add('hidden');
+        elements.cancelJobBtn.disabled = false;
+        elements.cancelJobBtn.textContent = '⏹ Stop Execution';
+    }
     lastRenderedIndex = 0; // Reset progressive rendering tracker
 
     // Start live timer update
@@ -1328,11 +1365,132 @@ function completeExecution() {
 
     // Update button and show download
     elements.executeBtn.textContent = '✅ Completed';
+    if (elements.cancelJobBtn) elements.cancelJobBtn.classList.add('hidden');
     elements.downloadResultsBtn.classList.remove('hidden');
 
     console.log(`Execution completed in ${formatDuration(totalTime)}`);
 }
 
+// =============================================
+// SERVER-SIDE JOB TRACKING
+// =============================================
+// The job id and key are kept in localStorage while the job runs, so a browser refresh
+// reconnects to it (polling resumes, results and download stay reachable).
+
+function rememberExecutionJob(entry) {
+    try {
+        localStorage.setItem(JOB_STORAGE_KEY, JSON.stringify(entry));
+    } catch (e) {
+        console.warn('[Job] Could not store the running job:', e.message);
+    }
+}
+
+function forgetExecutionJob() {
+    try {
+        localStorage.removeItem(JOB_STORAGE_KEY);
+    } catch (e) { /* storage unavailable */ }
+}
+
+function storedExecutionJob() {
+    try {
+        const entry = JSON.parse(localStorage.getItem(JOB_STORAGE_KEY) || 'null');
+        return entry && entry.jobId && entry.jobKey ? entry : null;
+    } catch (e) {
+        return null;
+    }
+}
+
+// Poll a job to its end, rendering rows as they finish. Throws on 'unauthorized' / 'failed'.
+async function followExecutionJob(executor, jobId, jobKey, startFrom, total) {
+    const rowTemplate = TEMPLATES[selectedDataType];
+    let pass = 0;
+    let fail = 0;
+    let finalStatus;
+    try {
+        ({ status: finalStatus } = await executor.waitForJob(jobId, jobKey, (status, newRows) => {
+            if (newRows.length > 0) {
+                executionResults = executionResults.concat(newRows);
+                const chunkPass = newRows.filter(r => evaluateRowStatus(r, rowTemplate).isPass).length;
+                pass += chunkPass;
+                fail += newRows.length - chunkPass;
+                renderExecutionResults();
+            }
+            updateProgress((startFrom - 1) + status.processedRows, total || status.totalRows, pass, fail);
+        }));
+    } catch (e) {
+        // A network error (TypeError from fetch) may be temporary: keep the job for the next page load.
+        // Anything else (job expired, key rejected) means it cannot be reached again.
+        if (!(e instanceof TypeError)) forgetExecutionJob();
+        throw e;
+    }
+    forgetExecutionJob();
+
+    console.log(`[Execute] Job ${jobId} ${finalStatus.status}:`, finalStatus.units);
+    if (finalStatus.status === 'unauthorized') {
+        const err = new Error('Session Expired');
+        err.status = 401;
+        err.finishedRows = finalStatus.processedRows;
+        err.totalRows = finalStatus.totalRows;
+        throw err;
+    }
+    if (finalStatus.status === 'failed') {
+        throw new Error(finalStatus.errors.join('; ') || 'Job failed');
+    }
+    if (finalStatus.status === 'cancelled' || finalStatus.status === 'expired') {
+        // Rows in flight were allowed to finish; nothing after them was started
+        alert(`⏹ Execution stopped (${finalStatus.cancelReason || finalStatus.status}).\n\n${finalStatus.processedRows} of ${finalStatus.totalRows} rows finished; their results are shown below.`);
+    }
+}
+
+function reportExecutionError(error) {
+    if (error.status === 401) {
+        // Rows finish out of order across workers, so there is no single row to restart from:
+        // the run journal knows exactly which rows went through
+        alert(`🛑 Session Expired\n\n${error.finishedRows} of ${error.totalRows} rows finished before the session expired.\nPlease re-login and re-run the same file with "Skip rows already completed" ticked; only the rows that did not go through will run.`);
+    } else {
+        alert('Execution Interrupted: ' + error.message);
+    }
+}
+
+// Reconnect to a job that was running when the page was refreshed
+async function resumeExecutionJob() {
+    const entry = storedExecutionJob();
+    if (!entry || typeof ScriptExecutorV2 === 'undefined') return;
+
+    console.log(`[Job] Reconnecting to job ${entry.jobId}`);
+    if (entry.dataType) selectedDataType = entry.dataType;
+    startExecution('⏳ Reconnecting...');
+    executionJobId = entry.jobId;
+    executionJobKey = entry.jobKey;
+    if (elements.cancelJobBtn) elements.cancelJobBtn.classList.remove('hidden');
+
+    try {
+        const executor = new ScriptExecutorV2({});
+        await followExecutionJob(executor, entry.jobId, entry.jobKey, entry.startFrom || 1, entry.total);
+    } catch (error) {
+        console.error('[Job] Reconnect failed:', error);
+        reportExecutionError(error);
+    } finally {
+        completeExecution();
+    }
+}
+
+if (elements.cancelJobBtn) {
+    elements.cancelJobBtn.addEventListener('click', async () => {
+        if (!executionJobId) return;
+        if (!confirm('Stop this execution? Rows already running will finish; no new rows will start.')) return;
+        elements.cancelJobBtn.disabled = true;
+        try {
+            const executor = new ScriptExecutorV2({});
+            await executor.cancelJob(executionJobId, executionJobKey);
+            elements.cancelJobBtn.textContent = '⏳ Stopping...';
+        } catch (e) {
+            alert('Could not stop the execution: ' + e.message);
+            elements.cancelJobBtn.disabled = false;
+        }
+    });
+}
+
 // Sleep utility
 function sleep(ms) {
     return new Promise(resolve => setTimeout(resolve, ms));
@@ -1616,6 +1774,7 @@ document.addEventListener('DOMContentLoaded', () => {
             apiEndpoint: '/api/user-aggregate/token', // Standard endpoint
             onLoginSuccess: (token, userDetails) => {
                 authToken = token;
+                authRefreshToken = userDetails.refreshToken || null;
                 currentEnvironment = userDetails.environment;
                 currentTenant = userDetails.tenant;
 
@@ -1646,6 +1805,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // Logout Hook
 
+    // A job started before a refresh keeps running on the server: reconnect to it
+    resumeExecutionJob();
 });
 
 
@@ -1699,9 +1860,7 @@ if (elements.executeBtn) {
                 // 2. Start Execution
                 const stats = startExecution();
                 const total = rows.length; // Keep global total for progress reporting
-                let processed = startFrom - 1;
-                let pass = 0;
-                let fail = 0;
+                const processed = startFrom - 1;
 
                 // [PROCESSING OPTIONS LOGIC] - DRIVEN BY TEMPLATE
                 const template = TEMPLATES[selectedDataType] || {};
@@ -1739,7 +1898,12 @@ if (elements.executeBtn) {
                     additionalAttributes: (elements.enableAdditionalAttributes && elements.enableAdditionalAttributes.checked)
                         ? (elements.additionalAttributesInput && elements.additionalAttributesInput.value ? elements.additionalAttributesInput.value.split(',').map(s => s.trim()).filter(k => k) : [])
                         : [],
-                    batchSize: batchSize
+                    batchSize: batchSize,
+                    // Run journal: same script + file + tenant = same job, so an interrupted run can resume
+                    jobId: `${template.filename || selectedDataType}__${file.name}__${rows.length}__${currentTenant || 'na'}`,
+                    resume: elements.resumeJournalInput ? elements.resumeJournalInput.checked : false,
+                    // Upload index of the first row sent: journal keys follow positions in the file
+                    rowOffset: startFrom - 1
                 };
 
                 try {
@@ -1769,156 +1933,22 @@ if (elements.executeBtn) {
                         }
                     }
 
-                    // [GROUPING & BATCHING LOGIC]
-                    // 1. Pre-process rows into "Execution Units".
-                    //    - If Grouping: One Unit = Array of rows belonging to one key.
-                    //    - If No Grouping: One Unit = Single Row.
-
-                    let executionUnits = [];
-                    const groupByCol = template.groupByColumn;
-
-                    if (groupByCol && groupByCol.trim()) {
-                        console.log(`[Execute] Grouping by column: '${groupByCol}'`);
-
-                        // Group rows efficiently
-                        const groups = new Map();
-                        rowsToProcess.forEach(row => {
-                            const key = row[groupByCol] || 'UNK';
-                            if (!groups.has(key)) groups.set(key, []);
-                            groups.get(key).push(row);
-                        });
-
-                        // Convert Map values to Units (Array of Arrays)
-                        executionUnits = Array.from(groups.values());
-                        console.log(`[Execute] Formed ${executionUnits.length} Groups from ${rowsToProcess.length} Rows.`);
-
-                    } else {
-                        // No grouping, each row is a unit
-                        executionUnits = rowsToProcess;
-                    }
-
-                    // 2. Form Batches from Units
-                    // We must NOT split a Unit across batches.
-                    // However, if a single Unit is larger than batchSize, it must stand alone in a batch (or overflow).
-
-                    const batches = [];
-                    let currentBatch = [];
-                    let currentBatchSize = 0;
-
-                    for (const unit of executionUnits) {
-                        const unitRows = Array.isArray(unit) ? unit : [unit];
-                        const unitSize = unitRows.length;
-
-                        // If adding this unit exceeds batchSize AND we already have data, push current batch
-                        if (currentBatchSize + unitSize > batchSize && currentBatchSize > 0) {
-                            batches.push(currentBatch);
-                            currentBatch = [];
-                            currentBatchSize = 0;
-                        }
-
-                        // Add unit to current batch
-                        currentBatch = currentBatch.concat(unitRows);
-                        currentBatchSize += unitSize;
-                    }
-                    if (currentBatch.length > 0) batches.push(currentBatch);
-
-                    console.log(`[Execute] Prepared ${batches.length} Batches for execution.`);
-
-                    // 3. Process Batches
-                    if (isParallel) {
-                        console.log(`[Execute] RUNNING IN PARALLEL MODE (Concurrency: 5)`);
-                        
-                        // Limit concurrency to 5 even in parallel mode to be gateway-friendly
-                        const concurrencyLimit = 5;
-                        for (let i = 0; i < batches.length; i += concurrencyLimit) {
-                            const currentBatchSet = batches.slice(i, i + concurrencyLimit);
-                            console.log(`[Execute] Parallel Set: ${i / concurrencyLimit + 1}`);
-                            
-                            const promises = currentBatchSet.map(async (chunk, index) => {
-                                let chunkResults = [];
-                                const executor = new ScriptExecutorV2({ apiBaseUrl: apiBaseUrl, debug: true });
-                                chunkResults = await executor.execute(scriptFilename, chunk, authToken, config, config.boundary);
-                                
-                                // Accumulate Results
-                                executionResults = executionResults.concat(chunkResults);
-                                
-                                // Update Stats
-                                const template = TEMPLATES[selectedDataType];
-                                const chunkPass = chunkResults.filter(r => evaluateRowStatus(r, template).isPass).length;
-                                const chunkFail = chunkResults.length - chunkPass;
-                                
-                                pass += chunkPass;
-                                fail += chunkFail;
-                                processed += chunk.length;
-                                
-                                updateProgress(processed, total, pass, fail);
-                                return chunkResults;
-                            });
-                            
-                            await Promise.all(promises);
-                            renderExecutionResults();
-                            await new Promise(r => setTimeout(r, 100)); // Brief breath
-                        }
-                    } else {
-                        // SEQUENTIAL MODE (Standard)
-                        for (let i = 0; i < batches.length; i++) {
-                            const chunk = batches[i];
-                            console.log(`[Execute] Sequential Batch ${i + 1}/${batches.length} (${chunk.length} rows)`);
-
-                            let chunkResults = [];
-                            if (useV2) {
-                                const executor = new ScriptExecutorV2({ apiBaseUrl: apiBaseUrl, debug: true });
-                                chunkResults = await executor.execute(scriptFilename, chunk, authToken, config, config.boundary);
-                            } else {
-                                const response = await fetch('/api/scripts/execute', {
-                                    method: 'POST',
-                                    headers: { 'Content-Type': 'application/json' },
-                                    body: JSON.stringify({
-                                        scriptName: scriptFilename,
-                                        rows: chunk,
-                                        token: authToken,
-                                        envConfig: config
-                                    })
-                                });
-
-                                if (!response.ok) {
-                                    if (response.status === 401) {
-                                        const err = new Error('Session Expired');
-                                        err.status = 401;
-                                        err.lastSuccessfulRow = processed;
-                                        throw err;
-                                    }
-                                    const err = await response.json();
-                                    chunkResults = chunk.map(r => ({ ...r, status: 'Error', response: err.error || 'Batch failed' }));
-                                } else {
-                                    chunkResults = await response.json();
-                                }
-                            }
-
-                            executionResults = executionResults.concat(chunkResults);
-                            const template = TEMPLATES[selectedDataType];
-                            const chunkPass = chunkResults.filter(r => evaluateRowStatus(r, template).isPass).length;
-                            const chunkFail = chunkResults.length - chunkPass;
-
-                            pass += chunkPass;
-                            fail += chunkFail;
-                            processed += chunk.length;
-
-                            renderExecutionResults();
-                            updateProgress(processed, total, pass, fail);
-                            await new Promise(r => setTimeout(r, 50));
-                        }
-                    }
-
-
+                    // [SERVER-SIDE JOB]
+                    // The backend plans the work (groupByColumn groups, batchSize-sized units adapted to
+                    // observed latency) and runs it on warm workers (backend/jobs.js, backend/scheduler.js).
+                    // The page submits the upload once and only polls for finished rows.
+                    const executor = new ScriptExecutorV2({ apiBaseUrl: apiBaseUrl, debug: true, refreshToken: authRefreshToken });
+                    const job = await executor.submitJob(scriptFilename, rowsToProcess, authToken, config, config.boundary);
+                    executionJobId = job.id;
+                    executionJobKey = job.jobKey;
+                    if (elements.cancelJobBtn) elements.cancelJobBtn.classList.remove('hidden');
+                    console.log(`[Execute] Job ${job.id} queued (${totalToProcess} rows, position ${job.queuePosition || 0})`);
+
+                    rememberExecutionJob({ jobId: job.id, jobKey: job.jobKey, dataType: selectedDataType, startFrom, total });
+                    await followExecutionJob(executor, job.id, job.jobKey, startFrom, total);
                 } catch (error) {
                     console.error('Execution Critical Failure:', error);
-                    if (error.status === 401) {
-                        const resumeRow = (error.lastSuccessfulRow || processed) + 1;
-                        alert(`🛑 Session Expired\n\nExecution stopped at row ${processed}. \nPlease re-login and resume by setting "Start from Row" to ${resumeRow}.`);
-                    } else {
-                        alert('Execution Interrupted: ' + error.message);
-                    }
+                    reportExecutionError(error);
                 } finally {
                     completeExecution();
                 }
@@ -0,0 +1,111 @@
+// backend/bridge_output.js: stdout framing across chunk boundaries (node --test)
+const test = require('node:test');
+const assert = require('node:assert');
+const { BridgeOutputParser, LogRing } = require('../backend/bridge_output');
+
+const collect = (options = {}) => {
+    const results = [];
+    const rows = [];
+    const parser = new BridgeOutputParser({
+        echo: false,
+        onResult: (result, info) => results.push({ result, info }),
+        onRow: (row) => rows.push(row),
+        ...options
+    });
+    return { parser, results, rows };
+};
+
+// Feed text in pieces of `size` bytes so lines and markers are cut mid-way
+const feedInPieces = (parser, text, size) => {
+    const buffer = Buffer.from(text, 'utf8');
+    for (let i = 0; i < buffer.length; i += size) parser.feed(buffer.subarray(i, i + size));
+    parser.end();
+};
+
+const framedOutput = [
+    'starting run',
+    '---RESULTS_START---',
+    JSON.stringify({ Name: 'Ärzte Farm', Status: 'Pass' }),
+    JSON.stringify({ Name: 'two', Status: 'Fail' }),
+    '---JSON_START---',
+    JSON.stringify({ status: 'success', data: null, metrics: { rows: 2 } }),
+    'after'
+].join('\n') + '\n';
+
+test('framed rows are reassembled into result.data whatever the chunking', () => {
+    for (const size of [1, 3, 7, 64, 4096]) {
+        const { parser, results, rows } = collect();
+        feedInPieces(parser, framedOutput, size);
+        assert.strictEqual(results.length, 1, `chunk size ${size}`);
+        const { result, info } = results[0];
+        assert.deepStrictEqual(result.data.map(row => row.Name), ['Ärzte Farm', 'two']);
+        assert.strictEqual(info.unauthorized, false);
+        assert.strictEqual(rows.length, 2);
+        assert.deepStrictEqual(parser.logText().split('\n'), ['starting run', 'after']);
+    }
+});
+
+test('a 401 in a framed row marks the result unauthorized', () => {
+    const { parser, results } = collect();
+    parser.feed(Buffer.from([
+        '---RESULTS_START---',
+        JSON.stringify({ Response: 'Status: 401 Unauthorized' }),
+        '---JSON_START---',
+        JSON.stringify({ status: 'success', data: null }),
+        ''
+    ].join('\n')));
+    assert.strictEqual(results[0].info.unauthorized, true);
+});
+
+test('unframed results are scanned for 401s too', () => {
+    const { parser, results } = collect();
+    parser.feed(Buffer.from('---JSON_START---\n' + JSON.stringify({ data: [{ response: 'Status: 401' }] }) + '\n'));
+    assert.strictEqual(results[0].info.unauthorized, true);
+});
+
+test('the output data dump is skipped, not logged', () => {
+    const { parser } = collect();
+    feedInPieces(parser, 'before\n[OUTPUT_DATA_DUMP]\n[' + 'x'.repeat(10000) + ']\n[/OUTPUT_DATA_DUMP]\nafter\n', 5);
+    const log = parser.logText();
+    assert.ok(!log.includes('xxxx'));
+    assert.match(log, /\[OUTPUT_DATA_DUMP\] \d+ bytes \(not kept\)/);
+    assert.ok(log.endsWith('after'));
+});
+
+test('one parser serves several units and recovers from a bad result line', () => {
+    const { parser, results } = collect();
+    parser.feed(Buffer.from('---JSON_START---\n{not json\n'));
+    parser.feed(Buffer.from('---RESULTS_START---\n{"id":1}\n---JSON_START---\n{"data":null}\n'));
+    assert.strictEqual(results.length, 2);
+    assert.strictEqual(results[0].result, null);
+    assert.match(results[0].info.error, /Parse Error/);
+    assert.deepStrictEqual(results[1].result.data, [{ id: 1 }]);
+    assert.strictEqual(parser.results, 1);
+});
+
+test('a last line without a newline is handled on end()', () => {
+    const { parser, results } = collect();
+    parser.feed(Buffer.from('---JSON_START---\n{"status":"success","data":[]}'));
+    assert.strictEqual(results.length, 0);
+    parser.end();
+    assert.strictEqual(results.length, 1);
+});
+
+test('long log lines are truncated, frames are kept whole', () => {
+    const { parser, results } = collect();
+    const big = 'y'.repeat(40 * 1024);
+    feedInPieces(parser, `${big}\n---RESULTS_START---\n{"v":"${big}"}\n---JSON_START---\n{"data":null}\n`, 1000);
+    const log = parser.logText();
+    assert.ok(log.endsWith('[... line truncated]'));
+    assert.ok(log.length < big.length);
+    assert.strictEqual(results[0].result.data[0].v.length, big.length);
+});
+
+test('LogRing keeps only the most recent bytes', () => {
+    const ring = new LogRing(50);
+    for (let i = 0; i < 20; i++) ring.push(`line ${i}`);
+    const text = ring.text();
+    assert.match(text, /^\[\.\.\. \d+ earlier lines dropped \.\.\.\]/);
+    assert.ok(text.endsWith('line 19'));
+    assert.ok(!text.includes('line 0\n'));
+});
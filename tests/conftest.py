@@ -0,0 +1,9 @@
+"""Shared pytest setup: make `components` and the converted-script helpers importable."""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "Converted Scripts")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,117 @@
+// backend/scheduler.js: atoms, work stealing and unit retries (node --test)
+const test = require('node:test');
+const assert = require('node:assert');
+const { ChunkScheduler, buildAtoms } = require('../backend/scheduler');
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+const rowsOf = (n) => Array.from({ length: n }, (_, i) => ({ id: i }));
+
+// Fake warm worker: records units, optional per-lane delay / crash behaviour
+const fakeWorkers = ({ delay = () => 0, crash = () => false } = {}) => {
+    const calls = [];
+    const startWorker = (lane) => {
+        const worker = {
+            lane,
+            dead: false,
+            closed: false,
+            async run(rows, options) {
+                calls.push({ lane, rows, retry: options.retry });
+                await sleep(delay(lane, rows));
+                if (crash(lane, rows, options)) {
+                    worker.dead = true;
+                    return { kind: 'failed' };
+                }
+                return { kind: 'success', rows };
+            },
+            close() { worker.closed = true; }
+        };
+        return worker;
+    };
+    return { calls, startWorker };
+};
+
+test('buildAtoms keeps single rows or first-seen groups', () => {
+    const rows = [{ g: 'a' }, { g: 'b' }, { g: 'a' }, {}];
+    assert.deepStrictEqual(buildAtoms(rows, '').map(a => a.length), [1, 1, 1, 1]);
+    const atoms = buildAtoms(rows, 'g');
+    assert.deepStrictEqual(atoms, [[rows[0], rows[2]], [rows[1]], [rows[3]]]);
+});
+
+test('every row runs exactly once and groups stay in one unit', async () => {
+    const rows = rowsOf(60).map(row => ({ ...row, g: row.id % 7 }));
+    const scheduler = new ChunkScheduler({ workers: 3, batchSize: 4 });
+    const { calls, startWorker } = fakeWorkers();
+    const units = [];
+    await scheduler.run(buildAtoms(rows, 'g'), { startWorker, onUnit: (unit) => units.push(unit) });
+
+    const seen = calls.flatMap(call => call.rows.map(row => row.id)).sort((a, b) => a - b);
+    assert.deepStrictEqual(seen, rows.map(row => row.id));
+    for (const call of calls) {
+        for (const row of rows) {
+            const inUnit = call.rows.filter(r => r.g === row.g).length;
+            assert.ok(inUnit === 0 || inUnit === rows.filter(r => r.g === row.g).length);
+        }
+    }
+    assert.strictEqual(units.length, calls.length);
+});
+
+test('an idle worker steals from the slow lane', async () => {
+    const scheduler = new ChunkScheduler({ workers: 2, batchSize: 1, maxUnitRows: 1 });
+    // Lane 0 is slow: lane 1 finishes its own half and takes over part of lane 0's
+    const { calls, startWorker } = fakeWorkers({ delay: (lane) => (lane === 0 ? 15 : 1) });
+    await scheduler.run(buildAtoms(rowsOf(20)), { startWorker, onUnit: () => { } });
+
+    assert.ok(scheduler.stats.steals > 0);
+    const byLane = [0, 1].map(lane => calls.filter(call => call.lane === lane).length);
+    assert.ok(byLane[1] > byLane[0], `lane rows ${byLane}`);
+    assert.strictEqual(calls.reduce((n, call) => n + call.rows.length, 0), 20);
+});
+
+test('a crashed unit is retried once on a fresh worker, flagged as a retry', async () => {
+    const scheduler = new ChunkScheduler({ workers: 1, batchSize: 5, unitRetries: 1 });
+    let crashed = false;
+    const { calls, startWorker } = fakeWorkers({
+        crash: () => {
+            if (crashed) return false;
+            crashed = true;
+            return true;
+        }
+    });
+    const outcomes = [];
+    await scheduler.run(buildAtoms(rowsOf(5)), { startWorker, onUnit: (unit, outcome) => outcomes.push(outcome.kind) });
+
+    assert.deepStrictEqual(calls.map(call => call.retry), [false, true]);
+    assert.deepStrictEqual(outcomes, ['success']);
+    assert.strictEqual(scheduler.stats.retries, 1);
+    assert.strictEqual(scheduler.stats.workers, 2);
+});
+
+test('without unitRetries a crashed unit is reported as failed', async () => {
+    const scheduler = new ChunkScheduler({ workers: 1, batchSize: 5 });
+    const { calls, startWorker } = fakeWorkers({ crash: () => true });
+    const outcomes = [];
+    await scheduler.run(buildAtoms(rowsOf(5)), { startWorker, onUnit: (unit, outcome) => outcomes.push(outcome.kind) });
+
+    assert.strictEqual(calls.length, 1);
+    assert.deepStrictEqual(outcomes, ['failed']);
+});
+
+test('stop() ends the run after the units in flight', async () => {
+    const scheduler = new ChunkScheduler({ workers: 1, batchSize: 1, maxUnitRows: 1 });
+    const { calls, startWorker } = fakeWorkers();
+    await scheduler.run(buildAtoms(rowsOf(10)), {
+        startWorker,
+        onUnit: () => { if (calls.length === 3) scheduler.stop(); }
+    });
+    assert.strictEqual(calls.length, 3);
+});
+
+test('unit size follows observed latency within batchSize and maxUnitRows', () => {
+    const scheduler = new ChunkScheduler({ workers: 1, batchSize: 2, maxUnitRows: 50, targetUnitSeconds: 10 });
+    scheduler.lanes = [{ rows: 1000 }];
+    assert.strictEqual(scheduler.unitRows(), 2);
+    scheduler.observe(10, 1);      // 0.1 s/row -> 100 rows, capped at 50
+    assert.strictEqual(scheduler.unitRows(), 50);
+    scheduler.secondsPerRow = 20;  // slow rows never go below batchSize
+    assert.strictEqual(scheduler.unitRows(), 2);
+});
@@ -0,0 +1,108 @@
+"""components/batch_utils.py: BatchCollector flushing and result/error mapping."""
+
+import threading
+import time
+
+import pytest
+
+from components import batch_utils
+
+
+class RecordingSender:
+    def __init__(self, fail_with=None, delay=0.0):
+        self.batches = []
+        self.fail_with = fail_with
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, payloads):
+        with self._lock:
+            self.batches.append(list(payloads))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if self.fail_with is not None:
+                raise self.fail_with
+            return {str(p['id']): {'ok': p['id']} for p in payloads if p['id'] != 'absent'}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def key(payload):
+    return payload['id']
+
+
+def test_full_batches_flush_by_size():
+    sender = RecordingSender()
+    with batch_utils.BatchCollector(sender, key, batch_size=3, max_wait=None) as collector:
+        futures = [collector.submit({'id': i}) for i in range(7)]
+        # Two full batches go out without waiting for close()
+        assert [f.result(timeout=2) for f in futures[:6]] == [{'ok': i} for i in range(6)]
+    assert futures[6].result(timeout=2) == {'ok': 6}
+    assert [len(b) for b in sender.batches] == [3, 3, 1]
+
+
+def test_partial_batch_flushes_after_max_wait():
+    sender = RecordingSender()
+    collector = batch_utils.BatchCollector(sender, key, batch_size=100, max_wait=0.05)
+    try:
+        future = collector.submit({'id': 'a'})
+        assert future.result(timeout=2) == {'ok': 'a'}
+        assert sender.batches == [[{'id': 'a'}]]
+    finally:
+        collector.close()
+
+
+def test_missing_key_resolves_to_none():
+    with batch_utils.BatchCollector(RecordingSender(), key, batch_size=2) as collector:
+        present = collector.submit({'id': 1})
+        absent = collector.submit({'id': 'absent'})
+    assert present.result() == {'ok': 1}
+    assert absent.result() is None
+
+
+def test_failed_batch_fails_every_item():
+    error = batch_utils.BatchRequestError(500, {'message': 'boom'})
+    with batch_utils.BatchCollector(RecordingSender(fail_with=error), key, batch_size=2) as collector:
+        futures = [collector.submit({'id': i}) for i in range(2)]
+    for future in futures:
+        with pytest.raises(batch_utils.BatchRequestError) as info:
+            future.result()
+        assert info.value.status_code == 500
+
+
+def test_batches_in_flight_are_bounded():
+    sender = RecordingSender(delay=0.05)
+    with batch_utils.BatchCollector(sender, key, batch_size=1, max_wait=None, max_concurrent=2) as collector:
+        for i in range(6):
+            collector.submit({'id': i})
+    assert len(sender.batches) == 6
+    assert sender.max_in_flight <= 2
+
+
+def test_submit_after_close_raises():
+    collector = batch_utils.BatchCollector(RecordingSender(), key)
+    collector.close()
+    with pytest.raises(RuntimeError):
+        collector.submit({'id': 1})
+
+
+def test_run_batched_maps_results_errors_and_skips():
+    rows = [{'id': 1}, {'id': 2, 'skip': True}, {'id': 'absent'}]
+
+    def apply_result(row, item):
+        row['Status'] = 'Pass' if item else 'Not found'
+
+    batch_utils.run_batched(rows, lambda r: None if r.get('skip') else {'id': r['id']},
+                            RecordingSender(), apply_result, key, batch_size=10)
+    assert [r.get('Status') for r in rows] == ['Pass', None, 'Not found']
+
+    failing = [{'id': 1}, {'id': 2}]
+    batch_utils.run_batched(failing, lambda r: {'id': r['id']},
+                            RecordingSender(fail_with=batch_utils.BatchRequestError(400, 'bad')),
+                            apply_result, key, batch_size=1)
+    assert all(r['Status'] == 'Fail' and 'Status 400' in r['API_Response'] for r in failing)
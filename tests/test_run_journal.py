@@ -0,0 +1,112 @@
+"""components/run_journal.py: planning, resume, crash retries and result merging."""
+
+import pytest
+
+from components import run_journal, row_store
+
+
+@pytest.fixture
+def open_journal(tmp_path):
+    journals = []
+
+    def factory(job_id="job"):
+        journal = run_journal.RunJournal(job_id, directory=str(tmp_path))
+        journals.append(journal)
+        return journal
+
+    yield factory
+    for journal in journals:
+        journal.close()
+
+
+def rows(n, start=0):
+    return [{"Name": f"row {i}"} for i in range(start, start + n)]
+
+
+def test_resume_skips_successful_rows_and_keeps_upload_order(open_journal):
+    first = open_journal()
+    data = rows(4)
+    remaining = first.plan(data)
+    results = [dict(row, Status="Fail" if i == 2 else "Pass") for i, row in enumerate(remaining)]
+    first.finish(results)
+
+    second = open_journal()
+    remaining = second.plan(rows(4), resume=True)
+    assert remaining == [{"Name": "row 2"}]
+    merged = second.finish([{"Name": "row 2", "Status": "Pass"}])
+    assert [r["Name"] for r in merged] == ["row 0", "row 1", "row 2", "row 3"]
+    assert all(r["Status"] == "Pass" for r in merged)
+
+
+def test_without_resume_every_row_runs(open_journal):
+    journal = open_journal()
+    journal.finish([dict(r, Status="Pass") for r in journal.plan(rows(3))])
+    assert len(open_journal().plan(rows(3))) == 3
+
+
+def test_identical_rows_are_distinct_by_upload_index(open_journal):
+    journal = open_journal()
+    data = [{"Name": "same"}, {"Name": "same"}]
+    journal.plan(data, indexes=[10, 11])
+    journal.record_item(data[0], {"Name": "same", "Status": "Pass"})
+
+    remaining = open_journal().plan([{"Name": "same"}, {"Name": "same"}], resume=True, indexes=[10, 11])
+    assert len(remaining) == 1
+
+
+def test_indexes_must_match_rows(open_journal):
+    with pytest.raises(ValueError):
+        open_journal().plan(rows(2), indexes=[0])
+
+
+def test_retried_unit_skips_started_rows_and_reports_them_failed(open_journal):
+    crashed = open_journal()
+    data = rows(3)
+    remaining = crashed.plan(data, indexes=[0, 1, 2])
+    crashed.mark_item_started(remaining[0])
+    crashed.record_item(remaining[0], dict(remaining[0], Status="Pass"))
+    crashed.mark_item_started(remaining[1])  # worker died while row 1 was running
+
+    retry = open_journal()
+    remaining = retry.plan(rows(3), indexes=[0, 1, 2], skip_recorded=True)
+    assert remaining == [{"Name": "row 2"}]
+    merged = retry.finish([{"Name": "row 2", "Status": "Pass"}])
+    assert merged[0]["Status"] == "Pass"
+    assert merged[1]["Status"] == "Fail"
+    assert merged[1]["Response"] == run_journal.INTERRUPTED_MESSAGE
+
+
+def test_mismatched_results_are_matched_by_row_object(open_journal, capsys):
+    journal = open_journal()
+    remaining = journal.plan(rows(4))  # 3 results for 4 rows: positions say nothing
+    for row in remaining:
+        row["Status"] = "Pass"
+    extra = {"Summary": True}
+    merged = journal.finish([remaining[2], remaining[0], extra])
+
+    assert merged == [remaining[0], remaining[2], extra]
+    assert journal.recorded == 2
+    assert "could not be matched" in capsys.readouterr().out
+
+
+def test_columnar_rows_are_journaled_by_position(open_journal):
+    journal = open_journal()
+    journal.plan(rows(3), indexes=[0, 1, 2])
+    store = row_store.RowStore.from_records(rows(3))
+    journal.use_store(store)
+
+    for i in range(len(store)):
+        row = store[i]  # a new view on every access
+        journal.mark_item_started(row)
+        row["Status"] = "Pass"
+        journal.record_item(store[i], store[i])
+
+    done = journal.completed()
+    assert len(done) == 3
+    assert all(isinstance(result, dict) and result["Status"] == "Pass" for result in done.values())
+
+
+def test_is_success_reads_status_and_401_responses():
+    assert run_journal.is_success({"Status": "Pass"})
+    assert not run_journal.is_success({"status": "Failed"})
+    assert not run_journal.is_success({"Status": "Pass", "API_Response": "Status: 401 Unauthorized"})
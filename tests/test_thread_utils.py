@@ -0,0 +1,161 @@
+"""Converted Scripts/thread_utils.py: windowed submission, ordering, deferral, cancellation."""
+
+import random
+import threading
+import time
+
+import pytest
+
+import thread_utils
+from components import cancellation, retry_queue
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    cancellation.reset()
+    # Parked rows come back almost at once
+    monkeypatch.setitem(retry_queue.DEFAULTS, 'base_delay', 0.01)
+    monkeypatch.setitem(retry_queue.DEFAULTS, 'max_delay', 0.02)
+    yield
+    cancellation.reset()
+
+
+def test_results_and_callbacks_keep_input_order():
+    emitted = []
+
+    def work(n):
+        time.sleep(random.uniform(0, 0.005))
+        return n * 10
+
+    results = thread_utils.run_in_parallel(work, range(40), max_workers=4,
+                                           on_result=lambda i, r: emitted.append((i, r)))
+    assert results == [n * 10 for n in range(40)]
+    assert emitted == list(enumerate(results))
+
+
+def test_unordered_mode_returns_every_result():
+    results = thread_utils.run_in_parallel(lambda n: n, range(25), max_workers=5, ordered=False)
+    assert sorted(results) == list(range(25))
+
+
+def test_lazy_input_and_count_without_collect():
+    seen = []
+    count = thread_utils.run_in_parallel(lambda n: n, (n for n in range(30)), max_workers=3,
+                                         on_result=lambda i, r: seen.append(r), collect=False)
+    assert count == 30
+    assert seen == list(range(30))
+
+
+def test_window_bounds_rows_started_ahead_of_a_stalled_head_row():
+    release = threading.Event()
+    lock = threading.Lock()
+    state = {'started': 0, 'emitted': 0, 'ahead': 0}
+
+    def work(n):
+        with lock:
+            state['started'] += 1
+            state['ahead'] = max(state['ahead'], state['started'] - state['emitted'])
+        if n == 0:
+            release.wait(0.3)  # head row stalls; later rows finish and wait in the buffer
+        return n
+
+    def on_result(index, result):
+        with lock:
+            state['emitted'] += 1
+
+    thread_utils.run_in_parallel(work, range(50), max_workers=4, window=8, on_result=on_result)
+    assert state['emitted'] == 50
+    assert 4 < state['ahead'] <= 8
+
+
+def test_transient_row_is_deferred_and_retried():
+    attempts = {}
+
+    def work(row):
+        attempts[row['id']] = attempts.get(row['id'], 0) + 1
+        if row['id'] == 3 and attempts[3] == 1:
+            retry_queue.mark_transient("HTTP 503")
+            return dict(row, Status='Fail')
+        return dict(row, Status='Pass')
+
+    rows = [{'id': i} for i in range(6)]
+    results = thread_utils.run_in_parallel(work, rows, max_workers=2)
+    assert [r['id'] for r in results] == list(range(6))
+    assert all(r['Status'] == 'Pass' for r in results)
+    assert attempts[3] == 2
+
+
+def test_deferred_row_keeps_its_last_result_after_max_attempts():
+    def work(row):
+        retry_queue.mark_transient("HTTP 429")
+        return dict(row, Status='Fail', attempt=row.get('attempt', 0) + 1)
+
+    results = thread_utils.run_in_parallel(work, [{'id': 1}], max_workers=1,
+                                           env_config={'retryMaxDeferred': 2})
+    assert results[0]['Status'] == 'Fail'
+
+
+def test_row_is_not_deferred_once_it_may_have_mutated():
+    attempts = []
+
+    def work(row):
+        attempts.append(row['id'])
+        retry_queue.record_mutation()
+        retry_queue.mark_transient("HTTP 504")
+        return dict(row, Status='Fail')
+
+    results = thread_utils.run_in_parallel(work, [{'id': 1}], max_workers=1)
+    assert attempts == [1]
+    assert results[0]['Status'] == 'Fail'
+
+
+def test_deferred_row_is_retried_from_its_original_values():
+    seen = []
+
+    def work(row):
+        seen.append(dict(row))
+        row['Touched'] = True
+        if len(seen) == 1:
+            retry_queue.mark_transient("HTTP 503")
+        return row
+
+    thread_utils.run_in_parallel(work, [{'id': 1}], max_workers=1)
+    assert seen == [{'id': 1}, {'id': 1}]
+
+
+def test_retryable_exception_is_deferred_but_other_errors_fail_the_row():
+    attempts = {'timeout': 0, 'bug': 0}
+
+    def work(name):
+        attempts[name] += 1
+        if name == 'timeout' and attempts[name] == 1:
+            raise TimeoutError("read timed out")
+        if name == 'bug':
+            raise KeyError('missing')
+        return {'name': name, 'Status': 'Pass'}
+
+    results = thread_utils.run_in_parallel(work, ['timeout', 'bug'], max_workers=2)
+    assert results[0]['Status'] == 'Pass'
+    assert attempts == {'timeout': 2, 'bug': 1}
+    assert results[1]['Status'] == 'Fail'
+
+
+def test_cancel_stops_new_rows_and_returns_finished_ones():
+    def work(n):
+        if n == 5:
+            cancellation.cancel("Stop")
+        return n
+
+    results = thread_utils.run_in_parallel(work, range(100), max_workers=1, window=1)
+    assert results == list(range(6))
+
+
+def test_grouped_rows_keep_order_and_none_results():
+    rows = [{'g': 'a', 'i': 0}, {'g': 'b', 'i': 1}, {'i': 2}, {'g': 'a', 'i': 3}]
+
+    def process_group(key, group_rows):
+        return [None if row['i'] == 3 else dict(row, Status='Pass') for row in group_rows]
+
+    results = thread_utils.run_grouped(process_group, rows, 'g', max_workers=2)
+    assert [r and r['i'] for r in results] == [0, 1, 2, None]
+    assert results[2]['Status'] == 'Fail'